@@ -3,6 +3,43 @@ Adapters Layer - Interface Adapters
 Seguindo princípios de Clean Architecture
 """
 
-from .adapter import AIService, OpenAIAdapter, ClaudeAdapter, ai_service
+from .adapter import (AIService, OpenAIAdapter, OpenAICompatibleAdapter,
+                      MockAdapter, ClaudeAdapter, ai_service)
+from .embeddings import (
+    EmbeddingProviderInterface,
+    OpenAIEmbeddingProvider,
+    LocalHashingEmbeddingProvider,
+    create_embedding_provider
+)
+from .embedding_batcher import EmbeddingBatcher
+from .single_flight import SingleFlight, make_request_key
+from .router import ProviderRouter, CircuitBreaker, CircuitOpenError
+from .cascade import ModelCascade, QueryComplexityClassifier
+from .faq import FAQStore, build_faq_entries
+from .admission import (BoundedExecutor, ProviderBusyError,
+                        DeadlineExceededError)
+from .resilience import AdaptiveTimeout, RetryBudget, RetryPolicy
+from .mock_provider import (LatencyProfile, SimulatedLLM, MockOpenAIServer,
+                            SimulatedProviderError, SimulatedRateLimitError)
+from .metrics import (MetricsRegistry, MetricsServer, Counter, Gauge,
+                      Histogram, metrics, set_readiness_probe,
+                      start_metrics_server)
+from .warmup import Warmup, start_warmup
 
-__all__ = ['AIService', 'OpenAIAdapter', 'ClaudeAdapter', 'ai_service'] 
\ No newline at end of file
+__all__ = [
+    'AIService', 'OpenAIAdapter', 'OpenAICompatibleAdapter', 'MockAdapter',
+    'ClaudeAdapter', 'ai_service',
+    'EmbeddingProviderInterface', 'OpenAIEmbeddingProvider',
+    'LocalHashingEmbeddingProvider', 'create_embedding_provider',
+    'EmbeddingBatcher', 'SingleFlight', 'make_request_key',
+    'ProviderRouter', 'CircuitBreaker', 'CircuitOpenError',
+    'ModelCascade', 'QueryComplexityClassifier',
+    'FAQStore', 'build_faq_entries',
+    'BoundedExecutor', 'ProviderBusyError', 'DeadlineExceededError',
+    'AdaptiveTimeout', 'RetryBudget', 'RetryPolicy',
+    'LatencyProfile', 'SimulatedLLM', 'MockOpenAIServer',
+    'SimulatedProviderError', 'SimulatedRateLimitError',
+    'MetricsRegistry', 'MetricsServer', 'Counter', 'Gauge', 'Histogram',
+    'metrics', 'set_readiness_probe', 'start_metrics_server',
+    'Warmup', 'start_warmup'
+] 
\ No newline at end of file
@@ -2,19 +2,72 @@
 Adapter para comunicação com APIs de IA
 Seguindo princípios de Clean Architecture
 """
+import hashlib
+import os
+import pickle
 import time
 import random
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
 from abc import ABC, abstractmethod
 from pathlib import Path
-from openai import OpenAI
+from openai import (APIConnectionError, DefaultHttpxClient,
+                    InternalServerError, OpenAI, OpenAIError, RateLimitError)
+import httpx
 import streamlit as st
+from domain.entities import RequestContext
+from .embeddings import EmbeddingProviderInterface, create_embedding_provider
+from .embedding_batcher import EmbeddingBatcher
+from .single_flight import SingleFlight, make_request_key
+from .router import ProviderRouter
+from .admission import BoundedExecutor
+from .cascade import DEFAULT_MIN_CONFIDENCE
+from .compression import ContextCompressor
+from .resilience import AdaptiveTimeout, RetryBudget, RetryPolicy
+from .mock_provider import LatencyProfile, SimulatedLLM
+from .tracing import SPAN_KIND_CLIENT, tracer
+from .metrics import metrics
+
+# Falhas transitórias da OpenAI que valem uma retentativa (inclui timeout).
+# Erros de leitura do stream chegam do httpx sem conversão pelo SDK.
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError,
+                    httpx.TransportError)
+
+# Timeout inicial e máximo de cada etapa (variável de ambiente, padrão em s)
+# e o mínimo que o timeout adaptativo pode atingir
+STAGE_TIMEOUTS = {
+    "embedding": ("EMBEDDING_TIMEOUT_S", 10.0, 0.5),
+    "completion": ("COMPLETION_TIMEOUT_S", 120.0, 2.0),
+    "first_token": ("FIRST_TOKEN_TIMEOUT_S", 60.0, 1.0),
+}
+
+RETRIEVAL_LATENCY = metrics.histogram(
+    "tcross_retrieval_seconds",
+    "Duração da recuperação de trechos por origem do resultado",
+    ("source",))
+RETRIEVAL_CACHE = metrics.counter(
+    "tcross_retrieval_cache_total",
+    "Consultas ao cache de recuperação por resultado", ("result",))
+RETRIEVAL_ERRORS = metrics.counter(
+    "tcross_retrieval_errors_total", "Falhas na busca por similaridade")
+EMBEDDING_LATENCY = metrics.histogram(
+    "tcross_embedding_query_seconds",
+    "Duração do embedding da pergunta", ("provider",))
+VECTOR_SEARCH_LATENCY = metrics.histogram(
+    "tcross_vector_search_seconds",
+    "Duração da busca no índice ou no conjunto de trabalho",
+    ("source",), buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
 
 # Importações para embeddings (opcionais)
 try:
+    import faiss
+    import numpy as np
     from langchain_community.vectorstores import FAISS
-    from langchain_openai import OpenAIEmbeddings
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from .working_set import RetrievalWorkingSet
+    from .document_loader import (iter_document_chunks, iter_batches,
+                                  compute_index_version)
     LANGCHAIN_AVAILABLE = True
     print("Langchain está instalado")
 except ImportError:
@@ -26,10 +79,34 @@ class AIProviderInterface(ABC):
     """Interface abstrata para provedores de IA"""
     
     @abstractmethod
-    def generate_response(self, message: str, model: str) -> str:
+    def generate_response(self, message: str, model: str,
+                          context: Optional[RequestContext] = None) -> str:
         """Gera uma resposta baseada na mensagem do usuário"""
         pass
     
+    def stream_response(self, message: str, model: str,
+                        context: Optional[RequestContext] = None
+                        ) -> Iterator[str]:
+        """
+        Gera a resposta em pedaços
+
+        A implementação padrão entrega a resposta completa de uma vez;
+        provedores com streaming nativo devem sobrescrever.
+        """
+        return iter([self.generate_response(message, model, context)])
+    
+    @abstractmethod
+    def complete(self, messages: List[dict], model: str,
+                 deadline: Optional[float] = None) -> str:
+        """
+        Chamada direta ao modelo com as mensagens dadas
+
+        Sem recuperação nem prompt do assistente; usada para tarefas
+        auxiliares como resumir o histórico. deadline (time.monotonic())
+        limita a chamada e as retentativas.
+        """
+        pass
+    
     @abstractmethod
     def get_available_models(self) -> List[str]:
         """Retorna lista de modelos disponíveis"""
@@ -39,37 +116,130 @@ class AIProviderInterface(ABC):
 class OpenAIAdapter(AIProviderInterface):
     """Adapter para OpenAI API com suporte a embeddings"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 embedding_provider: Optional[
+                     EmbeddingProviderInterface] = None,
+                 load_index: bool = True):
         self.api_key = api_key
         self.available_models = [
-            "o1"
+            "o1",
+            "gpt-4o-mini"
         ]
         self.vector_store = None
+        # Vetor da pergunta e resultado da busca no índice completo, por
+        # (mensagem, k): vale para qualquer sessão
+        self._retrieval_cache: "OrderedDict[Tuple[str, int], tuple]" = (
+            OrderedDict())
+        self._retrieval_cache_size = 256
+        # Resultado entregue a cada sessão (pode vir do conjunto de
+        # trabalho dela), reaproveitado entre a decisão da cascata e a
+        # montagem do prompt da mesma pergunta
+        self._session_retrievals: "OrderedDict[Tuple[str, str, int], list]" = (
+            OrderedDict())
+        self._retrieval_lock = threading.Lock()
+        # Trechos recentes de cada sessão, consultados antes do índice
+        self._working_sets: "OrderedDict[str, RetrievalWorkingSet]" = (
+            OrderedDict())
+        self._max_working_sets = 256
         self.embeddings_cache_dir = Path("embeddings_cache")
         self.embeddings_cache_dir.mkdir(exist_ok=True)
         self.documents_dir = Path("documents")
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
+        self.embedding_batch_size = 256
+        
+        self.index_version = ""
+        self.index_load_ms: Optional[float] = None
+        
+        # Um cliente (e pool de conexões) para todas as chamadas; as
+        # retentativas do SDK ficam desligadas em favor das políticas abaixo
+        self._client: Optional[OpenAI] = None
+        self._client_lock = threading.Lock()
+        # Timeout adaptativo por etapa/modelo e um orçamento de
+        # retentativas comum a todas as etapas
+        self.retry_budget = RetryBudget(
+            ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.1")))
+        self._retry_policies: Dict[Tuple[str, str], RetryPolicy] = {}
+        
+        # Provedor de embeddings: explícito ou via EMBEDDINGS_PROVIDER
+        self.embeddings = (embedding_provider or create_embedding_provider(
+            api_key=api_key,
+            retry_policy=self._get_retry_policy("embedding")))
+        
+        # Consultas concorrentes de várias sessões viram uma chamada só.
+        # Só compensa para provedores remotos: o local responde em µs.
+        batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+        if (self.embeddings and self.embeddings.name != "local" 
+                and batch_window_ms > 0):
+            self.embeddings = EmbeddingBatcher(
+                self.embeddings, window_ms=batch_window_ms)
+        
+        # Compressão extrativa do contexto (desligada com razão 0)
+        compression_ratio = float(os.getenv("CONTEXT_COMPRESSION_RATIO", "0"))
+        compression_max_tokens = int(
+            os.getenv("CONTEXT_COMPRESSION_MAX_TOKENS", "0"))
+        self.compressor = (
+            ContextCompressor(ratio=compression_ratio,
+                              max_tokens=compression_max_tokens or None)
+            if compression_ratio > 0 or compression_max_tokens > 0 else None)
+        
+        # Resposta extrativa curta quando não há tempo para o modelo
+        self._fallback_compressor = ContextCompressor(max_tokens=250)
+        
+        # Similaridade mínima para responder pelo conjunto da sessão
+        self.working_set_min_score = float(os.getenv(
+            "SESSION_RETRIEVAL_MIN_SCORE",
+            DEFAULT_MIN_CONFIDENCE.get(
+                self.embeddings.name if self.embeddings else "", 0.8)))
         
         # Inicializa embeddings se LangChain estiver disponível
-        if LANGCHAIN_AVAILABLE and api_key:
-            self.embeddings = OpenAIEmbeddings(api_key=api_key)
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
+        if LANGCHAIN_AVAILABLE and self.embeddings and load_index:
+            start = time.perf_counter()
+            self.index_version = self._compute_index_version()
             self._load_or_create_embeddings()
+            self.index_load_ms = (time.perf_counter() - start) * 1000
+    
+    def _get_cache_path(self) -> Path:
+        """Cada provedor de embeddings tem seu próprio índice em cache"""
+        if self.embeddings.name == "openai":
+            return self.embeddings_cache_dir / "tcross_embeddings"
+        return (self.embeddings_cache_dir / 
+                f"tcross_embeddings_{self.embeddings.name}")
+    
+    def _compute_index_version(self) -> str:
+        """Versão do índice: documentos, provedor e parâmetros do splitter"""
+        txt_files = (sorted(self.documents_dir.glob("*.txt"))
+                     if self.documents_dir.exists() else [])
+        return compute_index_version(
+            txt_files, self.embeddings.name,
+            self.chunk_size, self.chunk_overlap)
     
     def _load_or_create_embeddings(self):
         """Cache inteligente: carrega embeddings existentes ou cria novos"""
-        cache_path = self.embeddings_cache_dir / "tcross_embeddings"
+        cache_path = self._get_cache_path()
+        version_file = cache_path / "index_version.txt"
+        
+        # Cache de uma versão anterior dos documentos é descartado. Caches
+        # sem arquivo de versão (anteriores a ele) são aceitos e marcados.
+        if version_file.exists():
+            if version_file.read_text().strip() != self.index_version:
+                print("♻️ Documentos alterados: recriando embeddings")
+                self._create_embeddings_from_txt_files()
+                return
         
         # Tenta carregar embeddings existentes
         if cache_path.exists():
             try:
-                self.vector_store = FAISS.load_local(
-                    str(cache_path), 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
+                if os.getenv("INDEX_MMAP") == "1":
+                    self.vector_store = self._load_mapped_index(cache_path)
+                else:
+                    self.vector_store = FAISS.load_local(
+                        str(cache_path), 
+                        self.embeddings,
+                        allow_dangerous_deserialization=True
+                    )
+                if not version_file.exists():
+                    version_file.write_text(self.index_version)
                 print("✅ Embeddings carregados do cache")
                 return
             except Exception as e:
@@ -78,6 +248,20 @@ class OpenAIAdapter(AIProviderInterface):
         # Se não conseguir carregar, cria novos embeddings
         self._create_embeddings_from_txt_files()
     
+    def _load_mapped_index(self, cache_path: Path) -> "FAISS":
+        """
+        Índice mapeado do arquivo em vez de copiado para a memória
+
+        Os vetores ficam no cache de páginas do sistema, compartilhados
+        por todos os processos que mapeiam o mesmo arquivo (ex.: os
+        workers da API). Só leitura: novos textos exigem recriar o índice.
+        """
+        index = faiss.read_index(str(cache_path / "index.faiss"),
+                                 faiss.IO_FLAG_MMAP_IFC)
+        with open(cache_path / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+    
     def _create_embeddings_from_txt_files(self):
         """Cria embeddings a partir de arquivos .txt na pasta documents"""
         if not self.documents_dir.exists():
@@ -91,67 +275,303 @@ class OpenAIAdapter(AIProviderInterface):
             print("📄 Nenhum arquivo .txt encontrado na pasta 'documents'")
             return
         
-        # Carrega todos os documentos
-        all_texts = []
-        for file_path in txt_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Adiciona metadados
-                    filename = file_path.name
-                    content_with_metadata = (f"[ARQUIVO: {filename}]\n"
-                                           f"{content}")
-                    
-                    # Divide em chunks
-                    chunks = self.text_splitter.split_text(
-                        content_with_metadata)
-                    all_texts.extend(chunks)
-                    
-                print(f"📖 Processado: {filename}")
-            except Exception as e:
-                print(f"❌ Erro ao processar {file_path}: {e}")
+        # Chunks gerados em streaming (leitura segmentada + pool de processos)
+        chunks = iter_document_chunks(
+            txt_files,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap
+        )
         
-        if all_texts:
-            try:
-                # Cria vector store
-                self.vector_store = FAISS.from_texts(
-                    all_texts, self.embeddings)
-                
+        total_chunks = 0
+        try:
+            # Cria o vector store em lotes, sem materializar todos os chunks
+            for batch in iter_batches(chunks, self.embedding_batch_size):
+                if self.vector_store is None:
+                    self.vector_store = FAISS.from_texts(
+                        batch, self.embeddings)
+                else:
+                    self.vector_store.add_texts(batch)
+                total_chunks += len(batch)
+            
+            if self.vector_store is not None:
                 # Salva no cache
-                cache_path = self.embeddings_cache_dir / "tcross_embeddings"
+                cache_path = self._get_cache_path()
                 self.vector_store.save_local(str(cache_path))
+                (cache_path / "index_version.txt").write_text(
+                    self.index_version)
                 
-                print(f"✅ Embeddings criados com {len(all_texts)} chunks "
+                print(f"✅ Embeddings criados com {total_chunks} chunks "
                       f"e salvos no cache")
-            except Exception as e:
-                print(f"❌ Erro ao criar embeddings: {e}")
+        except Exception as e:
+            self.vector_store = None
+            print(f"❌ Erro ao criar embeddings: {e}")
     
-    def _get_context_from_embeddings(self, message: str, k: int = 3) -> str:
-        """Busca contexto relevante nos embeddings"""
+    def retrieve(self, message: str, k: int = 3,
+                 session_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Busca os trechos mais similares à mensagem
+
+        Retorna pares (texto, similaridade de cosseno). Os provedores de
+        embeddings geram vetores normalizados, então a distância L2 ao
+        quadrado do FAISS vira cosseno por 1 - d/2. Com session_id, o
+        conjunto de trabalho da sessão é consultado antes do índice.
+
+        O cache compartilhado guarda o vetor da pergunta e o resultado do
+        índice completo: uma pergunta repetida por outra sessão não gera
+        embedding, mas ainda passa pelo conjunto de trabalho dela. O que
+        vem de um conjunto de trabalho só é reaproveitado na mesma sessão.
+        """
+        return [(text, score) for _, text, score
+                in self._retrieve(message, k, session_id)]
+    
+    def _retrieve(self, message: str, k: int,
+                  session_id: Optional[str]) -> List[Tuple[int, str, float]]:
+        """Busca retornando também a posição de cada trecho no índice"""
         if not self.vector_store:
-            return ""
+            return []
         
+        start = time.perf_counter()
+        with tracer.span("retrieval", k=k) as span:
+            key = (message, k)
+            session_key = (session_id, message, k) if session_id else None
+            with self._retrieval_lock:
+                delivered = (self._session_retrievals.get(session_key)
+                             if session_key else None)
+                if delivered is not None:
+                    self._session_retrievals.move_to_end(session_key)
+                cached = self._retrieval_cache.get(key)
+                if cached is not None:
+                    self._retrieval_cache.move_to_end(key)
+            if delivered is None and session_id is None and cached:
+                delivered = cached[1]
+            RETRIEVAL_CACHE.inc(result="miss" if cached is None else "hit")
+            if span:
+                span.set_attribute("cache.hit", cached is not None)
+            if delivered is not None:
+                RETRIEVAL_LATENCY.observe(time.perf_counter() - start,
+                                          source="cache")
+                return delivered
+            
+            working_set = (self._get_working_set(session_id)
+                           if session_id else None)
+            try:
+                if cached is not None:
+                    query_vector, index_results = cached
+                else:
+                    with tracer.span("embedding.query",
+                                     provider=self.embeddings.name), \
+                            EMBEDDING_LATENCY.time(
+                                provider=self.embeddings.name):
+                        query_vector = np.asarray(
+                            self.embeddings.embed_query(message),
+                            dtype=np.float32)
+                    index_results = None
+                search_start = time.perf_counter()
+                with tracer.span("vector.search") as search_span:
+                    results = None
+                    if working_set is not None:
+                        with self._retrieval_lock:
+                            results = working_set.search(query_vector, k)
+                    if results is not None:
+                        source = "working_set"
+                    elif index_results is not None:
+                        source, results = "cache", index_results
+                    else:
+                        source = "index"
+                        results = self._search_index(query_vector, k)
+                    if search_span:
+                        search_span.set_attribute("source", source)
+                    if source != "working_set" and working_set is not None:
+                        self._add_to_working_set(working_set, results)
+                VECTOR_SEARCH_LATENCY.observe(
+                    time.perf_counter() - search_start, source=source)
+            except Exception as e:
+                RETRIEVAL_ERRORS.inc()
+                print(f"⚠️ Erro na busca por similaridade: {e}")
+                return []
+            
+            if source == "index":
+                self._cache_retrieval(key, query_vector, results)
+            if session_key:
+                with self._retrieval_lock:
+                    self._session_retrievals[session_key] = results
+                    if (len(self._session_retrievals) >
+                            self._retrieval_cache_size):
+                        self._session_retrievals.popitem(last=False)
+            RETRIEVAL_LATENCY.observe(time.perf_counter() - start,
+                                      source=source)
+            return results
+    
+    def _search_index(self, query_vector: np.ndarray, k: int
+                      ) -> List[Tuple[int, str, float]]:
+        """Busca no índice FAISS completo"""
+        distances, positions = self.vector_store.index.search(
+            query_vector.reshape(1, -1), k)
+        results = []
+        for distance, position in zip(distances[0], positions[0]):
+            if position < 0:
+                continue
+            doc = self.vector_store.docstore.search(
+                self.vector_store.index_to_docstore_id[position])
+            results.append((int(position), doc.page_content,
+                            float(1 - distance / 2)))
+        return results
+    
+    def _cache_retrieval(self, key: Tuple[str, int],
+                         query_vector: np.ndarray,
+                         results: List[Tuple[int, str, float]]):
+        """Guarda só resultados do índice completo (valem para todos)"""
+        with self._retrieval_lock:
+            self._retrieval_cache[key] = (query_vector, results)
+            if len(self._retrieval_cache) > self._retrieval_cache_size:
+                self._retrieval_cache.popitem(last=False)
+    
+    def _get_working_set(self, session_id: str) -> RetrievalWorkingSet:
+        """Conjunto de trabalho da sessão (as menos recentes são descartadas)"""
+        with self._retrieval_lock:
+            working_set = self._working_sets.get(session_id)
+            if working_set is None:
+                working_set = RetrievalWorkingSet(self.working_set_min_score)
+                self._working_sets[session_id] = working_set
+                if len(self._working_sets) > self._max_working_sets:
+                    self._working_sets.popitem(last=False)
+            self._working_sets.move_to_end(session_id)
+            return working_set
+    
+    def _add_to_working_set(self, working_set: RetrievalWorkingSet,
+                            results: List[Tuple[int, str, float]]):
+        """Guarda os trechos recuperados, com os vetores do índice"""
+        if not results:
+            return
+        positions = [position for position, _, _ in results]
+        vectors = np.vstack([self.vector_store.index.reconstruct(position)
+                             for position in positions])
+        with self._retrieval_lock:
+            working_set.add(positions, [text for _, text, _ in results],
+                            vectors)
+    
+    def get_session_retrieval_stats(self, session_id: str) -> dict:
+        """Taxa de acerto do conjunto de trabalho de uma sessão"""
+        with self._retrieval_lock:
+            working_set = self._working_sets.get(session_id)
+            return working_set.get_stats() if working_set else {}
+    
+    def get_session_memory(self, session_id: str) -> int:
+        """Bytes aproximados do conjunto de trabalho de uma sessão"""
+        with self._retrieval_lock:
+            working_set = self._working_sets.get(session_id)
+            return working_set.estimate_bytes() if working_set else 0
+    
+    def release_session(self, session_id: str):
+        """Descarta o conjunto de trabalho de uma sessão encerrada"""
+        with self._retrieval_lock:
+            self._working_sets.pop(session_id, None)
+            for key in [key for key in self._session_retrievals
+                        if key[0] == session_id]:
+                del self._session_retrievals[key]
+    
+    def prefetch_retrieval(self, messages: List[str], k: int = 3):
+        """
+        Faz a busca de várias mensagens com uma única chamada de embeddings
+
+        Os resultados ficam no cache de recuperação, de onde as gerações
+        seguintes os leem. Usado em processamento em lote.
+        """
+        if not self.vector_store or not messages:
+            return
         try:
-            docs = self.vector_store.similarity_search(message, k=k)
-            if docs:
-                context_parts = [doc.page_content for doc in docs]
-                return ("\n\nCONTEXTO DOS DOCUMENTOS:\n" + 
-                        "\n---\n".join(context_parts))
+            vectors = self.embeddings.embed_documents(messages)
         except Exception as e:
-            print(f"⚠️ Erro na busca por similaridade: {e}")
-        
-        return ""
+            print(f"⚠️ Erro ao gerar embeddings em lote: {e}")
+            return
+        for message, vector in zip(messages, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            self._cache_retrieval((message, k), vector,
+                                  self._search_index(vector, k))
     
-    def generate_response(self, message: str, model: str) -> str:
+    def touch_index(self, block_size: int = 4096) -> dict:
         """
-        Gera resposta usando OpenAI API com contexto de embeddings
+        Lê todos os vetores do índice e faz uma busca
+
+        Traz as páginas do índice para a memória (e inicializa a busca)
+        antes da primeira pergunta, em vez de durante ela.
         """
-        client = OpenAI(api_key=self.api_key)
+        if not self.vector_store:
+            return {}
+        index = self.vector_store.index
+        start = time.perf_counter()
+        for offset in range(0, index.ntotal, block_size):
+            index.reconstruct_n(offset, min(block_size, index.ntotal - offset))
+        self._search_index(np.zeros(index.d, dtype=np.float32), 1)
+        return {"vectors": index.ntotal,
+                "bytes": index.ntotal * index.d * 4,
+                "load_ms": round(self.index_load_ms or 0.0, 1),
+                "touch_ms": round((time.perf_counter() - start) * 1000, 1)}
+    
+    def warm_up_connection(self, timeout: float = 5.0) -> bool:
+        """
+        Abre uma conexão do pool (DNS, TCP e TLS) com uma chamada barata
+
+        Retorna False sem credenciais; erros de rede sobem para quem chamou.
+        """
+        if not self._can_connect():
+            return False
+        self._get_client().models.list(timeout=timeout)
+        return True
+    
+    def _can_connect(self) -> bool:
+        return bool(self.api_key or os.getenv("OPENAI_API_KEY"))
+    
+    def get_retrieval_confidence(self, message: str,
+                                 session_id: Optional[str] = None
+                                 ) -> Optional[float]:
+        """Similaridade do melhor trecho recuperado (None sem índice)"""
+        results = self.retrieve(message, session_id=session_id)
+        if not results:
+            return None
+        return max(score for _, score in results)
+    
+    def _get_context_from_embeddings(self, message: str, k: int = 3,
+                                     session_id: Optional[str] = None,
+                                     question: Optional[str] = None) -> str:
+        """Busca contexto relevante nos embeddings"""
+        results = self.retrieve(message, k=k, session_id=session_id)
+        if results:
+            context_parts = [text for text, _ in results]
+            # Só as frases mais ligadas à pergunta vão para o prompt
+            if self.compressor:
+                context_parts = self.compressor.compress(
+                    question or message, context_parts)
+            return ("\n\nCONTEXTO DOS DOCUMENTOS:\n" + 
+                    "\n---\n".join(context_parts))
         
+        return ""
+    
+    def _build_messages(self, message: str,
+                        request_context: Optional[RequestContext] = None
+                        ) -> List[dict]:
+        """Monta as mensagens do prompt com o contexto dos embeddings"""
+        with tracer.span("prompt.build"):
+            return self._assemble_messages(message, request_context)
+    
+    def _assemble_messages(self, message: str,
+                           request_context: Optional[RequestContext]
+                           ) -> List[dict]:
         # Busca contexto relevante nos embeddings
-        context = (self._get_context_from_embeddings(message) 
+        session_id = request_context.session_id if request_context else None
+        question = request_context.question if request_context else None
+        context = (self._get_context_from_embeddings(
+                       message, session_id=session_id, question=question)
                    if LANGCHAIN_AVAILABLE else "")
         
+        # Veículo da requisição; sem ele, o selecionado na sessão do Streamlit
+        if request_context and request_context.has_vehicle():
+            year = request_context.vehicle_year
+            version = request_context.vehicle_version
+        else:
+            year = st.session_state.ano_veiculo
+            version = st.session_state.versao_veiculo
+        
         # Prepara mensagens do sistema
         messages = [
             {"role": "system", 
@@ -159,8 +579,7 @@ class OpenAIAdapter(AIProviderInterface):
                         "perguntas sobre o VW T-Cross."},
             {"role": "system", 
              "content": f"O carro atualmente selecionado é um VW T-Cross "
-                        f"{st.session_state.ano_veiculo} "
-                        f"{st.session_state.versao_veiculo}"},
+                        f"{year} {version}"},
             {"role": "system", 
              "content": "Você deve responder apenas perguntas sobre o "
                         "VW T-Cross, caso seja sobre um outro carro ou um "
@@ -176,20 +595,195 @@ class OpenAIAdapter(AIProviderInterface):
                            f"Não responda nenhuma pergunta cujo a resposta não esteja no contexto dos documentos."
             })
         
+        # Conversa até aqui: resumo das mensagens antigas + janela recente
+        if request_context and request_context.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Resumo da conversa até aqui: "
+                           f"{request_context.summary}"
+            })
+        if request_context:
+            messages.extend(request_context.history)
+        
         messages.append({"role": "user", "content": message})
+        return messages
+    
+    def _share_index(self, knowledge_base: "OpenAIAdapter"):
+        """Usa o índice, os caches e os conjuntos de sessão do outro adapter"""
+        self.embeddings = knowledge_base.embeddings
+        self.vector_store = knowledge_base.vector_store
+        self.index_version = knowledge_base.index_version
+        self.compressor = knowledge_base.compressor
+        self.working_set_min_score = knowledge_base.working_set_min_score
+        self._retrieval_cache = knowledge_base._retrieval_cache
+        self._session_retrievals = knowledge_base._session_retrievals
+        self._retrieval_lock = knowledge_base._retrieval_lock
+        self._working_sets = knowledge_base._working_sets
+    
+    def _get_client(self) -> OpenAI:
+        """Cliente compartilhado, criado na primeira chamada"""
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+    
+    def _create_client(self) -> OpenAI:
+        return OpenAI(api_key=self.api_key, max_retries=0)
+    
+    def _get_retry_policy(self, stage: str, model: str = "") -> RetryPolicy:
+        """Política de timeout/retentativa da etapa (por modelo)"""
+        with self._client_lock:
+            policy = self._retry_policies.get((stage, model))
+            if policy is None:
+                env_name, default, floor = STAGE_TIMEOUTS[stage]
+                ceiling = float(os.getenv(env_name, str(default)))
+                policy = RetryPolicy(
+                    stage,
+                    AdaptiveTimeout(
+                        initial=ceiling, floor=min(floor, ceiling),
+                        ceiling=ceiling,
+                        percentile=float(os.getenv("TIMEOUT_PERCENTILE",
+                                                   "99")),
+                        multiplier=float(os.getenv("TIMEOUT_MULTIPLIER",
+                                                   "2"))),
+                    self.retry_budget,
+                    max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+                    retry_on=RETRYABLE_ERRORS)
+                self._retry_policies[(stage, model)] = policy
+            return policy
+    
+    def generate_response(self, message: str, model: str,
+                          context: Optional[RequestContext] = None) -> str:
+        """
+        Gera resposta usando OpenAI API com contexto de embeddings
+        """
+        client = self._get_client()
+        messages = self._build_messages(message, context)
         
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages
-        )
+        with tracer.span("llm.generate", kind=SPAN_KIND_CLIENT,
+                         model=model):
+            response = self._get_retry_policy("completion", model).call(
+                lambda timeout: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout
+                ),
+                deadline=context.deadline if context else None)
+        if context is not None and response.usage:
+            context.usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
         return response.choices[0].message.content
         
         return self._simulate_openai_response(message, model)
     
+    def stream_response(self, message: str, model: str,
+                        context: Optional[RequestContext] = None
+                        ) -> Iterator[str]:
+        """
+        Gera resposta em streaming
+
+        O prompt é montado e a requisição é aberta já na chamada (no thread
+        da sessão), esperando o primeiro pedaço: até ele chegar a chamada
+        ainda pode ser repetida sem duplicar texto na tela. Depois disso a
+        leitura é preguiçosa.
+        """
+        client = self._get_client()
+        messages = self._build_messages(message, context)
+        
+        def open_stream(timeout: float) -> Iterator[str]:
+            chunks = self._iter_stream(client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                timeout=timeout
+            ))
+            first = next(chunks, None)
+            return chunks if first is None else chain([first], chunks)
+        
+        generation = tracer.start_span("llm.generate", kind=SPAN_KIND_CLIENT,
+                                       model=model, stream=True)
+        try:
+            with tracer.span("llm.first_token", parent=(
+                    generation.context if generation else None),
+                    kind=SPAN_KIND_CLIENT, model=model):
+                stream = self._get_retry_policy("first_token", model).call(
+                    open_stream,
+                    deadline=context.deadline if context else None)
+        except Exception as e:
+            if generation:
+                generation.record_error(e)
+            tracer.end_span(generation)
+            raise
+        return tracer.traced_stream(stream, generation)
+    
+    def extractive_answer(self, message: str,
+                          context: Optional[RequestContext] = None
+                          ) -> Optional[str]:
+        """
+        Resposta sem LLM: as frases mais relevantes dos trechos recuperados
+
+        Usada quando não há tempo para a geração. Retorna None sem índice.
+        """
+        session_id = context.session_id if context else None
+        question = (context.question if context and context.question
+                    else message)
+        parts = [text for text, _ in self.retrieve(message,
+                                                   session_id=session_id)]
+        if not parts:
+            return None
+        parts = self._fallback_compressor.compress(question, parts)
+        # Fragmentos soltos (títulos, separadores) não ajudam como resposta
+        parts = [" ".join(part.split()) for part in parts
+                 if len(part.split()) >= 4]
+        if not parts:
+            return None
+        return "\n\n".join("> " + part for part in parts)
+    
+    def complete(self, messages: List[dict], model: str,
+                 deadline: Optional[float] = None) -> str:
+        """Chamada direta à OpenAI, sem contexto dos documentos"""
+        client = self._get_client()
+        with tracer.span("llm.complete", kind=SPAN_KIND_CLIENT, model=model):
+            response = self._get_retry_policy("completion", model).call(
+                lambda timeout: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout
+                ),
+                deadline=deadline)
+        return response.choices[0].message.content
+    
+    @staticmethod
+    def _iter_stream(response) -> Iterator[str]:
+        """Extrai o texto de cada pedaço do stream da OpenAI"""
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def get_available_models(self) -> List[str]:
         """Retorna modelos disponíveis da OpenAI"""
         return self.available_models
     
+    def get_resilience_stats(self) -> dict:
+        """Retorna timeouts e retentativas por etapa e o orçamento"""
+        with self._client_lock:
+            policies = dict(self._retry_policies)
+        return {
+            "budget": self.retry_budget.get_stats(),
+            "stages": {f"{stage}/{model}" if model else stage:
+                       policy.get_stats()
+                       for (stage, model), policy in policies.items()}
+        }
+    
+    def get_embedding_stats(self) -> dict:
+        """Retorna métricas do micro-batching de embeddings de consultas"""
+        if isinstance(self.embeddings, EmbeddingBatcher):
+            return self.embeddings.get_stats()
+        return {}
+    
     def _simulate_openai_response(self, message: str, model: str) -> str:
         """Simula resposta da OpenAI para demonstração"""
         
@@ -250,6 +844,147 @@ class OpenAIAdapter(AIProviderInterface):
         return random.choice(generic_responses)
 
 
+class OpenAICompatibleAdapter(OpenAIAdapter):
+    """
+    Adapter para qualquer endpoint compatível com a API da OpenAI
+
+    Serve para um servidor de inferência na mesma máquina (vLLM, llama.cpp,
+    Ollama...) ou um stub de testes. Reaproveita o índice dos manuais de
+    outro adapter (knowledge_base) em vez de carregá-lo de novo, mantém um
+    cliente com pool de conexões e lista os modelos pelo próprio endpoint
+    (/models), consultado no máximo a cada models_ttl segundos.
+    """
+    
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 knowledge_base: Optional[OpenAIAdapter] = None,
+                 models: Optional[List[str]] = None,
+                 max_connections: int = 8, models_ttl: float = 60.0,
+                 models_timeout: float = 2.0):
+        super().__init__(
+            api_key=api_key,
+            embedding_provider=(knowledge_base.embeddings
+                                if knowledge_base else None),
+            load_index=knowledge_base is None)
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.models_ttl = models_ttl
+        self.models_timeout = models_timeout
+        # Lista usada até a primeira consulta ou com o endpoint fora do ar
+        self.available_models = list(models or [])
+        self._models_checked_at: Optional[float] = None
+        self._models_lock = threading.Lock()
+        if knowledge_base is not None:
+            self._share_index(knowledge_base)
+    
+    def _create_client(self) -> OpenAI:
+        # Servidores locais costumam aceitar qualquer chave
+        return OpenAI(
+            base_url=self.base_url,
+            api_key=self.api_key or "local",
+            max_retries=0,
+            http_client=DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections)))
+    
+    def get_available_models(self) -> List[str]:
+        """Modelos servidos pelo endpoint (com cache)"""
+        now = time.monotonic()
+        with self._models_lock:
+            if (self._models_checked_at is not None and
+                    now - self._models_checked_at < self.models_ttl):
+                return self.available_models
+            # Outras chamadas seguem com a lista atual durante a consulta
+            self._models_checked_at = now
+        try:
+            page = self._get_client().models.list(
+                timeout=self.models_timeout)
+            models = sorted(model.id for model in page.data)
+        except OpenAIError as e:
+            print(f"⚠️ Não foi possível listar os modelos de "
+                  f"{self.base_url}: {e}")
+            return self.available_models
+        with self._models_lock:
+            self.available_models = models
+        return models
+    
+    def _can_connect(self) -> bool:
+        # Servidores locais costumam aceitar qualquer chave
+        return True
+
+
+class MockAdapter(OpenAIAdapter):
+    """
+    Provedor simulado para benchmarks e testes de carga, sem rede
+
+    Recupera os trechos e monta o prompt exatamente como o adapter da
+    OpenAI (com o índice de knowledge_base), mas a geração é simulada pelo
+    perfil de latência: tempo até o primeiro token, tokens por segundo,
+    cauda pesada, erros e limites de requisição.
+    """
+    
+    def __init__(self, profile: LatencyProfile,
+                 knowledge_base: Optional[OpenAIAdapter] = None,
+                 seed: Optional[int] = None):
+        super().__init__(
+            embedding_provider=(knowledge_base.embeddings
+                                if knowledge_base else None),
+            load_index=knowledge_base is None)
+        if knowledge_base is not None:
+            self._share_index(knowledge_base)
+        self.available_models = list(profile.models)
+        self.llm = SimulatedLLM(profile, seed)
+    
+    def _can_connect(self) -> bool:
+        return False  # Nada a conectar: a geração é simulada
+    
+    @staticmethod
+    def _prompt(messages: List[dict]) -> str:
+        return "\n".join(message["content"] for message in messages)
+    
+    def generate_response(self, message: str, model: str,
+                          context: Optional[RequestContext] = None) -> str:
+        prompt = self._prompt(self._build_messages(message, context))
+        with tracer.span("llm.generate", kind=SPAN_KIND_CLIENT,
+                         model=model):
+            answer = self.llm.complete(
+                prompt, deadline=context.deadline if context else None)
+        if context is not None:
+            context.usage = self.llm.usage(prompt, answer)
+        return answer
+    
+    def stream_response(self, message: str, model: str,
+                        context: Optional[RequestContext] = None
+                        ) -> Iterator[str]:
+        """Como no adapter real, a chamada espera o primeiro token"""
+        prompt = self._prompt(self._build_messages(message, context))
+        generation = tracer.start_span("llm.generate", kind=SPAN_KIND_CLIENT,
+                                       model=model, stream=True)
+        try:
+            with tracer.span("llm.first_token", parent=(
+                    generation.context if generation else None),
+                    kind=SPAN_KIND_CLIENT, model=model):
+                chunks = self.llm.stream(
+                    prompt, deadline=context.deadline if context else None)
+                first = next(chunks, None)
+        except Exception as e:
+            if generation:
+                generation.record_error(e)
+            tracer.end_span(generation)
+            raise
+        return tracer.traced_stream(
+            chunks if first is None else chain([first], chunks), generation)
+    
+    def complete(self, messages: List[dict], model: str,
+                 deadline: Optional[float] = None) -> str:
+        with tracer.span("llm.complete", kind=SPAN_KIND_CLIENT, model=model):
+            return self.llm.complete(self._prompt(messages),
+                                     deadline=deadline)
+    
+    def get_mock_stats(self) -> dict:
+        """Requisições, erros e limites sorteados"""
+        return self.llm.get_stats()
+
+
 class ClaudeAdapter(AIProviderInterface):
     """Adapter para Claude API"""
     
@@ -259,11 +994,19 @@ class ClaudeAdapter(AIProviderInterface):
             "Claude-3", "Claude-3-Sonnet", "Claude-3-Opus"
         ]
     
-    def generate_response(self, message: str, model: str) -> str:
+    def generate_response(self, message: str, model: str,
+                          context: Optional[RequestContext] = None) -> str:
         """Gera resposta usando Claude API"""
         time.sleep(random.uniform(0.3, 1.5))
         return f"[{model}] Resposta simulada do Claude para: {message}"
     
+    def complete(self, messages: List[dict], model: str,
+                 deadline: Optional[float] = None) -> str:
+        """Chamada direta simulada ao Claude"""
+        time.sleep(random.uniform(0.3, 1.5))
+        return (f"[{model}] Resposta simulada do Claude para: "
+                f"{messages[-1]['content'] if messages else ''}")
+    
     def get_available_models(self) -> List[str]:
         return self.available_models
 
@@ -276,19 +1019,252 @@ class AIService:
             "openai": OpenAIAdapter(),
             "claude": ClaudeAdapter()
         }
-        self.current_provider = "openai"
+        # Endpoint compatível com a OpenAI (ex.: servidor de inferência
+        # local), com o mesmo índice dos manuais
+        local_base_url = os.getenv("LOCAL_LLM_BASE_URL")
+        if local_base_url:
+            self.providers["local"] = OpenAICompatibleAdapter(
+                local_base_url,
+                api_key=os.getenv("LOCAL_LLM_API_KEY"),
+                knowledge_base=self.providers["openai"],
+                max_connections=int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+            )
+        # Provedor simulado para testes de carga (perfil por nome ou JSON)
+        mock_profile = os.getenv("MOCK_LLM_PROFILE")
+        if mock_profile:
+            self.providers["mock"] = MockAdapter(
+                LatencyProfile.from_spec(mock_profile),
+                knowledge_base=self.providers["openai"])
+        self.set_provider(os.getenv("LLM_PROVIDER", "openai"))
+        # Perguntas idênticas simultâneas compartilham uma única chamada
+        self.single_flight = SingleFlight()
+        # Escolha do provedor por latência/erros, com hedging opcional
+        hedge_after_ms = float(os.getenv("ROUTER_HEDGE_AFTER_MS", "0"))
+        self.router = ProviderRouter(
+            self.providers,
+            hedge_after_ms=hedge_after_ms or None,
+            allow_model_fallback=os.getenv("ROUTER_MODEL_FALLBACK") == "1"
+        )
+        # Limite de chamadas simultâneas aos provedores, com fila e prazo
+        self.executor = BoundedExecutor(
+            max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+            default_timeout=float(os.getenv("LLM_REQUEST_TIMEOUT_S", "120"))
+        )
     
     def set_provider(self, provider_name: str):
-        """Define o provedor de IA atual"""
+        """Define o provedor de IA preferido por padrão"""
         if provider_name in self.providers:
             self.current_provider = provider_name
         else:
             raise ValueError(f"Provedor {provider_name} não disponível")
     
-    def get_response(self, message: str, model: str) -> str:
-        """Obtém resposta do provedor atual"""
-        provider = self.providers[self.current_provider]
-        return provider.generate_response(message, model)
+    def get_response(self, message: str, model: str,
+                     provider: Optional[str] = None,
+                     context: Optional[RequestContext] = None) -> str:
+        """
+        Obtém resposta do melhor provedor disponível
+
+        provider indica a preferência da sessão (padrão: current_provider);
+        o roteador pode escolher outro se o preferido estiver lento ou fora.
+        """
+        preferred = provider or self.current_provider
+        key = make_request_key(message, model, preferred,
+                               *self._context_key(context))
+        timeout = context.remaining_time() if context else None
+        return self.single_flight.do(key, lambda: self.executor.run(
+            lambda: self.router.route(
+                model,
+                lambda p, routed_model: p.generate_response(
+                    message, routed_model, context),
+                preferred=preferred
+            ),
+            timeout=timeout
+        ), timeout=timeout)
+    
+    def stream_response(self, message: str, model: str,
+                        provider: Optional[str] = None,
+                        context: Optional[RequestContext] = None
+                        ) -> Iterator[str]:
+        """Obtém resposta do melhor provedor disponível em streaming"""
+        preferred = provider or self.current_provider
+        key = make_request_key(message, model, preferred,
+                               *self._context_key(context))
+        timeout = context.remaining_time() if context else None
+        return self.single_flight.do_stream(
+            key, lambda: self.executor.run_stream(
+                lambda: self.router.route_stream(
+                    model,
+                    lambda p, routed_model: p.stream_response(
+                        message, routed_model, context),
+                    preferred=preferred
+                ),
+                timeout=timeout
+            ), timeout=timeout)
+    
+    def complete(self, messages: List[dict], model: str,
+                 provider: Optional[str] = None,
+                 deadline: Optional[float] = None) -> str:
+        """
+        Chamada direta ao modelo (sem recuperação), com roteamento
+
+        Com deadline (time.monotonic()) a espera na fila, a chamada e as
+        retentativas terminam nele, com DeadlineExceededError.
+        """
+        timeout = (None if deadline is None
+                   else max(0.0, deadline - time.monotonic()))
+        return self.executor.run(lambda: self.router.route(
+            model,
+            lambda p, routed_model: p.complete(messages, routed_model,
+                                               deadline),
+            preferred=provider or self.current_provider
+        ), timeout=timeout)
+    
+    @staticmethod
+    def _context_key(context: Optional[RequestContext]) -> Tuple[str, ...]:
+        """
+        Veículo e histórico fazem parte da chave: o prompt depende deles
+        """
+        if context is None:
+            return ()
+        key = []
+        if context.has_vehicle():
+            key.extend((context.vehicle_year, context.vehicle_version))
+        if context.history or context.summary:
+            digest = hashlib.sha256(context.summary.encode("utf-8"))
+            for turn in context.history:
+                digest.update(f"\x1e{turn['role']}\x1f{turn['content']}"
+                              .encode("utf-8"))
+            key.append(digest.hexdigest()[:16])
+        return tuple(key)
+    
+    def get_index_version(self) -> str:
+        """Versão do índice de documentos do provedor atual"""
+        adapter = self.providers[self.current_provider]
+        return getattr(adapter, "index_version", "")
+    
+    def get_coalescing_stats(self) -> dict:
+        """Retorna quantas chamadas ao provedor foram economizadas"""
+        return self.single_flight.get_stats()
+    
+    def get_retrieval_confidence(self, message: str,
+                                 provider: Optional[str] = None,
+                                 session_id: Optional[str] = None
+                                 ) -> Tuple[Optional[float], str]:
+        """
+        Confiança da recuperação para a mensagem
+
+        Retorna a similaridade do melhor trecho (None se o provedor não faz
+        recuperação) e o nome do provedor de embeddings usado.
+        """
+        adapter = self.providers[provider or self.current_provider]
+        if not hasattr(adapter, "get_retrieval_confidence"):
+            return None, ""
+        embeddings = getattr(adapter, "embeddings", None)
+        return (adapter.get_retrieval_confidence(message, session_id),
+                embeddings.name if embeddings else "")
+    
+    def get_session_retrieval_stats(self, session_id: str,
+                                    provider: Optional[str] = None) -> dict:
+        """Taxa de acerto do conjunto de trabalho da sessão na recuperação"""
+        adapter = self.providers[provider or self.current_provider]
+        if not hasattr(adapter, "get_session_retrieval_stats"):
+            return {}
+        return adapter.get_session_retrieval_stats(session_id)
+    
+    def get_session_memory(self, session_id: str,
+                           provider: Optional[str] = None) -> int:
+        """Bytes que o provedor guarda para a sessão (conjunto de trabalho)"""
+        adapter = self.providers[provider or self.current_provider]
+        if not hasattr(adapter, "get_session_memory"):
+            return 0
+        return adapter.get_session_memory(session_id)
+    
+    def release_session(self, session_id: str):
+        """Libera o que os provedores guardam para a sessão"""
+        for adapter in self.providers.values():
+            if hasattr(adapter, "release_session"):
+                adapter.release_session(session_id)
+    
+    def warm_up_index(self) -> dict:
+        """Traz para a memória o índice (compartilhado) dos provedores"""
+        touched = {}
+        for adapter in self.providers.values():
+            store = getattr(adapter, "vector_store", None)
+            if store is not None and id(store) not in touched:
+                touched[id(store)] = adapter.touch_index()
+        return next(iter(touched.values()), {})
+    
+    def warm_up_connections(self, timeout: float = 5.0) -> Dict[str, str]:
+        """Abre as conexões dos provedores remotos: {provedor: resultado}"""
+        results = {}
+        for name, adapter in self.providers.items():
+            if not hasattr(adapter, "warm_up_connection"):
+                continue
+            try:
+                results[name] = ("ok" if adapter.warm_up_connection(timeout)
+                                 else "skipped")
+            except Exception as e:
+                results[name] = f"error: {type(e).__name__}"
+        return results
+    
+    def prefetch_retrieval(self, messages: List[str],
+                           provider: Optional[str] = None):
+        """Antecipa a recuperação de um lote de mensagens, se suportado"""
+        adapter = self.providers[provider or self.current_provider]
+        if hasattr(adapter, "prefetch_retrieval"):
+            adapter.prefetch_retrieval(messages)
+    
+    def get_extractive_answer(self, message: str,
+                              context: Optional[RequestContext] = None,
+                              provider: Optional[str] = None) -> str:
+        """
+        Resposta de contingência, só com os trechos do manual
+
+        Sempre identificada como automática, para não ser confundida com
+        uma resposta do modelo.
+        """
+        # O provedor preferido primeiro; senão, qualquer um com índice
+        preferred = provider or self.current_provider
+        names = [preferred] + [n for n in self.providers if n != preferred]
+        passages = None
+        for name in names:
+            adapter = self.providers[name]
+            if hasattr(adapter, "extractive_answer"):
+                passages = adapter.extractive_answer(message, context)
+            if passages:
+                break
+        if not passages:
+            return ("⏱️ O assistente não conseguiu responder a tempo. "
+                    "Tente novamente em alguns instantes.")
+        return ("⏱️ **Resposta automática com trechos do manual** — o "
+                "assistente não respondeu a tempo; seguem as passagens "
+                "mais relevantes encontradas:\n\n" + passages)
+    
+    def estimate_latency(self, model: str, provider: Optional[str] = None,
+                         pct: float = 10) -> Optional[float]:
+        """
+        Percentil de latência observado (s) do modelo no provedor preferido
+
+        O padrão é um percentil baixo (respostas rápidas): só se nem elas
+        caberiam no prazo vale a pena desistir do modelo de antemão.
+        """
+        return self.router.get_latency(provider or self.current_provider,
+                                       model, pct)
+    
+    def get_admission_stats(self) -> dict:
+        """Retorna fila, tempo de espera e recusas das chamadas"""
+        return self.executor.get_stats()
+    
+    def get_resilience_stats(self) -> dict:
+        """Retorna timeouts adaptativos e retentativas por provedor"""
+        return {name: provider.get_resilience_stats()
+                for name, provider in self.providers.items()
+                if hasattr(provider, "get_resilience_stats")}
+    
+    def get_routing_stats(self) -> dict:
+        """Retorna latência, erros e circuitos por provedor/modelo"""
+        return self.router.get_stats()
     
     def get_available_models(self) -> List[str]:
         """Retorna modelos disponíveis do provedor atual"""
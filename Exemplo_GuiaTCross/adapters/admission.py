@@ -0,0 +1,244 @@
+"""
+Controle de admissão e execução limitada das chamadas aos provedores
+Seguindo princípios de Clean Architecture
+"""
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Iterator, Optional, TypeVar
+
+from .metrics import metrics
+from .profiling import profiler
+
+# Threads de trabalho precisam do contexto do Streamlit para ler
+# st.session_state; fora do Streamlit a propagação é ignorada
+try:
+    from streamlit.runtime.scriptrunner import (add_script_run_ctx,
+                                                get_script_run_ctx)
+except ImportError:
+    add_script_run_ctx = None
+    get_script_run_ctx = None
+
+T = TypeVar("T")
+
+_STREAM_END = object()
+
+QUEUE_WAIT = metrics.histogram(
+    "tcross_admission_wait_seconds",
+    "Espera na fila antes da chamada ao provedor")
+REJECTED = metrics.counter(
+    "tcross_admission_rejected_total",
+    "Chamadas recusadas ou abandonadas pela admissão", ("reason",))
+QUEUE_DEPTH = metrics.gauge(
+    "tcross_admission_queue_depth", "Chamadas esperando na fila")
+IN_FLIGHT = metrics.gauge(
+    "tcross_admission_in_flight", "Chamadas aos provedores em execução")
+
+
+class ProviderBusyError(RuntimeError):
+    """Fila de chamadas cheia: a requisição foi recusada sem esperar"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """O prazo da requisição terminou antes da resposta"""
+
+
+def with_script_context(fn: Callable[[], T]) -> Callable[[], T]:
+    """
+    Embrulha fn para rodar em outro thread com o contexto da sessão
+
+    Leva também as ContextVars do thread atual (o span ativo do tracing)
+    e, se a requisição está sendo perfilada, inclui o thread no perfil.
+    """
+    ctx = (get_script_run_ctx(suppress_warning=True)
+           if get_script_run_ctx else None)
+    context = contextvars.copy_context()
+    fn = profiler.bind(fn)
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return context.run(fn)
+
+    return run
+
+
+class BoundedExecutor:
+    """
+    Pool limitado para as chamadas aos provedores, com fila de espera
+
+    No máximo max_concurrent chamadas rodam ao mesmo tempo e até max_queue
+    esperam por uma vaga; além disso a requisição é recusada na hora com
+    ProviderBusyError. Cada requisição tem um prazo: se ele acaba na fila,
+    a chamada nem começa; se acaba durante a chamada, quem espera recebe
+    DeadlineExceededError (a chamada termina em segundo plano e só então
+    libera a vaga, para o limite valer também para o provedor).
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32,
+                 default_timeout: float = 120.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                            thread_name_prefix="provider")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._wait_times = deque(maxlen=500)
+        self.completed = 0
+        self.rejected = 0
+        self.expired_in_queue = 0
+        self.timed_out = 0
+        # Lidos na coleta; vale o executor criado por último
+        QUEUE_DEPTH.set_function(lambda: self._queued)
+        IN_FLIGHT.set_function(lambda: self._running)
+
+    def _admit(self):
+        """Reserva um lugar na fila ou recusa a requisição"""
+        with self._lock:
+            # Limite total: vagas de execução + fila (tarefas que o pool
+            # ainda não começou contam como em fila)
+            if self._queued + self._running >= (self.max_concurrent +
+                                                self.max_queue):
+                self.rejected += 1
+                REJECTED.inc(reason="queue_full")
+                raise ProviderBusyError(
+                    "Assistente ocupado: muitas perguntas em andamento. "
+                    "Tente novamente em alguns segundos.")
+            self._queued += 1
+
+    def _start(self, enqueued_at: float, deadline: float) -> bool:
+        """Sai da fila; retorna False se o prazo já acabou"""
+        now = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._wait_times.append(now - enqueued_at)
+            if now >= deadline:
+                self.expired_in_queue += 1
+                REJECTED.inc(reason="expired_in_queue")
+                return False
+            self._running += 1
+        QUEUE_WAIT.observe(now - enqueued_at)
+        return True
+
+    def _finish(self):
+        with self._lock:
+            self._running -= 1
+            self.completed += 1
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (self.default_timeout
+                                   if timeout is None else timeout)
+
+    def run(self, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """Executa fn no pool e espera o resultado até o prazo"""
+        deadline = self._deadline(timeout)
+        self._admit()
+        enqueued_at = time.monotonic()
+        fn = with_script_context(fn)
+
+        def task():
+            if not self._start(enqueued_at, deadline):
+                raise DeadlineExceededError("Prazo esgotado na fila")
+            try:
+                return fn()
+            finally:
+                self._finish()
+
+        future = self._executor.submit(task)
+        try:
+            return future.result(timeout=max(0.0,
+                                             deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # Ainda na fila: cancelar; já em execução: só parar de esperar
+            if not future.cancel():
+                with self._lock:
+                    self.timed_out += 1
+                REJECTED.inc(reason="timed_out")
+            else:
+                with self._lock:
+                    self._queued -= 1
+                    self.expired_in_queue += 1
+                REJECTED.inc(reason="expired_in_queue")
+            raise DeadlineExceededError("Prazo da requisição esgotado")
+
+    def run_stream(self, fn: Callable[[], Iterator[str]],
+                   timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Versão para streaming
+
+        O stream inteiro é consumido dentro do pool (ocupando a vaga até o
+        fim) e os pedaços chegam ao chamador por uma fila. A recusa por
+        fila cheia acontece já na chamada; os demais erros, na leitura.
+        """
+        deadline = self._deadline(timeout)
+        self._admit()
+        enqueued_at = time.monotonic()
+        chunks: "queue.Queue" = queue.Queue()
+
+        def task():
+            if not self._start(enqueued_at, deadline):
+                chunks.put(DeadlineExceededError("Prazo esgotado na fila"))
+                return
+            try:
+                for chunk in fn():
+                    chunks.put(chunk)
+                chunks.put(_STREAM_END)
+            except BaseException as e:
+                chunks.put(e)
+            finally:
+                self._finish()
+
+        # O contexto vale para a leitura do stream inteiro, não só para
+        # a chamada que o cria
+        self._executor.submit(with_script_context(task))
+        return self._read_stream(chunks, deadline)
+
+    def _read_stream(self, chunks: "queue.Queue",
+                     deadline: float) -> Iterator[str]:
+        while True:
+            try:
+                item = chunks.get(timeout=max(0.0,
+                                              deadline - time.monotonic()))
+            except queue.Empty:
+                with self._lock:
+                    self.timed_out += 1
+                REJECTED.inc(reason="timed_out")
+                raise DeadlineExceededError("Prazo da requisição esgotado")
+            if item is _STREAM_END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def get_stats(self) -> dict:
+        """Retorna profundidade da fila, espera e recusas"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            queued, running = self._queued, self._running
+            counts = {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired_in_queue": self.expired_in_queue,
+                "timed_out": self.timed_out
+            }
+
+        def percentile(pct):
+            if not waits:
+                return 0.0
+            return round(waits[int(pct / 100 * (len(waits) - 1))] * 1000, 1)
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_depth": queued,
+            "in_flight": running,
+            "wait_p50_ms": percentile(50),
+            "wait_p95_ms": percentile(95),
+            **counts
+        }
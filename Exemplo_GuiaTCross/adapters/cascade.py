@@ -0,0 +1,201 @@
+"""
+Cascata de modelos: perguntas simples vão para um modelo rápido
+Seguindo princípios de Clean Architecture
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import metrics
+
+# Preço por 1M de tokens (entrada, saída) em USD, para estimar custo
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "o1": (15.00, 60.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Similaridade mínima do melhor trecho recuperado, por provedor de
+# embeddings (as escalas de cosseno de cada provedor são bem diferentes)
+DEFAULT_MIN_CONFIDENCE = {
+    "openai": 0.80,
+    "local": 0.30,
+}
+
+CASCADE_PATHS = metrics.counter(
+    "tcross_cascade_total",
+    "Perguntas por caminho da cascata (fast_answered, escalated, "
+    "strong_direct)", ("path",))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira de tokens (~4 caracteres por token)"""
+    return max(1, len(text) // 4)
+
+
+def estimate_cost(model: str, prompt: str, answer: str,
+                  prompt_overhead_tokens: int = 0) -> float:
+    """Custo estimado em USD de uma chamada"""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    prompt_tokens = estimate_tokens(prompt) + prompt_overhead_tokens
+    return (prompt_tokens * input_price +
+            estimate_tokens(answer) * output_price) / 1_000_000
+
+
+@dataclass
+class CascadeDecision:
+    """Decisão do classificador para uma pergunta"""
+    use_fast_model: bool
+    reason: str
+
+
+class QueryComplexityClassifier:
+    """
+    Classificador local e barato da dificuldade da pergunta
+
+    Uma pergunta vai para o modelo rápido quando é curta, não tem marcas
+    de raciocínio (comparações, "por que", passo a passo...) e a busca nos
+    manuais encontrou um trecho com boa similaridade.
+    """
+
+    COMPLEX_PATTERNS = [
+        r'\bpor\s*qu[eê]\b',
+        r'\bcompar\w*',
+        r'\bdiferen[çc]\w*',
+        r'\bexpli\w*',
+        r'\bmelhor\b',
+        r'\bvale\s+a\s+pena\b',
+        r'\brecomend\w*',
+        r'\bpasso\s+a\s+passo\b',
+        r'\bcomo\s+funciona\w*',
+        r'\bo\s+que\s+acontece\b',
+        r'\bdevo\b',
+    ]
+
+    def __init__(self, max_words: int = 25,
+                 min_confidence: Optional[float] = None):
+        self.max_words = max_words
+        self.min_confidence = min_confidence
+        self._complex = re.compile("|".join(self.COMPLEX_PATTERNS),
+                                   re.IGNORECASE)
+
+    def classify(self, question: str,
+                 retrieval_confidence: Optional[float],
+                 embeddings_name: str = "openai") -> CascadeDecision:
+        """Decide se o modelo rápido deve tentar responder"""
+        if len(question.split()) > self.max_words:
+            return CascadeDecision(False, "pergunta longa")
+        if question.count("?") > 1:
+            return CascadeDecision(False, "várias perguntas")
+        if self._complex.search(question):
+            return CascadeDecision(False, "exige raciocínio")
+
+        min_confidence = self.min_confidence
+        if min_confidence is None:
+            min_confidence = DEFAULT_MIN_CONFIDENCE.get(embeddings_name, 0.8)
+        if retrieval_confidence is None:
+            return CascadeDecision(False, "sem contexto recuperado")
+        if retrieval_confidence < min_confidence:
+            return CascadeDecision(False, "contexto pouco similar")
+        return CascadeDecision(True, "pergunta factual com bom contexto")
+
+
+class AnswerConfidenceChecker:
+    """Verifica se a resposta do modelo rápido é aproveitável"""
+
+    LOW_CONFIDENCE_PATTERNS = [
+        r'n[ãa]o\s+(?:tenho|possuo)\s+(?:essa|esta|a)\s+informa[çc][ãa]o',
+        r'n[ãa]o\s+(?:sei|encontrei|consigo|foi\s+poss[ií]vel)',
+        r'n[ãa]o\s+est[áa]\s+(?:no|nos)\s+(?:contexto|documentos?)',
+        r'n[ãa]o\s+tenho\s+certeza',
+        r'n[ãa]o\s+(?:h[áa]|existe)\s+informa[çc][õo]es?',
+    ]
+
+    def __init__(self, min_length: int = 20):
+        self.min_length = min_length
+        self._low_confidence = re.compile(
+            "|".join(self.LOW_CONFIDENCE_PATTERNS), re.IGNORECASE)
+
+    def is_confident(self, answer: str) -> bool:
+        if not answer or len(answer.strip()) < self.min_length:
+            return False
+        return not self._low_confidence.search(answer)
+
+
+class ModelCascade:
+    """
+    Estágio de cascata entre um modelo rápido e um modelo forte
+
+    O classificador decide se o modelo rápido tenta primeiro; se a resposta
+    dele não passar na verificação de confiança, a pergunta sobe para o
+    modelo forte.
+    """
+
+    def __init__(self, fast_model: str = "gpt-4o-mini",
+                 strong_model: str = "o1",
+                 classifier: Optional[QueryComplexityClassifier] = None,
+                 checker: Optional[AnswerConfidenceChecker] = None,
+                 prompt_overhead_tokens: int = 900):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.classifier = classifier or QueryComplexityClassifier()
+        self.checker = checker or AnswerConfidenceChecker()
+        # Prompt de sistema + trechos do manual enviados junto da pergunta
+        self.prompt_overhead_tokens = prompt_overhead_tokens
+        self._lock = threading.Lock()
+        self.stats = {
+            "fast_answered": 0,
+            "escalated": 0,
+            "strong_direct": 0,
+            "estimated_cost_usd": 0.0,
+        }
+
+    def run(self, question: str, generate: Callable[[str], str],
+            retrieval_confidence: Optional[float] = None,
+            embeddings_name: str = "openai",
+            prompt: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Responde a pergunta pela cascata
+
+        generate(modelo) faz a chamada ao provedor. Retorna a resposta e o
+        modelo que a produziu. question é só a pergunta do usuário, que o
+        classificador avalia; prompt é a mensagem enviada (com o veículo),
+        usada na estimativa de custo (padrão: a própria pergunta).
+        """
+        decision = self.classifier.classify(
+            question, retrieval_confidence, embeddings_name)
+        prompt = prompt or question
+
+        if decision.use_fast_model:
+            answer = generate(self.fast_model)
+            self._add_cost(self.fast_model, prompt, answer)
+            if self.checker.is_confident(answer):
+                self._count("fast_answered")
+                return answer, self.fast_model
+            self._count("escalated")
+        else:
+            self._count("strong_direct")
+
+        answer = generate(self.strong_model)
+        self._add_cost(self.strong_model, prompt, answer)
+        return answer, self.strong_model
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+        CASCADE_PATHS.inc(path=key)
+
+    def _add_cost(self, model: str, prompt: str, answer: str):
+        with self._lock:
+            self.stats["estimated_cost_usd"] += estimate_cost(
+                model, prompt, answer, self.prompt_overhead_tokens)
+
+    def get_stats(self) -> dict:
+        """Retorna contagem por caminho da cascata e custo estimado"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = (stats["fast_answered"] + stats["escalated"] +
+                 stats["strong_direct"])
+        stats["fast_ratio"] = (round(stats["fast_answered"] / total, 3)
+                               if total else 0.0)
+        return stats
@@ -0,0 +1,129 @@
+"""
+Compressão extrativa do contexto recuperado antes do prompt
+Seguindo princípios de Clean Architecture
+"""
+import math
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from .cascade import estimate_tokens
+from .embeddings import EmbeddingProviderInterface, LocalHashingEmbeddingProvider
+from .faq import question_tokens
+from .metrics import metrics
+
+TOKENS = metrics.counter(
+    "tcross_compression_tokens_total",
+    "Tokens de contexto antes (original) e depois (compressed) da "
+    "compressão", ("stage",))
+
+# Fim de frase, parágrafo ou início de item de lista
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n|\n(?=\s*[–●•-]\s)")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Divide um trecho em frases (ou itens de lista), sem as vazias"""
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+
+class ContextCompressor:
+    """
+    Mantém só as frases dos trechos recuperados mais ligadas à pergunta
+
+    Cada frase recebe uma nota que combina a cobertura léxica dos termos da
+    pergunta (ponderados por IDF entre as frases do contexto) e a
+    similaridade de embeddings com a pergunta. As melhores são mantidas até
+    o orçamento (ratio dos tokens originais ou max_tokens) e devolvidas na
+    ordem original, agrupadas pelo trecho de origem.
+
+    Os embeddings de frases são calculados localmente (hashing em CPU) por
+    padrão, para não acrescentar chamadas remotas ao caminho da resposta.
+    """
+
+    def __init__(self, ratio: float = 0.5, max_tokens: Optional[int] = None,
+                 lexical_weight: float = 0.5,
+                 embeddings: Optional[EmbeddingProviderInterface] = None):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.lexical_weight = lexical_weight
+        self.embeddings = embeddings or LocalHashingEmbeddingProvider()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.original_tokens = 0
+        self.compressed_tokens = 0
+
+    def compress(self, query: str, chunks: List[str]) -> List[str]:
+        """Retorna os trechos reduzidos às frases selecionadas"""
+        sentences = []  # (índice do trecho, frase)
+        for chunk_index, chunk in enumerate(chunks):
+            sentences.extend((chunk_index, sentence)
+                             for sentence in split_sentences(chunk))
+        if not sentences:
+            return chunks
+
+        texts = [sentence for _, sentence in sentences]
+        tokens = [estimate_tokens(text) for text in texts]
+        original = sum(estimate_tokens(chunk) for chunk in chunks)
+        budget = (self.max_tokens if self.max_tokens
+                  else math.ceil(original * self.ratio))
+
+        scores = self.score(query, texts)
+        selected, used = set(), 0
+        for index in np.argsort(-scores):
+            if selected and used + tokens[index] > budget:
+                continue
+            selected.add(int(index))
+            used += tokens[index]
+
+        compressed = []
+        for chunk_index in range(len(chunks)):
+            kept = [texts[i] for i in sorted(selected)
+                    if sentences[i][0] == chunk_index]
+            if kept:
+                compressed.append(" ".join(kept))
+
+        compressed_tokens = sum(estimate_tokens(part) for part in compressed)
+        with self._lock:
+            self.calls += 1
+            self.original_tokens += original
+            self.compressed_tokens += compressed_tokens
+        TOKENS.inc(original, stage="original")
+        TOKENS.inc(compressed_tokens, stage="compressed")
+        return compressed
+
+    def score(self, query: str, sentences: List[str]) -> np.ndarray:
+        """Nota de cada frase: léxica (IDF) + similaridade de embeddings"""
+        query_terms = question_tokens(query)
+        sentence_terms = [question_tokens(sentence) for sentence in sentences]
+
+        lexical = np.zeros(len(sentences))
+        if query_terms:
+            total = len(sentences)
+            idf = {term: math.log(1 + total / (1 + sum(
+                       term in terms for terms in sentence_terms)))
+                   for term in query_terms}
+            query_weight = sum(idf.values())
+            for i, terms in enumerate(sentence_terms):
+                lexical[i] = sum(idf[t] for t in query_terms & terms)
+            lexical /= query_weight
+
+        vectors = np.asarray(self.embeddings.embed_documents(sentences))
+        query_vector = np.asarray(self.embeddings.embed_query(query))
+        semantic = np.clip(vectors @ query_vector, 0.0, 1.0)
+
+        return (self.lexical_weight * lexical +
+                (1 - self.lexical_weight) * semantic)
+
+    def get_stats(self) -> dict:
+        """Retorna tokens de contexto antes e depois da compressão"""
+        with self._lock:
+            saved = self.original_tokens - self.compressed_tokens
+            return {
+                "calls": self.calls,
+                "original_tokens": self.original_tokens,
+                "compressed_tokens": self.compressed_tokens,
+                "saved_ratio": (round(saved / self.original_tokens, 3)
+                                if self.original_tokens else 0.0)
+            }
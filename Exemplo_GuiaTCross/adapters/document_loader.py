@@ -0,0 +1,150 @@
+"""
+Carregamento de documentos em streaming para geração de embeddings
+Seguindo princípios de Clean Architecture
+"""
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+except ImportError:
+    RecursiveCharacterTextSplitter = None
+
+
+# Tamanho máximo (em caracteres) de cada segmento lido do disco
+DEFAULT_SEGMENT_SIZE = 128 * 1024
+
+# Quantos segmentos por worker podem estar em processamento ao mesmo tempo
+MAX_PENDING_PER_WORKER = 2
+
+# Splitter de cada processo do pool (criado no initializer)
+_worker_splitter = None
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int):
+    """Cria o splitter uma única vez em cada processo do pool"""
+    global _worker_splitter
+    _worker_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+
+
+def _split_segment(segment: str) -> List[str]:
+    """Divide um segmento em chunks dentro do processo worker"""
+    return _worker_splitter.split_text(segment)
+
+
+def iter_file_segments(file_path: Path,
+                       segment_size: int = DEFAULT_SEGMENT_SIZE
+                       ) -> Iterator[str]:
+    """
+    Lê um arquivo em segmentos de tamanho limitado
+
+    Os cortes são feitos preferencialmente em quebras de parágrafo (ou de
+    linha), para que o splitter não receba frases partidas ao meio. O
+    primeiro segmento recebe o cabeçalho com o nome do arquivo.
+    """
+    header = f"[ARQUIVO: {file_path.name}]\n"
+    buffer = header
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            block = f.read(segment_size)
+            if not block:
+                break
+            buffer += block
+            while len(buffer) >= segment_size:
+                cut = buffer.rfind("\n\n", 0, segment_size)
+                if cut <= 0:
+                    cut = buffer.rfind("\n", 0, segment_size)
+                if cut <= 0:
+                    cut = segment_size
+                yield buffer[:cut]
+                buffer = buffer[cut:].lstrip("\n")
+    if buffer.strip():
+        yield buffer
+
+
+def iter_document_chunks(file_paths: Iterable[Path],
+                         chunk_size: int = 1000,
+                         chunk_overlap: int = 200,
+                         segment_size: int = DEFAULT_SEGMENT_SIZE,
+                         max_workers: Optional[int] = None
+                         ) -> Iterator[str]:
+    """
+    Gera os chunks de todos os arquivos em streaming
+
+    Os segmentos são divididos em um pool de processos, com um número
+    limitado de segmentos pendentes, e os chunks são devolvidos na ordem
+    original dos arquivos. Com max_workers=1 a divisão é feita no próprio
+    processo.
+    """
+    if RecursiveCharacterTextSplitter is None:
+        raise ImportError("Langchain é necessário para dividir documentos")
+
+    workers = max_workers or os.cpu_count() or 1
+    segments = _iter_segments_with_log(file_paths, segment_size)
+
+    if workers <= 1:
+        _init_worker(chunk_size, chunk_overlap)
+        for segment in segments:
+            yield from _split_segment(segment)
+        return
+
+    max_pending = workers * MAX_PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(chunk_size, chunk_overlap)) as pool:
+        pending = deque()
+        for segment in segments:
+            pending.append(pool.submit(_split_segment, segment))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _iter_segments_with_log(file_paths: Iterable[Path],
+                            segment_size: int) -> Iterator[str]:
+    """Percorre os segmentos de cada arquivo, registrando erros e progresso"""
+    for file_path in file_paths:
+        try:
+            yield from iter_file_segments(file_path, segment_size)
+            print(f"📖 Processado: {file_path.name}")
+        except Exception as e:
+            print(f"❌ Erro ao processar {file_path}: {e}")
+
+
+def iter_batches(items: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    """Agrupa um iterável em listas de até batch_size itens"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def compute_index_version(file_paths: Iterable[Path], *params) -> str:
+    """
+    Identificador curto da versão do índice
+
+    Muda quando o conteúdo ou o nome de algum arquivo muda, ou quando os
+    parâmetros do índice (provedor, chunking) mudam. Usa o conteúdo e não
+    a data de modificação, que muda a cada checkout ou cópia.
+    """
+    digest = hashlib.sha256()
+    for param in params:
+        digest.update(f"{param}\n".encode("utf-8"))
+    for file_path in sorted(file_paths):
+        digest.update(f"{file_path.name}\n".encode("utf-8"))
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
@@ -0,0 +1,160 @@
+"""
+Micro-batching de embeddings de consultas concorrentes
+Seguindo princípios de Clean Architecture
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .embeddings import EmbeddingProviderInterface
+from .metrics import metrics
+
+BATCH_SIZE = metrics.histogram(
+    "tcross_embedding_batch_size", "Consultas por lote de embeddings",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+class _PendingQuery:
+    """Consulta aguardando o próximo lote"""
+
+    __slots__ = ("text", "enqueued_at", "done", "vector", "error")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.vector: Optional[List[float]] = None
+        self.error: Optional[BaseException] = None
+
+
+class EmbeddingBatcher(EmbeddingProviderInterface):
+    """
+    Dispatcher compartilhado de embeddings de consultas
+
+    Chamadas concorrentes a embed_query (uma por sessão do Streamlit) são
+    acumuladas durante uma janela curta, contada a partir da primeira
+    consulta do lote, e enviadas ao provedor em uma única chamada
+    embed_documents. Cada chamador recebe o próprio vetor. O lote sai antes
+    do fim da janela se atingir max_batch_size.
+    """
+
+    def __init__(self, provider: EmbeddingProviderInterface,
+                 window_ms: float = 5.0, max_batch_size: int = 64,
+                 max_concurrent_batches: int = 4,
+                 stats_window: int = 1000):
+        self.provider = provider
+        self.name = provider.name
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches,
+            thread_name_prefix="embedding-batch"
+        )
+        self._dispatcher = None
+
+        # Métricas
+        self._batch_sizes = deque(maxlen=stats_window)
+        self._queue_delays = deque(maxlen=stats_window)
+        self._total_queries = 0
+        self._total_batches = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Documentos já chegam em lote: repassa direto ao provedor"""
+        return self.provider.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Enfileira a consulta e aguarda o vetor do lote"""
+        query = _PendingQuery(text)
+        with self._condition:
+            self._ensure_dispatcher()
+            self._pending.append(query)
+            self._condition.notify()
+        query.done.wait()
+        if query.error is not None:
+            raise query.error
+        return query.vector
+
+    def _ensure_dispatcher(self):
+        """Inicia a thread do dispatcher na primeira consulta"""
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop,
+                name="embedding-dispatcher",
+                daemon=True
+            )
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """Forma lotes pela janela de tempo e os envia ao executor"""
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = self._pending[0].enqueued_at + self.window
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                size = min(len(self._pending), self.max_batch_size)
+                batch = [self._pending.popleft() for _ in range(size)]
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[_PendingQuery]):
+        """Executa um lote e entrega os vetores a cada chamador"""
+        dispatched_at = time.perf_counter()
+        try:
+            vectors = self.provider.embed_documents(
+                [query.text for query in batch])
+            for query, vector in zip(batch, vectors):
+                query.vector = vector
+        except Exception as e:
+            for query in batch:
+                query.error = e
+        finally:
+            BATCH_SIZE.observe(len(batch))
+            with self._condition:
+                self._total_batches += 1
+                self._total_queries += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._queue_delays.extend(
+                    (dispatched_at - query.enqueued_at) * 1000
+                    for query in batch)
+            for query in batch:
+                query.done.set()
+
+    def get_stats(self) -> dict:
+        """Retorna métricas de tamanho de lote e atraso na fila"""
+        with self._condition:
+            sizes = list(self._batch_sizes)
+            delays = sorted(self._queue_delays)
+            total_queries = self._total_queries
+            total_batches = self._total_batches
+            queued = len(self._pending)
+
+        if not sizes:
+            return {
+                "window_ms": self.window * 1000,
+                "total_queries": 0,
+                "total_batches": 0,
+                "queued": queued
+            }
+
+        return {
+            "window_ms": self.window * 1000,
+            "total_queries": total_queries,
+            "total_batches": total_batches,
+            "queued": queued,
+            "avg_batch_size": round(statistics.mean(sizes), 2),
+            "max_batch_size": max(sizes),
+            "queue_delay_p50_ms": round(statistics.median(delays), 3),
+            "queue_delay_p95_ms": round(
+                delays[int(0.95 * (len(delays) - 1))], 3),
+            "queue_delay_max_ms": round(delays[-1], 3)
+        }
@@ -0,0 +1,193 @@
+"""
+Provedores de embeddings
+Seguindo princípios de Clean Architecture
+"""
+import math
+import os
+import re
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+
+import numpy as np
+
+# Quando LangChain está disponível, os provedores são compatíveis com o FAISS
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:
+    _EmbeddingsBase = ABC
+
+try:
+    from openai import (APIConnectionError, InternalServerError, OpenAI,
+                        RateLimitError)
+except ImportError:
+    OpenAI = None
+
+from .resilience import AdaptiveTimeout, RetryBudget, RetryPolicy
+
+
+class EmbeddingProviderInterface(_EmbeddingsBase):
+    """Interface abstrata para provedores de embeddings"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Gera embeddings para uma lista de textos"""
+        pass
+
+    @abstractmethod
+    def embed_query(self, text: str) -> List[float]:
+        """Gera o embedding de uma consulta"""
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProviderInterface):
+    """
+    Provedor de embeddings remoto da OpenAI
+
+    Usa o SDK diretamente (sem as retentativas internas dele) para que cada
+    chamada tenha o timeout adaptativo e o orçamento de retentativas da
+    etapa "embedding".
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None,
+                 model: str = "text-embedding-ada-002",
+                 retry_policy: Optional[RetryPolicy] = None):
+        if OpenAI is None:
+            raise ImportError("openai não está instalado")
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        self.model = model
+        self.retry_policy = retry_policy or RetryPolicy(
+            "embedding",
+            AdaptiveTimeout(initial=10.0, floor=0.5, ceiling=10.0),
+            RetryBudget(),
+            retry_on=(APIConnectionError, RateLimitError,
+                      InternalServerError))
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.retry_policy.call(
+            lambda timeout: self.client.embeddings.create(
+                model=self.model, input=texts, timeout=timeout))
+        return [item.embedding for item in response.data]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+# Palavras muito frequentes em português que não ajudam na busca
+_STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em na nas no nos o os ou para pela
+pelas pelo pelos por que se sem sua suas seu seus um uma umas uns qual quais
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=2 ** 18)
+def _hash_feature(feature: str) -> int:
+    """Hash estável entre processos (o hash() do Python é aleatorizado)"""
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def _normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos, para 'manutenção' casar com 'manutencao'"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str,
+             extra_stopwords: FrozenSet[str] = frozenset()) -> List[str]:
+    """
+    Palavras do texto, normalizadas e sem stopwords
+
+    É a mesma tokenização do embedder local; extra_stopwords descarta
+    também palavras próprias de quem chama (ex.: o nome do carro na FAQ).
+    """
+    return [word for word in _TOKEN_PATTERN.findall(_normalize_text(text))
+            if word not in _STOPWORDS and word not in extra_stopwords]
+
+
+class LocalHashingEmbeddingProvider(EmbeddingProviderInterface):
+    """
+    Provedor de embeddings local, executado em CPU
+
+    Usa o hashing trick com sinal: palavras, bigramas de palavras e
+    trigramas de caracteres são projetados em um vetor de dimensão fixa,
+    com peso sublinear (1 + log tf) e normalização L2. Não depende de
+    download de modelo nem de rede, e é determinístico entre execuções.
+    """
+
+    name = "local"
+
+    def __init__(self, dimension: int = 1024, char_ngram: int = 3,
+                 char_weight: float = 0.5):
+        self.dimension = dimension
+        self.char_ngram = char_ngram
+        self.char_weight = char_weight
+
+    def _features(self, text: str) -> dict:
+        """Extrai as features ponderadas de um texto"""
+        words = tokenize(text)
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0.0) + 1.0
+        for first, second in zip(words, words[1:]):
+            bigram = f"{first} {second}"
+            counts[bigram] = counts.get(bigram, 0.0) + 1.0
+        n = self.char_ngram
+        for word in words:
+            if len(word) <= n:
+                continue
+            padded = f"<{word}>"
+            for i in range(len(padded) - n + 1):
+                gram = "#" + padded[i:i + n]
+                counts[gram] = counts.get(gram, 0.0) + self.char_weight
+        return counts
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Gera o vetor normalizado de um texto"""
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            h = _hash_feature(feature)
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimension] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
+
+
+def create_embedding_provider(name: Optional[str] = None,
+                              api_key: Optional[str] = None,
+                              retry_policy: Optional[RetryPolicy] = None
+                              ) -> Optional[EmbeddingProviderInterface]:
+    """
+    Cria o provedor de embeddings pelo nome
+
+    O nome padrão vem da variável de ambiente EMBEDDINGS_PROVIDER
+    ("openai" ou "local"). Retorna None quando o provedor remoto é pedido
+    sem chave de API.
+    """
+    name = (name or os.getenv("EMBEDDINGS_PROVIDER", "openai")).lower()
+    if name == "local":
+        return LocalHashingEmbeddingProvider()
+    if name == "openai":
+        if not api_key or OpenAI is None:
+            return None
+        return OpenAIEmbeddingProvider(api_key=api_key,
+                                       retry_policy=retry_policy)
+    raise ValueError(f"Provedor de embeddings {name} não disponível")
@@ -0,0 +1,267 @@
+"""
+Tabela de respostas pré-computadas para perguntas frequentes
+Seguindo princípios de Clean Architecture
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import (Callable, Dict, FrozenSet, Iterable, Iterator, List,
+                    Optional, Tuple)
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+from domain.entities import RequestContext
+from .embeddings import tokenize
+from .metrics import metrics
+
+# Palavras que aparecem em quase toda pergunta e não distinguem o assunto
+# (além das stopwords da tokenização)
+_IGNORED_TOKENS = frozenset(
+    "vw volkswagen t cross tcross carro veiculo meu minha".split())
+
+FAQ_STORE_PATH = Path("faq_cache") / "faq_store.json"
+
+LOOKUPS = metrics.counter(
+    "tcross_faq_lookups_total", "Consultas à tabela de FAQ por resultado",
+    ("result",))
+
+
+def question_tokens(question: str) -> FrozenSet[str]:
+    """Tokens significativos da pergunta (sem acentos e stopwords)"""
+    return frozenset(tokenize(question, _IGNORED_TOKENS))
+
+
+def question_key(tokens: FrozenSet[str]) -> str:
+    """Chave canônica: tokens ordenados"""
+    return " ".join(sorted(tokens))
+
+
+class FAQStore:
+    """
+    Respostas pré-computadas por (ano, versão, pergunta normalizada)
+
+    A busca exata é um acesso a dicionário pela chave canônica da pergunta;
+    sem acerto exato, um índice invertido de tokens seleciona as perguntas
+    candidatas e a de maior Jaccard é aceita se passar de min_similarity.
+    As respostas só valem para a versão do índice de documentos em que
+    foram geradas; refresh() as regenera para uma versão nova.
+    """
+
+    def __init__(self, path: Path = FAQ_STORE_PATH,
+                 min_similarity: float = 0.8):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.index_version = ""
+        self.created_at: Optional[str] = None
+        self._lock = threading.Lock()
+        self._answers: Dict[Tuple[str, str, str], str] = {}
+        self._key_tokens: Dict[str, FrozenSet[str]] = {}
+        self._postings: Dict[str, set] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def load(self) -> bool:
+        """Carrega a tabela do disco; retorna False se não existir"""
+        if not self.path.exists():
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"⚠️ Erro ao carregar FAQ: {e}")
+            return False
+        self.replace(data["entries"], data["index_version"],
+                     data.get("created_at"))
+        return True
+
+    def save(self):
+        """Grava a tabela no disco (escrita atômica)"""
+        with self._lock:
+            entries = [
+                {"year": year, "version": version, "key": key,
+                 "answer": answer}
+                for (year, version, key), answer in self._answers.items()
+            ]
+            data = {
+                "index_version": self.index_version,
+                "created_at": self.created_at,
+                "entries": entries
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False),
+                            encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def replace(self, entries: Iterable[dict], index_version: str,
+                created_at: Optional[str] = None):
+        """
+        Troca todo o conteúdo da tabela
+
+        Cada entrada tem year, version, answer e question (ou key, a chave
+        já normalizada).
+        """
+        answers, key_tokens, postings = {}, {}, {}
+        for entry in entries:
+            if "key" in entry:
+                tokens = frozenset(entry["key"].split())
+            else:
+                tokens = question_tokens(entry["question"])
+            if not tokens:
+                continue
+            key = question_key(tokens)
+            answers[(entry["year"], entry["version"], key)] = entry["answer"]
+            key_tokens[key] = tokens
+            for token in tokens:
+                postings.setdefault(token, set()).add(key)
+
+        with self._lock:
+            self._answers = answers
+            self._key_tokens = key_tokens
+            self._postings = postings
+            self.index_version = index_version
+            self.created_at = created_at or datetime.now().isoformat()
+
+    def vehicles(self) -> List[Tuple[str, str]]:
+        """(ano, versão) cobertos pela tabela"""
+        with self._lock:
+            return sorted({(year, version)
+                           for year, version, _ in self._answers})
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Trava a tabela entre processos enquanto ela é regenerada"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def refresh(self, answer_fn: Callable[[RequestContext], str],
+                questions: List[str], index_version: str,
+                vehicles: Optional[List[Tuple[str, str]]] = None,
+                max_workers: int = 4) -> bool:
+        """
+        Regenera a tabela para index_version, se ela ainda não for dessa
+
+        vehicles padrão: os que a tabela já cobria. Entre processos (ex.: os
+        workers da API) só um regenera: os outros esperam a trava e leem a
+        tabela que ele gravou. Retorna se gerou respostas novas.
+        """
+        vehicles = vehicles or self.vehicles()
+        with self._file_lock():
+            self.load()
+            if self.is_fresh(index_version):
+                return False
+            entries = build_faq_entries(answer_fn, questions, vehicles,
+                                        max_workers)
+            self.replace(entries, index_version)
+            self.save()
+        return True
+
+    def is_fresh(self, index_version: str) -> bool:
+        """Indica se a tabela foi gerada para esta versão do índice"""
+        return bool(self._answers) and self.index_version == index_version
+
+    def lookup(self, question: str, year: str, version: str,
+               index_version: str) -> Optional[str]:
+        """Retorna a resposta pré-computada, se houver uma próxima o bastante"""
+        if not self.is_fresh(index_version):
+            return None
+
+        tokens = question_tokens(question)
+        key = question_key(tokens)
+        answers = self._answers
+        answer = answers.get((year, version, key))
+
+        if answer is None and tokens:
+            best_score = 0.0
+            candidates = set()
+            for token in tokens:
+                candidates |= self._postings.get(token, set())
+            for candidate in candidates:
+                if (year, version, candidate) not in answers:
+                    continue
+                candidate_tokens = self._key_tokens[candidate]
+                score = (len(tokens & candidate_tokens) /
+                         len(tokens | candidate_tokens))
+                if score > best_score:
+                    best_score = score
+                    answer = answers[(year, version, candidate)]
+            if best_score < self.min_similarity:
+                answer = None
+
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        LOOKUPS.inc(result="miss" if answer is None else "hit")
+        return answer
+
+    def get_stats(self) -> dict:
+        """Retorna tamanho, versão e acertos da tabela"""
+        with self._lock:
+            return {
+                "entries": len(self._answers),
+                "index_version": self.index_version,
+                "created_at": self.created_at,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def load_questions(path: Path) -> List[str]:
+    """Lê a lista de perguntas (uma por linha; # inicia comentário)"""
+    questions = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            questions.append(line)
+    return questions
+
+
+def build_faq_entries(answer_fn: Callable[[RequestContext], str],
+                      questions: List[str],
+                      vehicles: List[Tuple[str, str]],
+                      max_workers: int = 4) -> List[dict]:
+    """
+    Gera as respostas de cada pergunta para cada (ano, versão)
+
+    answer_fn recebe o contexto da requisição (pergunta + veículo) e faz a
+    recuperação e a geração. As chamadas rodam em paralelo, limitadas por
+    max_workers; perguntas que falham ficam fora da tabela.
+    """
+    jobs = [RequestContext(question=question, vehicle_year=year,
+                           vehicle_version=version)
+            for year, version in vehicles for question in questions]
+
+    def answer(context: RequestContext) -> Optional[dict]:
+        try:
+            return {
+                "year": context.vehicle_year,
+                "version": context.vehicle_version,
+                "question": context.question,
+                "answer": answer_fn(context)
+            }
+        except Exception as e:
+            print(f"❌ Erro ao gerar resposta para "
+                  f"'{context.question}' ({context.vehicle_year} "
+                  f"{context.vehicle_version}): {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [entry for entry in pool.map(answer, jobs) if entry]
+
@@ -0,0 +1,398 @@
+"""
+Registro de métricas em memória (contadores, gauges e histogramas)
+Seguindo princípios de Clean Architecture
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Limites dos histogramas de latência (s): de 5 ms a 1 min
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+class Metric:
+    """
+    Base das métricas: um valor por combinação de rótulos
+
+    Os rótulos são passados por nome em cada registro (ex.:
+    inc(provider="openai")); faltando algum, ele fica vazio.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        # Caminho comum (todos os rótulos informados) sem validação extra
+        if len(labels) == len(self.labelnames):
+            try:
+                return tuple([str(labels[name])
+                              for name in self.labelnames])
+            except KeyError:
+                pass
+        if any(name not in self.labelnames for name in labels):
+            raise ValueError(f"Rótulos inválidos para {self.name}: "
+                             f"{sorted(labels)}")
+        return tuple([str(labels.get(name, ""))
+                      for name in self.labelnames])
+
+    def _label_text(self, key: LabelValues,
+                    extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [(name, value) for name, value in zip(self.labelnames, key)
+                 if value != ""] + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"'
+                              for name, value in pairs) + "}"
+
+    def collect(self) -> Dict[LabelValues, object]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{self._label_text(key)} "
+                         f"{_format_value(value)}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Valor que só cresce (requisições, acertos, erros)"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """
+    Valor que sobe e desce (profundidade de fila, sessões)
+
+    Com set_function o valor é lido só na coleta, sem custo no caminho
+    da requisição; a função retorna um número ou um dicionário
+    {valores dos rótulos: número}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str,
+                 labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._function: Optional[Callable[[], Union[
+            float, Dict[LabelValues, float]]]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Union[
+            float, Dict[LabelValues, float]]]):
+        self._function = function
+
+    def collect(self) -> Dict[LabelValues, object]:
+        values = super().collect()
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception:
+                return values
+            if isinstance(result, dict):
+                values.update({tuple(str(v) for v in key): value
+                               for key, value in result.items()})
+            else:
+                values[()] = result
+        return values
+
+
+class Histogram(Metric):
+    """Distribuição de valores (latências) em faixas cumulativas"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str,
+                 labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Contagem por faixa (a última é +Inf), soma e total
+                state = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observa a duração do bloco"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> Dict[LabelValues, object]:
+        with self._lock:
+            states = {key: (list(state[0]), state[1], state[2])
+                      for key, state in self._values.items()}
+        values = {}
+        for key, (counts, total, count) in states.items():
+            cumulative, running = {}, 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,),
+                                           counts):
+                running += bucket_count
+                cumulative[bound] = running
+            values[key] = {"buckets": cumulative, "sum": total,
+                           "count": count}
+        return values
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            for bound, count in value["buckets"].items():
+                labels = self._label_text(key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = self._label_text(key)
+            lines.append(f"{self.name}_sum{labels} "
+                         f"{_format_value(value['sum'])}")
+            lines.append(f"{self.name}_count{labels} {value['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas de todos os subsistemas, expostas em formato Prometheus
+
+    counter/gauge/histogram criam a métrica na primeira chamada e
+    devolvem a mesma nas seguintes, então cada módulo declara as suas sem
+    depender da ordem de importação. snapshot() devolve os valores atuais
+    para inspeção em testes e benchmarks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get_or_create(self, cls, name: str, help: str,
+                       labelnames: Tuple[str, ...], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames,
+                                                   **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(
+                    labelnames):
+                raise ValueError(f"Métrica {name} já registrada como "
+                                 f"{metric.kind} {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, help: str,
+                labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str,
+              labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str,
+                  labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames,
+                                   buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[LabelValues, object]]:
+        """
+        Valores atuais: {métrica: {valores dos rótulos: valor}}
+
+        Histogramas trazem {"buckets", "sum", "count"} em vez do número.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.collect() for metric in metrics}
+
+    def value(self, name: str, **labels) -> float:
+        """Valor de um contador/gauge (0 se ainda não registrado)"""
+        metric = self.get(name)
+        if metric is None:
+            return 0.0
+        return metric.collect().get(metric._key(labels), 0.0)
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Zera os valores (mantém as métricas e as funções dos gauges)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+ReadinessProbe = Callable[[], Tuple[bool, dict]]
+
+_readiness_probe: Optional[ReadinessProbe] = None
+
+
+def set_readiness_probe(probe: Optional[ReadinessProbe]):
+    """
+    Define a verificação de GET /ready: () -> (pronto, detalhes)
+
+    Sem verificação, o processo é considerado pronto assim que atende.
+    """
+    global _readiness_probe
+    _readiness_probe = probe
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self._send(200, CONTENT_TYPE, self.server.registry.render())
+        elif path == "/healthz":
+            # Liveness: o processo responde
+            self._send(200, "text/plain; charset=utf-8", "ok\n")
+        elif path == "/ready":
+            # Readiness: só recebe tráfego depois do aquecimento
+            ready, details = (_readiness_probe() if _readiness_probe
+                              else (True, {}))
+            self._send(200 if ready else 503, "application/json",
+                       json.dumps({"ready": ready, **details},
+                                  ensure_ascii=False))
+        else:
+            self.send_error(404)
+
+    def _send(self, status: int, content_type: str, text: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP de operação do processo
+
+    GET /metrics para o Prometheus coletar, /healthz (liveness) e /ready
+    (readiness, ver set_readiness_probe).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1",
+                 port: int = 9464):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> str:
+        """Atende em segundo plano e retorna a URL das métricas"""
+        threading.Thread(target=self.serve_forever, daemon=True,
+                         name="metrics-server").start()
+        return self.url
+
+
+_server: Optional[MetricsServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None,
+                         host: Optional[str] = None
+                         ) -> Optional[MetricsServer]:
+    """
+    Sobe (uma vez por processo) o endpoint /metrics
+
+    Sem argumentos usa METRICS_PORT e METRICS_HOST (padrão 127.0.0.1);
+    sem porta configurada não faz nada e retorna None.
+    """
+    global _server
+    port = port if port is not None else int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = MetricsServer(
+                    metrics, host or os.getenv("METRICS_HOST", "127.0.0.1"),
+                    port)
+            except OSError as e:
+                print(f"⚠️ Endpoint de métricas indisponível: {e}")
+                return None
+            print(f"📊 Métricas em {_server.start()}")
+        return _server
+
+
+# Registro global, compartilhado por todos os subsistemas
+metrics = MetricsRegistry()
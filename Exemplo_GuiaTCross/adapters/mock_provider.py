@@ -0,0 +1,332 @@
+"""
+Provedor de LLM simulado, com perfil de latência configurável
+Seguindo princípios de Clean Architecture
+"""
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+from .admission import DeadlineExceededError
+from .cascade import estimate_tokens
+from .embeddings import LocalHashingEmbeddingProvider
+
+
+class SimulatedProviderError(RuntimeError):
+    """Falha sorteada pelo perfil (equivale a um 5xx)"""
+
+
+class SimulatedRateLimitError(SimulatedProviderError):
+    """Limite de requisições sorteado pelo perfil (equivale a um 429)"""
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Comportamento de um provedor simulado
+
+    O tempo até o primeiro token segue uma log-normal (mediana ttft_ms,
+    dispersão ttft_jitter); uma fração tail_rate das respostas é
+    multiplicada por uma amostra de Pareto (cauda pesada, tail_alpha) e
+    stall_rate simula conexões que travam por stall_ms. tokens_per_s = 0
+    entrega a resposta inteira de uma vez.
+    """
+    ttft_ms: float = 300.0
+    ttft_jitter: float = 0.3
+    tokens_per_s: float = 60.0
+    output_tokens: int = 120
+    tail_rate: float = 0.01
+    tail_alpha: float = 1.5
+    stall_rate: float = 0.0
+    stall_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    models: List[str] = field(default_factory=lambda: ["mock-model"])
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "LatencyProfile":
+        """Perfil por nome (PROFILES) ou JSON com os campos a alterar"""
+        spec = spec.strip()
+        if spec in PROFILES:
+            return PROFILES[spec]
+        if spec.startswith("{"):
+            values = json.loads(spec)
+            base = PROFILES[values.pop("base", "gpt-4o-mini")]
+            return cls(**{**asdict(base), **values})
+        raise ValueError(f"Perfil de latência {spec} não existe; "
+                         f"use {', '.join(PROFILES)} ou JSON")
+
+
+# Perfis prontos (valores aproximados de APIs hospedadas)
+PROFILES: Dict[str, LatencyProfile] = {
+    "instant": LatencyProfile(ttft_ms=0, ttft_jitter=0, tokens_per_s=0,
+                              tail_rate=0, models=["o1", "gpt-4o-mini"]),
+    "gpt-4o-mini": LatencyProfile(ttft_ms=400, tokens_per_s=80,
+                                  output_tokens=150, tail_rate=0.02,
+                                  models=["gpt-4o-mini"]),
+    "o1": LatencyProfile(ttft_ms=4000, ttft_jitter=0.5, tokens_per_s=40,
+                         output_tokens=400, tail_rate=0.05, models=["o1"]),
+    "flaky": LatencyProfile(ttft_ms=400, tokens_per_s=80, output_tokens=150,
+                            tail_rate=0.05, error_rate=0.05,
+                            rate_limit_rate=0.05,
+                            models=["o1", "gpt-4o-mini"]),
+}
+
+
+class SimulatedLLM:
+    """
+    Gera respostas com os tempos e as falhas sorteados de um perfil
+
+    As palavras da resposta vêm do próprio prompt (trechos do manual
+    incluídos), para que o texto tenha tamanho e forma parecidos com os de
+    uma resposta real. Com seed, a sequência de sorteios é reproduzível.
+    """
+
+    def __init__(self, profile: LatencyProfile, seed: Optional[int] = None):
+        self.profile = profile
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    def _draw(self, distribution: str, *args) -> float:
+        with self._lock:
+            return getattr(self._random, distribution)(*args)
+
+    def check_failure(self):
+        """Sorteia e lança a falha da requisição, se houver"""
+        roll = self._draw("random")
+        with self._lock:
+            self.requests += 1
+            if roll < self.profile.error_rate:
+                self.errors += 1
+                raise SimulatedProviderError("Falha simulada do provedor")
+            if roll < self.profile.error_rate + self.profile.rate_limit_rate:
+                self.rate_limited += 1
+                raise SimulatedRateLimitError(
+                    "Limite de requisições simulado")
+
+    def first_token_delay(self) -> float:
+        """Tempo até o primeiro token (s)"""
+        profile = self.profile
+        delay = profile.ttft_ms / 1000
+        if delay and profile.ttft_jitter:
+            delay = self._draw("lognormvariate", math.log(delay),
+                               profile.ttft_jitter)
+        if profile.tail_rate and self._draw("random") < profile.tail_rate:
+            delay *= self._draw("paretovariate", profile.tail_alpha)
+        return delay + self.stall_delay()
+
+    def stall_delay(self) -> float:
+        """Travamento sorteado da conexão (s; zero na maioria das vezes)"""
+        profile = self.profile
+        if profile.stall_rate and self._draw("random") < profile.stall_rate:
+            return profile.stall_ms / 1000
+        return 0.0
+
+    def tokens(self, prompt: str) -> List[str]:
+        """Texto da resposta, já dividido em tokens (palavras)"""
+        words = prompt.split() or ["resposta"]
+        count = self.profile.output_tokens
+        return [words[i % len(words)] + " " for i in range(count)]
+
+    @staticmethod
+    def _sleep(seconds: float, deadline: Optional[float]):
+        """Dorme respeitando o prazo da requisição"""
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if seconds >= remaining:
+                time.sleep(max(0.0, remaining))
+                raise DeadlineExceededError(
+                    "Prazo esgotado aguardando o provedor simulado")
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def stream(self, prompt: str,
+               deadline: Optional[float] = None) -> Iterator[str]:
+        """Entrega os tokens no ritmo do perfil"""
+        self.check_failure()
+        self._sleep(self.first_token_delay(), deadline)
+        interval = (1 / self.profile.tokens_per_s
+                    if self.profile.tokens_per_s else 0.0)
+        for index, token in enumerate(self.tokens(prompt)):
+            if index:
+                self._sleep(interval, deadline)
+            yield token
+
+    def complete(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """Resposta inteira, após o tempo total de geração"""
+        self.check_failure()
+        tokens = self.tokens(prompt)
+        duration = self.first_token_delay()
+        if self.profile.tokens_per_s:
+            duration += (len(tokens) - 1) / self.profile.tokens_per_s
+        self._sleep(duration, deadline)
+        return "".join(tokens).strip()
+
+    @staticmethod
+    def usage(prompt: str, answer: str) -> dict:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(answer)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited
+            }
+
+
+class _MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Rotas mínimas da API da OpenAI: /models, chat e embeddings"""
+
+    protocol_version = "HTTP/1.1"
+    server: "MockOpenAIServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict,
+                   headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.rstrip("/").endswith("/models"):
+            return self._send_json(404, {"error": {"message": "not found"}})
+        self._send_json(200, {"object": "list", "data": [
+            {"id": model, "object": "model", "created": 0,
+             "owned_by": "mock"}
+            for model in self.server.llm.profile.models]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(
+            int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith(("/embeddings", "/chat/completions")):
+            return self._send_json(404, {"error": {"message": "not found"}})
+        with self.server.lock:
+            self.server.requests += 1
+        try:
+            self.server.llm.check_failure()
+        except SimulatedRateLimitError as e:
+            return self._send_json(
+                429, {"error": {"message": str(e), "type": "rate_limit"}},
+                headers={"Retry-After": "1"})
+        except SimulatedProviderError as e:
+            return self._send_json(
+                500, {"error": {"message": str(e), "type": "server_error"}})
+        try:
+            if self.path.endswith("/embeddings"):
+                return self._embeddings(request)
+            self._chat(request)
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente desistiu (timeout) antes do fim da resposta
+            pass
+
+    def _embeddings(self, request: dict):
+        # Embeddings só sofrem as falhas e os travamentos do perfil
+        time.sleep(self.server.llm.stall_delay())
+        texts = request.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        vectors = self.server.embeddings.embed_documents(texts)
+        self._send_json(200, {
+            "object": "list", "model": request.get("model"),
+            "data": [{"object": "embedding", "index": i, "embedding": vector}
+                     for i, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": sum(map(estimate_tokens, texts)),
+                      "total_tokens": sum(map(estimate_tokens, texts))}})
+
+    def _chat(self, request: dict):
+        llm = self.server.llm
+        prompt = "\n".join(str(message.get("content", ""))
+                           for message in request.get("messages", []))
+        model = request.get("model")
+        tokens = llm.tokens(prompt)
+        answer = "".join(tokens).strip()
+        if not request.get("stream"):
+            duration = llm.first_token_delay()
+            if llm.profile.tokens_per_s:
+                duration += (len(tokens) - 1) / llm.profile.tokens_per_s
+            time.sleep(duration)
+            return self._send_json(200, {
+                "id": "mock", "object": "chat.completion", "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant",
+                                         "content": answer}}],
+                "usage": llm.usage(prompt, answer)})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        time.sleep(llm.first_token_delay())
+        interval = (1 / llm.profile.tokens_per_s
+                    if llm.profile.tokens_per_s else 0.0)
+        for index, token in enumerate(tokens):
+            if index and interval:
+                time.sleep(interval)
+            chunk = {"id": "mock", "object": "chat.completion.chunk",
+                     "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": token},
+                                  "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local compatível com a API da OpenAI, com o perfil dado
+
+    Aponte o provedor local (LOCAL_LLM_BASE_URL) ou OPENAI_BASE_URL para
+    base_url. 5xx e 429 (com Retry-After) saem das taxas do perfil; o perfil
+    pode ser trocado com o servidor no ar, entre cenários de um benchmark.
+    requests conta as chamadas de chat e de embeddings recebidas.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, profile: LatencyProfile, host: str = "127.0.0.1",
+                 port: int = 0, seed: Optional[int] = None):
+        super().__init__((host, port), _MockOpenAIHandler)
+        self.llm = SimulatedLLM(profile, seed)
+        self.embeddings = LocalHashingEmbeddingProvider()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def set_profile(self, profile: LatencyProfile,
+                    seed: Optional[int] = None):
+        """Troca o perfil e zera as contagens"""
+        self.llm = SimulatedLLM(profile, seed)
+        with self.lock:
+            self.requests = 0
+
+    def start(self) -> str:
+        """Atende em segundo plano e retorna a base_url"""
+        threading.Thread(target=self.serve_forever, daemon=True,
+                         name="mock-openai-server").start()
+        return self.base_url
@@ -0,0 +1,286 @@
+"""
+Perfil amostrado por requisição (pilhas de chamadas em formato flamegraph)
+Seguindo princípios de Clean Architecture
+"""
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from .tracing import Span, tracer
+
+T = TypeVar("T")
+
+
+class RequestProfile:
+    """Amostras de pilha e etapas de uma requisição perfilada"""
+
+    def __init__(self, request_id: str, label: str, sampled: bool):
+        self.request_id = request_id
+        self.label = label
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        # Threads que trabalham para a requisição: ident -> [nome, usos]
+        self.threads: Dict[int, List] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.stages: List[dict] = []
+        self.lock = threading.Lock()
+
+    def attach(self, thread: threading.Thread):
+        with self.lock:
+            entry = self.threads.setdefault(thread.ident, [thread.name, 0])
+            entry[1] += 1
+
+    def detach(self, thread: threading.Thread):
+        with self.lock:
+            entry = self.threads.get(thread.ident)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self.threads[thread.ident]
+
+    def add_stage(self, span: Span):
+        with self.lock:
+            self.stages.append({
+                "name": span.name,
+                "offset_ms": round((span.start_ns / 1e9 - self.started_at)
+                                   * 1000, 2),
+                "duration_ms": round(span.duration_ms, 2)
+            })
+
+
+class RequestProfiler:
+    """
+    Perfil de pilhas de uma fração das requisições, ou só das lentas
+
+    Ligado por PROFILE_SAMPLE_RATE (fração das requisições) e/ou
+    PROFILE_SLOW_MS (grava só as que passarem desse tempo; todas são
+    amostradas e as rápidas descartadas). Um thread amostra, a cada
+    interval_ms, a pilha de cada thread que trabalha para uma requisição
+    perfilada (o da sessão e os dos pools dos provedores, ligados por
+    with_script_context). As amostras são de tempo de parede: espera de
+    rede aparece como as funções de socket/httpx, não some do perfil.
+
+    Cada perfil gravado gera <instante>_<request_id>_<rótulo>.folded
+    (pilhas no formato de flamegraph.pl / speedscope) e um .json com
+    duração, motivo, etapas (spans do tracing) e as funções com mais
+    amostras. Desligado, profile() não faz nada além de um teste.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, slow_ms: float = 0.0,
+                 output_dir: Path = Path("profiles"),
+                 interval_ms: float = 5.0, max_depth: int = 128):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = Path(output_dir)
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self._current: contextvars.ContextVar[Optional[RequestProfile]] = (
+            contextvars.ContextVar("current_profile", default=None))
+        self._lock = threading.Lock()
+        self._active: Dict[str, RequestProfile] = {}
+        self._has_active = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._labels: Dict[object, str] = {}
+        self._saved = deque(maxlen=256)
+        self.profiled = 0
+        self.saved = 0
+        if self.enabled:
+            tracer.add_listener(self._on_span)
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        return cls(
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            slow_ms=float(os.getenv("PROFILE_SLOW_MS", "0")),
+            output_dir=Path(os.getenv("PROFILE_DIR", "profiles")),
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")))
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def current(self) -> Optional[RequestProfile]:
+        return self._current.get()
+
+    def profile(self, request_id: str, label: str = "request",
+                force: bool = False):
+        """
+        Perfila o bloco como a requisição request_id
+
+        Com force o perfil é gravado sempre (ex.: a renderização de uma
+        requisição já perfilada); sem ele, vale a amostragem ou o limite
+        de lentidão.
+        """
+        if not self.enabled and not force:
+            return nullcontext()
+        sampled = force or random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return nullcontext()
+        return self._profile(request_id, label, sampled, force)
+
+    @contextmanager
+    def _profile(self, request_id: str, label: str, sampled: bool,
+                 force: bool) -> Iterator[RequestProfile]:
+        profile = RequestProfile(request_id, label, sampled)
+        profile.attach(threading.current_thread())
+        key = f"{request_id}/{label}"
+        with self._lock:
+            self._active[key] = profile
+            self._has_active.set()
+        self._ensure_sampler()
+        token = self._current.set(profile)
+        try:
+            yield profile
+        finally:
+            self._current.reset(token)
+            duration_ms = (time.perf_counter() - profile.start) * 1000
+            with self._lock:
+                self._active.pop(key, None)
+                if not self._active:
+                    self._has_active.clear()
+                self.profiled += 1
+            slow = bool(self.slow_ms) and duration_ms >= self.slow_ms
+            if sampled or slow:
+                self._save(profile, duration_ms,
+                           "forced" if force else
+                           "sampled" if sampled else "slow")
+
+    def follow_up(self, request_id: Optional[str], label: str):
+        """Perfil de uma etapa posterior, só se a requisição foi gravada"""
+        if request_id is None or request_id not in self._saved:
+            return nullcontext()
+        return self.profile(request_id, label, force=True)
+
+    def bind(self, fn: Callable[[], T]) -> Callable[[], T]:
+        """
+        Versão de fn que inclui o thread em que rodar no perfil atual
+
+        Chamada no thread de origem; sem perfil ativo devolve fn.
+        """
+        profile = self._current.get()
+        if profile is None:
+            return fn
+
+        def run():
+            thread = threading.current_thread()
+            profile.attach(thread)
+            try:
+                return fn()
+            finally:
+                profile.detach(thread)
+
+        return run
+
+    def _on_span(self, span: Span):
+        profile = self._current.get()
+        if profile is not None and (profile.request_id ==
+                                    span.context.request_id):
+            profile.add_stage(span)
+
+    def _ensure_sampler(self):
+        if self._sampler is not None:
+            return
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            self._has_active.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active.values())
+            if not profiles:
+                continue
+            frames = sys._current_frames()
+            for profile in profiles:
+                with profile.lock:
+                    threads = [(ident, name) for ident, (name, _)
+                               in profile.threads.items() if ident != own]
+                stacks = [self._stack(frames[ident], name)
+                          for ident, name in threads if ident in frames]
+                with profile.lock:
+                    profile.samples += 1
+                    profile.stacks.update(stacks)
+
+    def _stack(self, frame, thread_name: str) -> Tuple[str, ...]:
+        """Pilha da raiz para a folha, com o nome do thread na base"""
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                path = Path(code.co_filename)
+                label = self._labels[code] = (
+                    f"{code.co_name} ({path.parent.name}/{path.name}:"
+                    f"{code.co_firstlineno})").replace(";", ",")
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ","))
+        return tuple(reversed(labels))
+
+    def _save(self, profile: RequestProfile, duration_ms: float,
+              reason: str):
+        with profile.lock:
+            stacks = dict(profile.stacks)
+            samples = profile.samples
+            stages = list(profile.stages)
+        stem = (f"{datetime.fromtimestamp(profile.started_at):%Y%m%d-%H%M%S}"
+                f"_{profile.request_id}_{profile.label}")
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack[-1]] += count
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.output_dir / f"{stem}.folded", "w",
+                      encoding="utf-8") as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{';'.join(stack)} {count}\n")
+            (self.output_dir / f"{stem}.json").write_text(json.dumps({
+                "request_id": profile.request_id,
+                "label": profile.label,
+                "reason": reason,
+                "started_at": datetime.fromtimestamp(
+                    profile.started_at).isoformat(timespec="milliseconds"),
+                "duration_ms": round(duration_ms, 2),
+                "interval_ms": self.interval * 1000,
+                "samples": samples,
+                "stages": sorted(stages, key=lambda s: s["offset_ms"]),
+                "top_functions": [
+                    {"function": name, "samples": count,
+                     "approx_ms": round(count * self.interval * 1000, 1)}
+                    for name, count in leaves.most_common(15)]
+            }, ensure_ascii=False, indent=2), encoding="utf-8")
+        except OSError as e:
+            print(f"⚠️ Falha ao gravar o perfil: {e}")
+            return
+        self._saved.append(profile.request_id)
+        with self._lock:
+            self.saved += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled,
+                    "sample_rate": self.sample_rate,
+                    "slow_ms": self.slow_ms,
+                    "active": len(self._active),
+                    "profiled": self.profiled,
+                    "saved": self.saved}
+
+
+# Instância global, configurada pelas variáveis de ambiente
+profiler = RequestProfiler.from_env()
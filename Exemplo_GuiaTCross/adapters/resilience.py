@@ -0,0 +1,206 @@
+"""
+Timeouts adaptativos e orçamento de retentativas por etapa do pipeline
+Seguindo princípios de Clean Architecture
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple, Type, TypeVar
+
+from .admission import DeadlineExceededError
+from .metrics import metrics
+
+T = TypeVar("T")
+
+RETRIES = metrics.counter(
+    "tcross_retries_total",
+    "Falhas transitórias repetidas (retry) ou desistidas (gave_up)",
+    ("stage", "result"))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Espera antes da retentativa número attempt (0 = primeira)
+
+    Backoff exponencial com jitter completo: um valor aleatório entre zero
+    e base * 2^attempt (limitado a cap), para que clientes que falharam
+    juntos não voltem todos ao mesmo tempo.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveTimeout:
+    """
+    Timeout de uma etapa derivado das latências observadas
+
+    Enquanto há menos de min_samples medições vale o timeout inicial; depois,
+    o percentil escolhido das chamadas bem-sucedidas vezes multiplier,
+    sempre entre floor e ceiling. Só os sucessos entram na janela, para que
+    uma onda de timeouts não empurre o próprio limite para cima.
+    """
+
+    def __init__(self, initial: float, floor: float, ceiling: float,
+                 percentile: float = 99.0, multiplier: float = 2.0,
+                 min_samples: int = 20, window: int = 200):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def observed(self, pct: float) -> Optional[float]:
+        """Percentil das latências de sucesso (None sem medições)"""
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(pct / 100 * (len(ordered) - 1))]
+
+    def current(self) -> float:
+        """Timeout a usar na próxima tentativa (s)"""
+        with self._lock:
+            samples = len(self._latencies)
+        if samples < self.min_samples:
+            return self.initial
+        value = self.observed(self.percentile) * self.multiplier
+        return min(self.ceiling, max(self.floor, value))
+
+
+class RetryBudget:
+    """
+    Orçamento de retentativas em token bucket
+
+    Cada requisição deposita ratio fichas (até max_tokens) e cada
+    retentativa gasta uma. Em uma queda prolongada as retentativas ficam
+    limitadas a ratio do tráfego, em vez de multiplicar a carga sobre um
+    provedor que já está com problemas; o saldo inicial cobre falhas
+    esporádicas logo na partida.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Retorna True e gasta uma ficha se a retentativa é permitida"""
+        with self._lock:
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "ratio": self.ratio,
+                "tokens": round(self._tokens, 2),
+                "requests": self.requests,
+                "retries": self.retries,
+                "denied": self.denied
+            }
+
+
+class RetryPolicy:
+    """
+    Timeout adaptativo e retentativas de uma etapa (embedding, geração...)
+
+    fn recebe o timeout da tentativa em segundos. Só as exceções em
+    retry_on são repetidas, com backoff e enquanto houver tentativas,
+    fichas no orçamento (compartilhável entre etapas) e prazo. Com deadline
+    (time.monotonic()), o timeout de cada tentativa é limitado ao tempo
+    restante e uma falha depois do prazo vira DeadlineExceededError.
+    """
+
+    def __init__(self, stage: str, timeout: AdaptiveTimeout,
+                 budget: RetryBudget, max_attempts: int = 3,
+                 base_delay: float = 0.1, max_delay: float = 2.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.stage = stage
+        self.timeout = timeout
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.gave_up = 0
+
+    def call(self, fn: Callable[[float], T],
+             deadline: Optional[float] = None) -> T:
+        self.budget.record_request()
+        with self._lock:
+            self.calls += 1
+        attempt = 0
+        while True:
+            timeout = self.timeout.current()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError(
+                        f"Prazo esgotado antes da etapa {self.stage}")
+                timeout = min(timeout, remaining)
+
+            start = time.perf_counter()
+            try:
+                result = fn(timeout)
+            except self.retry_on as e:
+                with self._lock:
+                    self.failures += 1
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineExceededError(
+                        f"Prazo esgotado na etapa {self.stage}") from e
+                delay = backoff_delay(attempt, self.base_delay,
+                                      self.max_delay)
+                attempt += 1
+                if (attempt >= self.max_attempts or
+                        (deadline is not None and
+                         time.monotonic() + delay >= deadline) or
+                        not self.budget.try_spend()):
+                    with self._lock:
+                        self.gave_up += 1
+                    RETRIES.inc(stage=self.stage, result="gave_up")
+                    raise
+                with self._lock:
+                    self.retries += 1
+                RETRIES.inc(stage=self.stage, result="retry")
+                time.sleep(delay)
+                continue
+
+            self.timeout.record(time.perf_counter() - start)
+            return result
+
+    def get_stats(self) -> dict:
+        """Retorna timeout atual, latência observada e retentativas"""
+        p99 = self.timeout.observed(99)
+        with self._lock:
+            return {
+                "timeout_s": round(self.timeout.current(), 3),
+                "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "gave_up": self.gave_up
+            }
@@ -0,0 +1,336 @@
+"""
+Roteamento de requisições entre provedores de IA
+Seguindo princípios de Clean Architecture
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .admission import DeadlineExceededError, with_script_context
+from .metrics import metrics
+
+LLM_REQUESTS = metrics.counter(
+    "tcross_llm_requests_total", "Chamadas aos provedores por resultado",
+    ("provider", "model", "outcome"))
+LLM_LATENCY = metrics.histogram(
+    "tcross_llm_request_seconds",
+    "Duração das chamadas aos provedores (streaming: até abrir o stream)",
+    ("provider", "model"))
+HEDGES = metrics.counter(
+    "tcross_hedges_total", "Requisições de hedge disparadas e vencedoras",
+    ("result",))
+CIRCUIT_OPEN = metrics.gauge(
+    "tcross_circuit_open", "1 quando o circuito do alvo não está fechado",
+    ("provider", "model"))
+
+
+class CircuitOpenError(RuntimeError):
+    """O circuito do provedor está aberto"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por provedor/modelo
+
+    Abre após failure_threshold falhas consecutivas. Depois de
+    reset_timeout segundos fica meio-aberto e deixa passar uma requisição
+    de teste: sucesso fecha o circuito, falha abre de novo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def is_available(self, now: float) -> bool:
+        """Indica, sem alterar o estado, se o provedor pode ser escolhido"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return now - self.opened_at >= self.reset_timeout
+        return not self._trial_in_flight
+
+    def allow_request(self, now: float) -> bool:
+        """Reserva a passagem de uma requisição (a de teste, se meio-aberto)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def release_trial(self):
+        """Devolve a passagem reservada sem registrar resultado"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if (self.state == self.HALF_OPEN or
+                self.consecutive_failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class ProviderStats:
+    """Latências e erros recentes de um provedor/modelo"""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+
+    def record(self, latency: float, success: bool):
+        self.requests += 1
+        self.outcomes.append(success)
+        if success:
+            self.latencies.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(pct / 100 * (len(ordered) - 1))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ProviderRouter:
+    """
+    Escolhe o provedor de cada requisição pela saúde observada
+
+    Os candidatos são os provedores que servem o modelo pedido (o preferido
+    primeiro em caso de empate) e, com allow_model_fallback, também os
+    demais com seu modelo padrão, como reserva. Entre os candidatos com
+    circuito fechado, vence o menor p95 ponderado pela taxa de erro;
+    provedores ainda sem medição são tentados primeiro. Com hedge_after_ms,
+    se o primeiro não responder nesse tempo, uma segunda requisição vai ao
+    próximo candidato e vale a que chegar primeiro. Falhas passam para o
+    próximo candidato; prazo esgotado (DeadlineExceededError) é do
+    chamador, não do provedor: sobe direto, sem contar como falha.
+    """
+
+    def __init__(self, providers: Dict[str, "AIProviderInterface"],
+                 hedge_after_ms: Optional[float] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 allow_model_fallback: bool = False,
+                 max_workers: int = 32):
+        self.providers = providers
+        self.allow_model_fallback = allow_model_fallback
+        self.hedge_after = (hedge_after_ms / 1000
+                            if hedge_after_ms else None)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="router")
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        CIRCUIT_OPEN.set_function(self._circuit_states)
+
+    def _get_state(self, target: Tuple[str, str]
+                   ) -> Tuple[ProviderStats, CircuitBreaker]:
+        if target not in self._stats:
+            self._stats[target] = ProviderStats()
+            self._breakers[target] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout)
+        return self._stats[target], self._breakers[target]
+
+    def _score(self, target: Tuple[str, str]) -> float:
+        stats, _ = self._get_state(target)
+        p95 = stats.percentile(95)
+        if p95 is None:
+            return 0.0
+        return p95 * (1 + 4 * stats.error_rate)
+
+    def candidates(self, model: str,
+                   preferred: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Lista os alvos saudáveis (provedor, modelo) em ordem de escolha"""
+        serving, fallback = [], []
+        for name, provider in self.providers.items():
+            models = provider.get_available_models()
+            if model in models:
+                serving.append((name, model))
+            elif models and self.allow_model_fallback:
+                fallback.append((name, models[0]))
+
+        now = time.monotonic()
+        with self._lock:
+            ordered = []
+            for group in (serving, fallback):
+                group.sort(key=lambda t: (self._score(t), t[0] != preferred))
+                ordered.extend(t for t in group
+                               if self._get_state(t)[1].is_available(now))
+        return ordered
+
+    def _circuit_states(self) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return {target: int(breaker.state != CircuitBreaker.CLOSED)
+                    for target, breaker in self._breakers.items()}
+
+    def _record(self, target: Tuple[str, str], latency: float,
+                success: bool):
+        name, model = target
+        LLM_REQUESTS.inc(provider=name, model=model,
+                         outcome="ok" if success else "error")
+        LLM_LATENCY.observe(latency, provider=name, model=model)
+        now = time.monotonic()
+        with self._lock:
+            stats, breaker = self._get_state(target)
+            stats.record(latency, success)
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure(now)
+
+    def _call(self, target: Tuple[str, str],
+              fn: Callable[["AIProviderInterface", str], str]) -> str:
+        """Executa a chamada medindo latência e resultado"""
+        name, model = target
+        with self._lock:
+            if not self._get_state(target)[1].allow_request(time.monotonic()):
+                LLM_REQUESTS.inc(provider=name, model=model,
+                                 outcome="circuit_open")
+                raise CircuitOpenError(f"Circuito aberto para {name}/{model}")
+        start = time.perf_counter()
+        try:
+            result = fn(self.providers[name], model)
+        except DeadlineExceededError:
+            # Sem tempo do chamador: não diz nada sobre a saúde do alvo
+            with self._lock:
+                self._get_state(target)[1].release_trial()
+            raise
+        except Exception:
+            self._record(target, time.perf_counter() - start, False)
+            raise
+        self._record(target, time.perf_counter() - start, True)
+        return result
+
+    def _submit(self, target: Tuple[str, str],
+                fn: Callable[["AIProviderInterface", str], str]) -> Future:
+        """Executa a chamada em outro thread, mantendo o contexto da sessão"""
+        return self._executor.submit(
+            with_script_context(lambda: self._call(target, fn)))
+
+    def route(self, model: str,
+              fn: Callable[["AIProviderInterface", str], str],
+              preferred: Optional[str] = None) -> str:
+        """Executa fn(provedor, modelo) no melhor alvo disponível"""
+        targets = self.candidates(model, preferred)
+        if not targets:
+            raise RuntimeError("Nenhum provedor de IA disponível no momento")
+
+        if self.hedge_after is None or len(targets) < 2:
+            return self._route_sequential(targets, fn)
+        return self._route_hedged(targets, fn)
+
+    def _route_sequential(self, targets, fn) -> str:
+        last_error = None
+        for target in targets:
+            try:
+                return self._call(target, fn)
+            except DeadlineExceededError:
+                raise
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def _route_hedged(self, targets, fn) -> str:
+        primary = self._submit(targets[0], fn)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        # Primeiro alvo lento ou com erro: dispara o segundo
+        with self._lock:
+            self.hedges_fired += 1
+        HEDGES.inc(result="fired")
+        futures = {primary: targets[0], self._submit(targets[1], fn): targets[1]}
+        remaining = list(targets[2:])
+        last_error = None
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                target = futures.pop(future)
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedges_won += 1
+                        HEDGES.inc(result="won")
+                    return future.result()
+                last_error = future.exception()
+                if isinstance(last_error, DeadlineExceededError):
+                    raise last_error
+                if remaining:
+                    next_target = remaining.pop(0)
+                    futures[self._submit(next_target, fn)] = next_target
+        raise last_error
+
+    def route_stream(self, model: str,
+                     fn: Callable[["AIProviderInterface", str], Iterator[str]],
+                     preferred: Optional[str] = None) -> Iterator[str]:
+        """
+        Abre um stream no melhor alvo disponível
+
+        Sem hedging: só a abertura do stream é medida e, se falhar, o
+        próximo candidato é tentado.
+        """
+        targets = self.candidates(model, preferred)
+        if not targets:
+            raise RuntimeError("Nenhum provedor de IA disponível no momento")
+        return self._route_sequential(targets, fn)
+
+    def get_latency(self, name: str, model: str,
+                    pct: float = 50) -> Optional[float]:
+        """Percentil de latência observado de um alvo (None sem medições)"""
+        with self._lock:
+            stats = self._stats.get((name, model))
+            return stats.percentile(pct) if stats else None
+    
+    def get_stats(self) -> dict:
+        """Retorna latência, erros e estado do circuito por provedor/modelo"""
+        with self._lock:
+            per_target = {}
+            for (name, model), stats in self._stats.items():
+                breaker = self._breakers[(name, model)]
+                p50 = stats.percentile(50)
+                p95 = stats.percentile(95)
+                per_target[f"{name}/{model}"] = {
+                    "requests": stats.requests,
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "error_rate": round(stats.error_rate, 3),
+                    "circuit": breaker.state
+                }
+            return {
+                "targets": per_target,
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won
+            }
@@ -0,0 +1,201 @@
+"""
+Coalescência de requisições idênticas em andamento (single-flight)
+Seguindo princípios de Clean Architecture
+"""
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .admission import DeadlineExceededError
+from .metrics import metrics
+
+CALLS = metrics.counter(
+    "tcross_single_flight_total",
+    "Chamadas executadas e coalescidas em uma já em andamento",
+    ("result",))
+
+
+def make_request_key(message: str, model: str, *extra: str) -> str:
+    """
+    Chave de coalescência: prompt normalizado + modelo
+
+    A normalização ignora caixa, espaços repetidos e pontuação final, para
+    que "Qual o consumo?" e "qual o consumo" compartilhem a mesma chamada.
+    """
+    normalized = re.sub(r"\s+", " ", message.lower()).strip()
+    normalized = normalized.rstrip("?!. ")
+    return "\x1f".join((model, *extra, normalized))
+
+
+class _Call:
+    """Chamada em andamento compartilhada pelos chamadores"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamCall:
+    """Stream em andamento: os pedaços ficam em um buffer compartilhado"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Garante uma única execução por chave enquanto ela está em andamento
+
+    Quem chega com a mesma chave durante a execução espera e recebe o mesmo
+    resultado (ou a mesma exceção). Terminada a chamada, a chave é liberada:
+    isto não é um cache.
+
+    Cada chamador espera no máximo o próprio timeout (o tempo restante do
+    seu prazo): quem chegou depois não herda o prazo de quem executa e,
+    esgotado o seu, recebe DeadlineExceededError sem afetar os demais.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], str],
+           timeout: Optional[float] = None) -> str:
+        """Executa fn uma vez por chave em andamento"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                is_leader = True
+        CALLS.inc(result="executed" if is_leader else "coalesced")
+
+        if not is_leader:
+            if not call.done.wait(None if timeout is None
+                                  else max(0.0, timeout)):
+                raise DeadlineExceededError(
+                    "Prazo esgotado esperando a chamada em andamento")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def do_stream(self, key: str, fn: Callable[[], Iterator[str]],
+                  timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Versão para streaming
+
+        fn é chamada no thread do primeiro chamador (que ainda tem o contexto
+        da sessão) e o iterador resultante é consumido por um thread próprio,
+        que publica os pedaços no buffer. Todos os chamadores, inclusive o
+        primeiro, leem o buffer desde o início; assim um chamador que desiste
+        no meio não interrompe os demais.
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self.coalesced += 1
+                is_leader = False
+            else:
+                stream = _StreamCall()
+                self._streams[key] = stream
+                self.executed += 1
+                is_leader = True
+        CALLS.inc(result="executed" if is_leader else "coalesced")
+
+        if is_leader:
+            try:
+                upstream = fn()
+            except BaseException as e:
+                self._finish_stream(key, stream, e)
+                raise
+            threading.Thread(
+                target=self._pump_stream,
+                args=(key, stream, upstream),
+                name="single-flight-stream",
+                daemon=True
+            ).start()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return self._read_stream(stream, deadline)
+
+    def _pump_stream(self, key: str, stream: _StreamCall,
+                     upstream: Iterator[str]):
+        """Consome o stream original e publica cada pedaço"""
+        error = None
+        try:
+            for chunk in upstream:
+                with stream.condition:
+                    stream.chunks.append(chunk)
+                    stream.condition.notify_all()
+        except BaseException as e:
+            error = e
+        self._finish_stream(key, stream, error)
+
+    def _finish_stream(self, key: str, stream: _StreamCall,
+                       error: Optional[BaseException]):
+        """Libera a chave e acorda os leitores"""
+        with self._lock:
+            self._streams.pop(key, None)
+        with stream.condition:
+            stream.error = error
+            stream.finished = True
+            stream.condition.notify_all()
+
+    @staticmethod
+    def _read_stream(stream: _StreamCall,
+                     deadline: Optional[float]) -> Iterator[str]:
+        """Lê o buffer compartilhado até o fim do stream ou do prazo"""
+        position = 0
+        while True:
+            with stream.condition:
+                while position >= len(stream.chunks) and not stream.finished:
+                    if deadline is None:
+                        stream.condition.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceededError(
+                            "Prazo esgotado esperando o stream em andamento")
+                    stream.condition.wait(remaining)
+                pending = stream.chunks[position:]
+                finished = stream.finished
+                error = stream.error
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if finished and position >= len(stream.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def get_stats(self) -> dict:
+        """Retorna quantas chamadas foram executadas e quantas economizadas"""
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._streams)
+            }
@@ -0,0 +1,356 @@
+"""
+Tracing das etapas de cada requisição, exportado em OTLP/JSON
+Seguindo princípios de Clean Architecture
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+# Tipos de span do OTLP (SpanKind) e códigos de status
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """Identificação de um span, para ligar filhos a ele"""
+    trace_id: str
+    span_id: str
+    request_id: str
+    sampled: bool = True
+
+
+@dataclass
+class Span:
+    """Uma etapa medida de uma requisição"""
+    name: str
+    context: SpanContext
+    parent_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_OK
+    status_message: str = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+def _new_id(bytes_: int) -> str:
+    return f"{random.getrandbits(bytes_ * 8):0{bytes_ * 2}x}"
+
+
+def _otlp_value(value: Any) -> dict:
+    """Valor de atributo no formato JSON do OTLP"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span], service_name: str) -> dict:
+    """ExportTraceServiceRequest em JSON com os spans de um lote"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": _otlp_value(service_name)}]},
+        "scopeSpans": [{
+            "scope": {"name": "guiatcross"},
+            "spans": [{
+                "traceId": span.context.trace_id,
+                "spanId": span.context.span_id,
+                **({"parentSpanId": span.parent_id}
+                   if span.parent_id else {}),
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)}
+                               for key, value in span.attributes.items()],
+                "status": ({"code": span.status,
+                            "message": span.status_message}
+                           if span.status_message else {"code": span.status})
+            } for span in spans]
+        }]
+    }]}
+
+
+class FileSpanExporter:
+    """Um ExportTraceServiceRequest por linha (formato do otlpjsonfile)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, payload: dict):
+        line = json.dumps(payload, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class OTLPHttpExporter:
+    """Envia os lotes a um coletor local por OTLP/HTTP com JSON"""
+
+    def __init__(self, endpoint: str, timeout: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: dict):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """
+    Cria os spans das etapas e os exporta em lotes
+
+    O span ativo fica em uma ContextVar: etapas abertas dentro dele viram
+    filhas, inclusive em outros threads quando o contexto é copiado (ver
+    with_script_context). O primeiro span de uma requisição abre o trace
+    com o request_id dela como trace id, e todos os spans levam o atributo
+    request.id. A exportação roda em um thread próprio, a cada
+    flush_interval ou batch_size spans; se a fila encher, spans são
+    descartados em vez de atrasar a requisição. Listeners (add_listener)
+    recebem cada span fechado, mesmo sem exportador configurado.
+    """
+
+    def __init__(self, exporters: Optional[list] = None,
+                 service_name: str = "tcross-assistant",
+                 sample_rate: float = 1.0, batch_size: int = 256,
+                 flush_interval: float = 1.0, max_queue: int = 4096):
+        self.exporters = list(exporters or [])
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._current: contextvars.ContextVar[Optional[SpanContext]] = (
+            contextvars.ContextVar("current_span", default=None))
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        self._listeners: List[Callable[[Span], None]] = []
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        Configuração pelas variáveis de ambiente
+
+        TRACE_EXPORTER: "file", "otlp" ou ambos separados por vírgula
+        (vazio desliga); TRACE_FILE: arquivo do exportador file;
+        OTEL_EXPORTER_OTLP_ENDPOINT: coletor (padrão localhost:4318).
+        """
+        exporters = []
+        names = {name.strip() for name in
+                 os.getenv("TRACE_EXPORTER", "").lower().split(",")}
+        if "file" in names:
+            exporters.append(FileSpanExporter(
+                Path(os.getenv("TRACE_FILE", "traces/traces.jsonl"))))
+        if "otlp" in names:
+            exporters.append(OTLPHttpExporter(os.getenv(
+                "OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")))
+        return cls(exporters,
+                   service_name=os.getenv("OTEL_SERVICE_NAME",
+                                          "tcross-assistant"),
+                   sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1")))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters or self._listeners)
+
+    def add_listener(self, listener: Callable[[Span], None]):
+        """Chama listener(span) a cada span fechado"""
+        self._listeners.append(listener)
+
+    def current(self) -> Optional[SpanContext]:
+        """Span ativo no contexto atual"""
+        return self._current.get()
+
+    def current_request_id(self) -> Optional[str]:
+        current = self._current.get()
+        return current.request_id if current else None
+
+    def start_span(self, name: str, parent: Optional[SpanContext] = None,
+                   request_id: Optional[str] = None,
+                   kind: int = SPAN_KIND_INTERNAL,
+                   **attributes) -> Optional[Span]:
+        """
+        Abre um span sem torná-lo ativo (para streams e etapas que
+        terminam em outro ponto); feche com end_span. Retorna None com o
+        tracing desligado.
+        """
+        if not self.exporters and not self._listeners:
+            return None
+        parent = parent or self._current.get()
+        if parent is None:
+            request_id = request_id or _new_id(16)
+            context = SpanContext(
+                trace_id=request_id, span_id=_new_id(8),
+                request_id=request_id,
+                sampled=random.random() < self.sample_rate)
+        else:
+            context = SpanContext(parent.trace_id, _new_id(8),
+                                  parent.request_id, parent.sampled)
+        span = Span(name, context, parent.span_id if parent else None, kind)
+        span.attributes["request.id"] = context.request_id
+        span.attributes.update(attributes)
+        return span
+
+    def end_span(self, span: Optional[Span]):
+        """Fecha o span e o coloca na fila de exportação"""
+        if span is None or span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        for listener in self._listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                print(f"⚠️ Erro em listener de spans: {e}")
+        if not self.exporters or not span.context.sampled:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[SpanContext] = None,
+             request_id: Optional[str] = None,
+             kind: int = SPAN_KIND_INTERNAL,
+             **attributes) -> Iterator[Optional[Span]]:
+        """Span ativo durante o bloco; exceções marcam o status de erro"""
+        span = self.start_span(name, parent, request_id, kind, **attributes)
+        if span is None:
+            yield None
+            return
+        token = self._current.set(span.context)
+        try:
+            yield span
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            self._current.reset(token)
+            self.end_span(span)
+
+    def run_in_span(self, span: Optional[Span], fn: Callable[[], T]) -> T:
+        """Executa fn com span como ativo (span aberto por start_span)"""
+        if span is None:
+            return fn()
+        token = self._current.set(span.context)
+        try:
+            return fn()
+        finally:
+            self._current.reset(token)
+
+    def traced_stream(self, chunks: Iterator[str],
+                      span: Optional[Span]) -> Iterator[str]:
+        """Repassa o stream e fecha o span quando ele termina"""
+        if span is None:
+            return chunks
+
+        def run():
+            count = 0
+            try:
+                for chunk in chunks:
+                    count += 1
+                    yield chunk
+            except Exception as e:
+                span.record_error(e)
+                raise
+            finally:
+                span.set_attribute("chunks", count)
+                self.end_span(span)
+
+        return run()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._batch_ready.wait(self.flush_interval)
+            self._batch_ready.clear()
+            self.flush()
+
+    def _export(self, batch: List[Span]):
+        payload = to_otlp(batch, self.service_name)
+        for exporter in self.exporters:
+            try:
+                exporter.export(payload)
+            except Exception as e:
+                self.export_errors += 1
+                if self.export_errors == 1:
+                    print(f"⚠️ Falha ao exportar spans: {e}")
+        self.exported += len(batch)
+
+    def flush(self):
+        """Exporta o que estiver na fila (chamado também na saída)"""
+        with self._export_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._export(batch)
+
+    def get_stats(self) -> dict:
+        return {"enabled": self.enabled,
+                "exported": self.exported,
+                "dropped": self.dropped,
+                "export_errors": self.export_errors,
+                "queued": self._queue.qsize()}
+
+
+# Instância global, configurada pelas variáveis de ambiente
+tracer = Tracer.from_env()
@@ -0,0 +1,162 @@
+"""
+Aquecimento do processo antes de receber tráfego (readiness)
+Seguindo princípios de Clean Architecture
+"""
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from domain.entities import RequestContext, VEHICLE_VERSIONS, VEHICLE_YEARS
+from .adapter import AIService
+from .faq import load_questions
+from .metrics import metrics, set_readiness_probe
+
+WARMUP_QUESTIONS_PATH = Path("data") / "faq_questions.txt"
+
+READY = metrics.gauge(
+    "tcross_ready", "1 depois do aquecimento (readiness), 0 antes")
+WARMUP_SECONDS = metrics.gauge(
+    "tcross_warmup_seconds",
+    "Duração de cada etapa do aquecimento (step=\"total\" para todas)",
+    ("step",))
+
+
+@dataclass
+class WarmupStep:
+    """Resultado de uma etapa do aquecimento"""
+    name: str
+    duration_ms: float
+    ok: bool
+    details: dict = field(default_factory=dict)
+
+
+class Warmup:
+    """
+    Aquecimento do processo e estado de prontidão
+
+    run() executa as etapas em ordem, medindo cada uma: index (lê todas as
+    páginas do índice e faz uma busca), connections (abre as conexões TLS
+    dos provedores remotos) e retrieval (embeddings e busca das perguntas
+    mais frequentes, que ficam no cache de recuperação). O carregamento do
+    índice em si acontece ao criar o AIService e aparece em index.load_ms.
+
+    Uma etapa que falha não impede as seguintes nem a prontidão: a
+    instância só fica fria naquele ponto, e o erro vai para o relatório.
+    """
+
+    def __init__(self, ai_service: AIService,
+                 questions: Optional[List[str]] = None,
+                 vehicles: Optional[List[Tuple[str, str]]] = None,
+                 timeout: float = 5.0):
+        self.ai_service = ai_service
+        self.questions = questions or []
+        # Padrão: o veículo que a interface mostra selecionado ao abrir
+        self.vehicles = vehicles or [(VEHICLE_YEARS[0], VEHICLE_VERSIONS[0])]
+        self.timeout = timeout
+        self.steps: List[WarmupStep] = []
+        self.duration_ms: Optional[float] = None
+        self._done = threading.Event()
+        READY.set_function(lambda: int(self.ready))
+        WARMUP_SECONDS.set_function(self._durations)
+
+    @classmethod
+    def from_env(cls, ai_service: AIService) -> "Warmup":
+        """
+        Configuração pelas variáveis de ambiente
+
+        WARMUP_QUESTIONS: arquivo de perguntas frequentes (padrão
+        data/faq_questions.txt); WARMUP_TIMEOUT_S: prazo de cada conexão
+        (padrão 5).
+        """
+        path = Path(os.getenv("WARMUP_QUESTIONS", str(WARMUP_QUESTIONS_PATH)))
+        try:
+            questions = load_questions(path)
+        except OSError as e:
+            print(f"⚠️ Perguntas do aquecimento indisponíveis: {e}")
+            questions = []
+        return cls(ai_service, questions,
+                   timeout=float(os.getenv("WARMUP_TIMEOUT_S", "5")))
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera o fim do aquecimento; retorna se terminou"""
+        return self._done.wait(timeout)
+
+    def run(self) -> "Warmup":
+        """Executa as etapas e marca a instância como pronta"""
+        start = time.perf_counter()
+        try:
+            self._step("index", self.ai_service.warm_up_index)
+            self._step("connections", lambda: self.ai_service
+                       .warm_up_connections(self.timeout))
+            self._step("retrieval", self._prefetch)
+        finally:
+            self.duration_ms = (time.perf_counter() - start) * 1000
+            self._done.set()
+        failed = [step.name for step in self.steps if not step.ok]
+        print(f"🔥 Aquecimento em {self.duration_ms:.0f} ms"
+              + (f" (falhas: {', '.join(failed)})" if failed else ""))
+        return self
+
+    def _step(self, name: str, fn: Callable[[], dict]):
+        start = time.perf_counter()
+        try:
+            details, ok = fn(), True
+        except Exception as e:
+            details, ok = {"error": f"{type(e).__name__}: {e}"}, False
+        self.steps.append(WarmupStep(
+            name, round((time.perf_counter() - start) * 1000, 1), ok,
+            details))
+
+    def _prefetch(self) -> dict:
+        prompts = [RequestContext(question, year, version).to_prompt()
+                   for year, version in self.vehicles
+                   for question in self.questions]
+        if prompts:
+            self.ai_service.prefetch_retrieval(prompts)
+        return {"prompts": len(prompts)}
+
+    def _durations(self) -> dict:
+        durations = {(step.name,): step.duration_ms / 1000
+                     for step in list(self.steps)}
+        if self.duration_ms is not None:
+            durations[("total",)] = self.duration_ms / 1000
+        return durations
+
+    def probe(self) -> Tuple[bool, dict]:
+        """Estado para GET /ready"""
+        return self.ready, {
+            "state": "ready" if self.ready else "warming",
+            "duration_ms": (round(self.duration_ms, 1)
+                            if self.duration_ms is not None else None),
+            "steps": [asdict(step) for step in list(self.steps)]
+        }
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def start_warmup(ai_service: AIService) -> Optional[Warmup]:
+    """
+    Inicia (uma vez por processo) o aquecimento em segundo plano
+
+    Enquanto ele roda, GET /ready responde 503. Com WARMUP=0 não faz nada
+    e o processo fica pronto assim que atende.
+    """
+    global _warmup
+    if os.getenv("WARMUP", "1") == "0":
+        return None
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Warmup.from_env(ai_service)
+            set_readiness_probe(_warmup.probe)
+            threading.Thread(target=_warmup.run, daemon=True,
+                             name="warmup").start()
+        return _warmup
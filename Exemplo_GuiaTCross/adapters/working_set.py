@@ -0,0 +1,93 @@
+"""
+Conjunto de trabalho da recuperação por sessão de chat
+Seguindo princípios de Clean Architecture
+"""
+import sys
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class RetrievalWorkingSet:
+    """
+    Trechos recuperados recentemente em uma conversa, com seus vetores
+
+    Perguntas de acompanhamento costumam precisar dos mesmos trechos do
+    manual; elas são pontuadas primeiro contra este conjunto pequeno e só
+    vão ao índice completo se o melhor trecho ficar abaixo de min_score.
+    Os trechos são identificados pela posição no índice FAISS e os mais
+    antigos saem quando o conjunto passa de max_chunks.
+    """
+
+    def __init__(self, min_score: float, max_chunks: int = 32):
+        self.min_score = min_score
+        self.max_chunks = max_chunks
+        self._chunks: "OrderedDict[int, Tuple[str, np.ndarray]]" = (
+            OrderedDict())
+        self._matrix: Optional[np.ndarray] = None
+        self._positions: List[int] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def add(self, positions: Sequence[int], texts: Sequence[str],
+            vectors: np.ndarray):
+        """Inclui (ou renova) trechos no conjunto"""
+        for position, text, vector in zip(positions, texts, vectors):
+            self._chunks[position] = (text, vector)
+            self._chunks.move_to_end(position)
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+        self._matrix = None
+
+    def search(self, query_vector: np.ndarray, k: int
+               ) -> Optional[List[Tuple[int, str, float]]]:
+        """
+        Os k trechos mais similares, ou None se o conjunto não basta
+
+        Retorna triplas (posição, texto, similaridade de cosseno). Conta
+        acerto quando há ao menos k trechos e o melhor passa de min_score.
+        """
+        if len(self._chunks) < k:
+            self.misses += 1
+            return None
+        if self._matrix is None:
+            self._positions = list(self._chunks)
+            self._matrix = np.vstack(
+                [vector for _, vector in self._chunks.values()])
+
+        scores = self._matrix @ query_vector
+        best = np.argsort(-scores)[:k]
+        if scores[best[0]] < self.min_score:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        results = []
+        for index in best:
+            position = self._positions[index]
+            self._chunks.move_to_end(position)
+            results.append((position, self._chunks[position][0],
+                            float(scores[index])))
+        return results
+
+    def estimate_bytes(self) -> int:
+        """Memória aproximada dos trechos, vetores e da matriz de busca"""
+        total = sum(sys.getsizeof(text) + vector.nbytes
+                    for text, vector in self._chunks.values())
+        if self._matrix is not None:
+            total += self._matrix.nbytes
+        return total
+
+    def get_stats(self) -> dict:
+        """Retorna tamanho do conjunto e taxa de acerto"""
+        lookups = self.hits + self.misses
+        return {
+            "chunks": len(self._chunks),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
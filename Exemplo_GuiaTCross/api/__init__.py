@@ -0,0 +1,8 @@
+"""
+API Layer - API HTTP (ASGI) sem interface
+Seguindo princípios de Clean Architecture
+"""
+
+from .app import ChatAPI, HTTPError, create_app
+
+__all__ = ['ChatAPI', 'HTTPError', 'create_app']
@@ -0,0 +1,515 @@
+"""
+API HTTP (ASGI) do assistente, sem a interface do Streamlit
+Seguindo princípios de Clean Architecture - UI Layer
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (Awaitable, Callable, Dict, Iterator, List, Optional,
+                    Tuple)
+
+from adapters import ai_service, ProviderBusyError
+from adapters.metrics import CONTENT_TYPE, metrics
+from adapters.profiling import profiler
+from adapters.tracing import SPAN_KIND_SERVER, tracer
+from adapters.warmup import start_warmup
+from domain import RequestContext, VEHICLE_VERSIONS, VEHICLE_YEARS
+from use_cases import (ChatUseCase, FileSessionStore, InputValidator,
+                       RateLimiter, SessionManager, UseCaseFactory)
+
+MAX_BODY_BYTES = 64 * 1024
+
+API_REQUESTS = metrics.counter(
+    "tcross_api_requests_total", "Requisições da API HTTP por rota e status",
+    ("route", "status"))
+API_LATENCY = metrics.histogram(
+    "tcross_api_request_seconds",
+    "Duração das requisições da API HTTP por rota (até o fim do corpo)",
+    ("route",))
+
+Send = Callable[[dict], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict]]
+
+
+class HTTPError(Exception):
+    """Erro devolvido ao cliente como {"error": mensagem}"""
+
+    def __init__(self, status: int, message: str,
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class APISession:
+    """Conversa da API: um ChatUseCase e uma requisição por vez"""
+
+    def __init__(self, use_case: ChatUseCase):
+        self.use_case = use_case
+        self.lock = asyncio.Lock()
+        # Versão da conversa em disco que está em memória (com store)
+        self.version: Optional[Tuple[int, int]] = None
+
+
+class ChatAPI:
+    """
+    Aplicação ASGI com sessões, mensagens (com streaming) e estatísticas
+
+    Usa os mesmos use cases e adapters da interface: validação, rate limit
+    por sessão, memória e despejo das sessões ociosas (SessionManager),
+    tracing e perfil. As chamadas bloqueantes (disco, SessionManager,
+    criação de use cases, provedores) rodam em um pool de threads
+    (API_THREADS, padrão 64), nunca no event loop; o limite real de
+    chamadas simultâneas aos provedores continua sendo a fila de admissão.
+
+    Com store (vários workers), cada conversa é lida do disco quando outro
+    processo a alterou e gravada ao fim de cada mensagem, sob uma trava
+    por sessão entre processos; qualquer worker atende qualquer sessão.
+
+    Rotas:
+        POST   /sessions                {"model"?, "provider"?}
+        GET    /sessions/{id}           conversa e estatísticas
+        DELETE /sessions/{id}
+        POST   /sessions/{id}/messages  {"message", "year"?, "version"?,
+                                         "stream"?}
+        GET    /stats, /metrics, /healthz, /ready
+
+    Com "stream": true a resposta vem como text/event-stream: um evento
+    por pedaço ({"delta"}) e um evento done com o modelo usado.
+    """
+
+    def __init__(self, factory: UseCaseFactory,
+                 session_manager: Optional[SessionManager] = None,
+                 store: Optional[FileSessionStore] = None,
+                 threads: int = 64, rate_limit: bool = True):
+        self.factory = factory
+        self.session_manager = session_manager
+        self.store = store
+        self.threads = threads
+        self.validator = InputValidator()
+        # Desligado só para testes de carga (API_RATE_LIMIT=0)
+        self.rate_limiter = RateLimiter() if rate_limit else None
+        self.sessions: Dict[str, APISession] = {}
+        # O mapa é alterado pelos threads do pool
+        self._sessions_lock = threading.Lock()
+        self.warmup = None
+        self._routes: List[Tuple[str, "re.Pattern", str, Callable]] = [
+            ("POST", re.compile(r"/sessions"), "sessions.create",
+             self._create_session),
+            ("GET", re.compile(r"/sessions/(?P<session_id>[\w-]+)"),
+             "sessions.get", self._get_session),
+            ("DELETE", re.compile(r"/sessions/(?P<session_id>[\w-]+)"),
+             "sessions.delete", self._delete_session),
+            ("POST", re.compile(r"/sessions/(?P<session_id>[\w-]+)/messages"),
+             "messages.create", self._create_message),
+            ("GET", re.compile(r"/stats"), "stats", self._stats),
+            ("GET", re.compile(r"/metrics"), "metrics", self._metrics),
+            ("GET", re.compile(r"/healthz"), "healthz", self._healthz),
+            ("GET", re.compile(r"/ready"), "ready", self._ready),
+        ]
+
+    async def __call__(self, scope: dict, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        start = time.perf_counter()
+        route, status = "not_found", 500
+        try:
+            route, handler, params = self._match(scope["method"],
+                                                 scope["path"])
+            status = await handler(scope, receive, send, **params)
+        except HTTPError as e:
+            status = e.status
+            await _send_json(send, e.status, {"error": e.message}, e.headers)
+        except Exception as e:
+            print(f"❌ Erro na API: {type(e).__name__}: {e}")
+            await _send_json(send, 500, {"error": "Erro interno"})
+        finally:
+            API_REQUESTS.inc(route=route, status=str(status))
+            API_LATENCY.observe(time.perf_counter() - start, route=route)
+
+    async def _lifespan(self, receive: Receive, send: Send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                asyncio.get_running_loop().set_default_executor(
+                    ThreadPoolExecutor(self.threads,
+                                       thread_name_prefix="api"))
+                self.warmup = start_warmup(ai_service)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _match(self, method: str, path: str
+               ) -> Tuple[str, Callable, Dict[str, str]]:
+        path = path.rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, route, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return route, handler, match.groupdict()
+            allowed = True
+        if allowed:
+            raise HTTPError(405, "Método não permitido")
+        raise HTTPError(404, "Rota não encontrada")
+
+    # Sessões
+
+    async def _create_session(self, scope, receive, send) -> int:
+        payload = await _read_json(receive)
+        session = await asyncio.to_thread(self._new_session, payload)
+        await _send_json(send, 201, {"session_id": session.id,
+                                     "model": session.model})
+        return 201
+
+    def _new_session(self, payload: dict):
+        """Cria a conversa, grava no disco e registra no SessionManager"""
+        use_case = self.factory.create_chat_use_case()
+        if payload.get("provider"):
+            try:
+                use_case.set_provider(payload["provider"])
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+        session = use_case.start_new_session(payload.get("model"))
+        self._forget_dropped()
+        api_session = APISession(use_case)
+        with self._sessions_lock:
+            self.sessions[session.id] = api_session
+        if self.store:
+            self._save(session.id, api_session)
+            if self.session_manager:
+                self.store.purge_idle(self.session_manager.idle_ttl)
+        if self.session_manager:
+            self.session_manager.touch(session.id, use_case)
+        return session
+
+    async def _get_session(self, scope, receive, send, session_id) -> int:
+        session = await asyncio.to_thread(self._session, session_id)
+        async with session.lock:
+            if self.store:
+                await asyncio.to_thread(self._sync, session_id, session)
+        chat = session.use_case.current_session
+        await _send_json(send, 200, {
+            **chat.to_dict(),
+            "stats": session.use_case.get_session_stats(),
+            "memory_bytes": (self.session_manager.get_session_bytes(
+                session_id) if self.session_manager else None)
+        })
+        return 200
+
+    async def _delete_session(self, scope, receive, send, session_id) -> int:
+        await asyncio.to_thread(self._remove_session, session_id)
+        await _send_json(send, 200, {"deleted": session_id})
+        return 200
+
+    def _remove_session(self, session_id: str):
+        """Apaga a conversa da memória, do disco e do conjunto de trabalho"""
+        with self._sessions_lock:
+            session = self.sessions.pop(session_id, None)
+        stored = self.store is not None and self.store.exists(session_id)
+        if session is None and not stored:
+            raise HTTPError(404, "Sessão não encontrada")
+        if session is not None:
+            session.use_case.clear_session()
+        if stored:
+            self.store.delete(session_id)
+        ai_service.release_session(session_id)
+
+    def _session(self, session_id: str) -> APISession:
+        """
+        Sessão ativa (traz de volta a conversa gravada em disco)
+
+        Faz E/S e pode despejar sessões: chamar fora do event loop.
+        """
+        stored = self.store is not None and self.store.exists(session_id)
+        with self._sessions_lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            if not stored:
+                raise HTTPError(404, "Sessão não encontrada")
+            # Criada (ou atendida por último) em outro worker
+            created = APISession(self.factory.create_chat_use_case())
+            with self._sessions_lock:
+                session = self.sessions.setdefault(session_id, created)
+        if self.session_manager:
+            self.session_manager.touch(session_id, session.use_case)
+        if session.use_case.current_session is None and not stored:
+            # Descartada por ociosidade
+            with self._sessions_lock:
+                self.sessions.pop(session_id, None)
+            raise HTTPError(404, "Sessão expirada")
+        return session
+
+    def _sync(self, session_id: str, session: APISession):
+        """Lê a conversa do disco se outro processo a alterou"""
+        version = self.store.version(session_id)
+        if version is None:
+            raise HTTPError(404, "Sessão expirada")
+        if (session.use_case.current_session is None or
+                version != session.version):
+            session.use_case.current_session = self.store.load(session_id)
+            session.version = version
+
+    def _save(self, session_id: str, session: APISession):
+        if session.use_case.current_session is not None:
+            self.store.save(session.use_case.current_session)
+            session.version = self.store.version(session_id)
+
+    @contextmanager
+    def _shared(self, session_id: str, session: APISession) -> Iterator[None]:
+        """Conversa atualizada e travada entre processos durante o bloco"""
+        if self.store is None:
+            yield
+            return
+        with self.store.lock(session_id):
+            self._sync(session_id, session)
+            try:
+                yield
+            finally:
+                self._save(session_id, session)
+
+    def _forget_dropped(self):
+        """Tira do mapa as sessões descartadas pelo SessionManager"""
+        if not self.session_manager:
+            return
+        with self._sessions_lock:
+            dropped = [session_id
+                       for session_id, session in self.sessions.items()
+                       if session.use_case.current_session is None and
+                       not self.session_manager.has_session(session_id)]
+            for session_id in dropped:
+                del self.sessions[session_id]
+
+    # Mensagens
+
+    async def _create_message(self, scope, receive, send, session_id) -> int:
+        payload = await _read_json(receive)
+        if not isinstance(payload.get("message"), str):
+            raise HTTPError(400, "Campo message obrigatório")
+        # Validado antes de tocar na sessão: nada é registrado nem gravado
+        year = _choice(payload, "year", VEHICLE_YEARS)
+        version = _choice(payload, "version", VEHICLE_VERSIONS)
+        session = await asyncio.to_thread(self._session, session_id)
+        context = RequestContext(question=payload["message"],
+                                 vehicle_year=year, vehicle_version=version)
+        async with session.lock:
+            if payload.get("stream"):
+                return await self._stream_message(send, session_id, session,
+                                                  context)
+            body = await asyncio.to_thread(self._respond, session_id,
+                                           session, context)
+        await _send_json(send, 200, body)
+        return 200
+
+    def _respond(self, session_id: str, session: APISession,
+                 context: RequestContext) -> dict:
+        """Pergunta e resposta completas, como na interface"""
+        with profiler.profile(context.request_id), \
+                tracer.span("chat.request", request_id=context.request_id,
+                            kind=SPAN_KIND_SERVER, api=True) as root, \
+                self._shared(session_id, session):
+            try:
+                self._admit(session_id, context)
+                session.use_case.send_message(context.question)
+                ai_message = session.use_case.get_ai_response(
+                    context.to_prompt(), context)
+            except HTTPError:
+                raise
+            except Exception as e:
+                if root:
+                    root.record_error(e)
+                raise _as_http_error(e)
+        return {"session_id": session_id, "request_id": context.request_id,
+                "message": ai_message.to_dict(), "usage": context.usage}
+
+    async def _stream_message(self, send: Send, session_id: str,
+                              session: APISession,
+                              context: RequestContext) -> int:
+        root = tracer.start_span("chat.request",
+                                 request_id=context.request_id,
+                                 kind=SPAN_KIND_SERVER, api=True, stream=True)
+        handle = None
+        try:
+            if self.store:
+                handle = await asyncio.to_thread(self.store.acquire,
+                                                 session_id)
+                await asyncio.to_thread(self._sync, session_id, session)
+            # Erros até o primeiro pedaço ainda viram status HTTP
+            chunks, first = await asyncio.to_thread(
+                tracer.run_in_span, root,
+                lambda: self._open_stream(session_id, session, context))
+        except Exception as e:
+            if root and not isinstance(e, HTTPError):
+                root.record_error(e)
+            tracer.end_span(root)
+            if handle is not None:
+                await asyncio.to_thread(self._save, session_id, session)
+                self.store.release(handle)
+            raise e if isinstance(e, HTTPError) else _as_http_error(e)
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream"),
+                                (b"cache-control", b"no-cache")]})
+        try:
+            chunk = first
+            while chunk is not None:
+                await _send_event(send, "message", {"delta": chunk})
+                chunk = await asyncio.to_thread(next, chunks, None)
+            last = session.use_case.current_session.messages[-1]
+            await _send_event(send, "done", {
+                "request_id": context.request_id,
+                "model_used": last.model_used, "usage": context.usage})
+        except Exception as e:
+            if root:
+                root.record_error(e)
+            await _send_event(send, "error", {"error": str(e)})
+        finally:
+            tracer.end_span(root)
+            if handle is not None:
+                await asyncio.to_thread(self._save, session_id, session)
+                self.store.release(handle)
+            await send({"type": "http.response.body", "body": b"",
+                        "more_body": False})
+        return 200
+
+    def _open_stream(self, session_id: str, session: APISession,
+                     context: RequestContext
+                     ) -> Tuple[Iterator[str], Optional[str]]:
+        """Valida, registra a pergunta e espera o primeiro pedaço"""
+        with profiler.profile(context.request_id, "first_chunk"):
+            self._admit(session_id, context)
+            session.use_case.send_message(context.question)
+            chunks = session.use_case.stream_ai_response(
+                context.to_prompt(), context)
+            return chunks, next(chunks, None)
+
+    def _admit(self, session_id: str, context: RequestContext):
+        """Validação da entrada e rate limit da sessão"""
+        with tracer.span("validation") as span:
+            validation = self.validator.validate_and_sanitize(
+                context.question)
+            if span:
+                span.set_attribute("risk_level", validation.risk_level)
+        if not validation.is_valid:
+            raise HTTPError(400, "; ".join(validation.warnings))
+        if self.rate_limiter:
+            with tracer.span("rate_limit"):
+                allowed, reason = self.rate_limiter.is_allowed(session_id)
+            if not allowed:
+                raise HTTPError(429, reason, {"retry-after": "60"})
+        context.question = validation.sanitized_message
+
+    # Operação
+
+    async def _stats(self, scope, receive, send) -> int:
+        await _send_json(send, 200, {
+            "worker_pid": os.getpid(),
+            "api_sessions": len(self.sessions),
+            "sessions": (self.session_manager.get_stats()
+                         if self.session_manager else None),
+            "admission": ai_service.get_admission_stats(),
+            "profiler": profiler.get_stats()
+        })
+        return 200
+
+    async def _metrics(self, scope, receive, send) -> int:
+        await _send(send, 200, CONTENT_TYPE, metrics.render())
+        return 200
+
+    async def _healthz(self, scope, receive, send) -> int:
+        await _send(send, 200, "text/plain; charset=utf-8", "ok\n")
+        return 200
+
+    async def _ready(self, scope, receive, send) -> int:
+        ready, details = (self.warmup.probe() if self.warmup
+                          else (True, {}))
+        status = 200 if ready else 503
+        await _send_json(send, status, {"ready": ready, **details})
+        return status
+
+
+def _as_http_error(error: Exception) -> HTTPError:
+    if isinstance(error, ProviderBusyError):
+        # Fila cheia: recusa rápida, o cliente tenta de novo
+        return HTTPError(503, str(error), {"retry-after": "1"})
+    print(f"❌ Erro ao processar mensagem: {type(error).__name__}: {error}")
+    return HTTPError(500, f"Erro ao processar mensagem: {error}")
+
+
+def _choice(payload: dict, field: str, options: List[str]) -> str:
+    """Campo opcional que, se informado, deve ser uma das opções"""
+    value = payload.get(field)
+    if value is None:
+        return options[0]
+    if not isinstance(value, str) or value not in options:
+        raise HTTPError(400, f"Campo {field} inválido; use um de: "
+                             f"{', '.join(options)}")
+    return value
+
+
+async def _read_json(receive: Receive) -> dict:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "Corpo da requisição muito grande")
+        if not message.get("more_body"):
+            break
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "JSON inválido")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "O corpo deve ser um objeto JSON")
+    return payload
+
+
+async def _send(send: Send, status: int, content_type: str, text: str,
+                headers: Optional[Dict[str, str]] = None):
+    body = text.encode("utf-8")
+    raw_headers = [(b"content-type", content_type.encode()),
+                   (b"content-length", str(len(body)).encode())]
+    raw_headers += [(name.encode(), value.encode())
+                    for name, value in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status,
+                "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send: Send, status: int, payload: dict,
+                     headers: Optional[Dict[str, str]] = None):
+    await _send(send, status, "application/json",
+                json.dumps(payload, ensure_ascii=False), headers)
+
+
+async def _send_event(send: Send, event: str, payload: dict):
+    data = json.dumps(payload, ensure_ascii=False)
+    await send({"type": "http.response.body",
+                "body": f"event: {event}\ndata: {data}\n\n".encode("utf-8"),
+                "more_body": True})
+
+
+def create_app() -> ChatAPI:
+    """Aplicação com a configuração das variáveis de ambiente"""
+    session_dir = os.getenv("API_SESSION_DIR")
+    return ChatAPI(UseCaseFactory(ai_service),
+                   SessionManager.from_env(ai_service),
+                   store=(FileSessionStore(Path(session_dir))
+                          if session_dir else None),
+                   threads=int(os.getenv("API_THREADS", "64")),
+                   rate_limit=os.getenv("API_RATE_LIMIT", "1") != "0")
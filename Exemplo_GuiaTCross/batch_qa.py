@@ -0,0 +1,205 @@
+"""
+Responde em lote um arquivo JSONL de perguntas sobre o VW T-Cross
+Seguindo princípios de Clean Architecture
+
+Cada linha de entrada é um objeto com "question" e, opcionalmente, "id",
+"year", "version" e "model". As perguntas são processadas em janelas: a
+recuperação de cada janela usa uma única chamada de embeddings e a geração
+roda com concorrência limitada. Cada resultado é gravado assim que fica
+pronto, com tempos e consumo de tokens. Rodar de novo com o mesmo arquivo
+de saída retoma de onde parou (itens com erro são refeitos).
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python batch_qa.py perguntas.jsonl respostas.jsonl --concurrency 8
+"""
+import argparse
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+from adapters import ai_service
+from adapters.cascade import estimate_tokens
+from domain.entities import VEHICLE_VERSIONS, VEHICLE_YEARS, RequestContext
+
+
+def read_questions(path: Path, default_year: str,
+                   default_version: str) -> Iterator[dict]:
+    """Lê as perguntas, preenchendo id e veículo quando ausentes"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_number))
+            item["id"] = str(item["id"])
+            item["year"] = str(item.get("year") or default_year)
+            item["version"] = item.get("version") or default_version
+            yield item
+
+
+def load_completed(path: Path) -> Set[str]:
+    """
+    Ids já respondidos no arquivo de saída
+
+    O arquivo é regravado só com as respostas válidas: linhas truncadas
+    (interrupção no meio da escrita) e itens com erro são descartados para
+    serem refeitos.
+    """
+    if not path.exists():
+        return set()
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                records.append(record)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    tmp_path.replace(path)
+    return {record["id"] for record in records}
+
+
+def answer_item(item: dict, default_model: str, retrieval_ms: float,
+                queued_at: float) -> dict:
+    """Gera a resposta de um item, medindo tempo e tokens"""
+    context = RequestContext(question=item["question"],
+                             vehicle_year=item["year"],
+                             vehicle_version=item["version"])
+    prompt = context.to_prompt()
+    model = item.get("model") or default_model
+    record = {
+        "id": item["id"],
+        "question": item["question"],
+        "year": item["year"],
+        "version": item["version"],
+        "model": model
+    }
+
+    start = time.perf_counter()
+    try:
+        answer = ai_service.get_response(prompt, model, context=context)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["generation_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return record
+    end = time.perf_counter()
+
+    # Provedores que não informam consumo (ou chamadas coalescidas com
+    # outra idêntica) recebem uma estimativa
+    usage = context.usage
+    if not usage:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(answer)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    record.update({
+        "answer": answer,
+        "queue_ms": round((start - queued_at) * 1000, 1),
+        "retrieval_ms": round(retrieval_ms, 2),
+        "generation_ms": round((end - start) * 1000, 1),
+        "usage": usage,
+        "usage_estimated": not context.usage
+    })
+    return record
+
+
+def iter_windows(items: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    """Agrupa os itens em janelas de até size perguntas"""
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def run_batch(input_path: Path, output_path: Path, model: str,
+              concurrency: int, window_size: int, default_year: str,
+              default_version: str) -> Dict[str, int]:
+    """Processa o arquivo de entrada e grava as respostas em streaming"""
+    completed = load_completed(output_path)
+    pending_items = (item for item in read_questions(
+        input_path, default_year, default_version)
+        if item["id"] not in completed)
+    counts = {"skipped": len(completed), "answered": 0, "errors": 0}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            open(output_path, "a", encoding="utf-8") as out:
+        in_flight = set()
+
+        def drain(max_in_flight: int):
+            nonlocal in_flight
+            while len(in_flight) > max_in_flight:
+                done, in_flight = wait(in_flight,
+                                       return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    counts["errors" if "error" in record else "answered"] += 1
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+
+        for window in iter_windows(pending_items, window_size):
+            prompts = [RequestContext(question=item["question"],
+                                      vehicle_year=item["year"],
+                                      vehicle_version=item["version"]
+                                      ).to_prompt() for item in window]
+            start = time.perf_counter()
+            ai_service.prefetch_retrieval(prompts)
+            retrieval_ms = ((time.perf_counter() - start) * 1000 /
+                            len(window))
+
+            queued_at = time.perf_counter()
+            for item in window:
+                in_flight.add(pool.submit(answer_item, item, model,
+                                          retrieval_ms, queued_at))
+            # Limita a fila: no máximo uma janela aguardando além das que
+            # já estão em execução
+            drain(concurrency + window_size)
+        drain(0)
+
+    return counts
+
+
+def main():
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("input", type=Path, help="perguntas (JSONL)")
+    parser.add_argument("output", type=Path, help="respostas (JSONL)")
+    parser.add_argument("--model", default="o1")
+    parser.add_argument("--provider", default=None,
+                        help="provedor preferido (padrão: openai)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--window", type=int, default=32,
+                        help="perguntas por chamada de embeddings")
+    parser.add_argument("--year", default=VEHICLE_YEARS[0])
+    parser.add_argument("--version", default=VEHICLE_VERSIONS[0])
+    args = parser.parse_args()
+
+    if args.provider:
+        ai_service.set_provider(args.provider)
+
+    start = time.perf_counter()
+    counts = run_batch(args.input, args.output, args.model,
+                       args.concurrency, args.window, args.year, args.version)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {counts['answered']} respondidas, {counts['errors']} com erro, "
+          f"{counts['skipped']} já existentes ({elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark do controle de admissão das chamadas aos provedores
+
+Simula um pico de sessões simultâneas contra um provedor que degrada com
+a concorrência (a latência cresce com o número de chamadas em andamento
+acima da capacidade dele). Compara chamadas sem limite com o
+BoundedExecutor: latência das requisições atendidas e recusas rápidas.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_admission.py --sessions 64
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.admission import (BoundedExecutor,  # noqa: E402
+                                ProviderBusyError)
+
+
+class DegradingProvider:
+    """Provedor cuja latência cresce com a concorrência acima da capacidade"""
+
+    def __init__(self, base_ms: float, capacity: int):
+        self.base = base_ms / 1000
+        self.capacity = capacity
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def call(self) -> str:
+        with self._lock:
+            self.in_flight += 1
+            load = max(1.0, self.in_flight / self.capacity)
+        time.sleep(self.base * load ** 2)
+        with self._lock:
+            self.in_flight -= 1
+        return "ok"
+
+
+def run(sessions: int, provider: DegradingProvider,
+        executor: BoundedExecutor = None) -> dict:
+    latencies, rejected_ms = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(sessions)
+
+    def session():
+        start_barrier.wait()
+        start = time.perf_counter()
+        try:
+            if executor:
+                executor.run(provider.call)
+            else:
+                provider.call()
+        except ProviderBusyError:
+            with lock:
+                rejected_ms.append((time.perf_counter() - start) * 1000)
+            return
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    result = {
+        "admission": executor is not None,
+        "sessions": sessions,
+        "served": len(latencies),
+        "rejected": len(rejected_ms),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 1),
+        "max_ms": round(latencies[-1], 1),
+    }
+    if rejected_ms:
+        result["reject_max_ms"] = round(max(rejected_ms), 2)
+    if executor:
+        result["executor"] = executor.get_stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--base-ms", type=float, default=200)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=16)
+    args = parser.parse_args()
+
+    provider = DegradingProvider(args.base_ms, args.capacity)
+    print(json.dumps(run(args.sessions, provider)))
+    executor = BoundedExecutor(args.max_concurrent, args.max_queue,
+                               default_timeout=30)
+    print(json.dumps(run(args.sessions, provider, executor)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Teste de carga da API HTTP comparada ao caminho do Streamlit, sem rede
+
+Com o provedor simulado e embeddings locais, --concurrency clientes abrem
+uma sessão cada e mandam --turns perguntas. Na API (serve_api.py, um
+processo por valor de --workers) cada pergunta é um POST; no Streamlit
+cada cliente é uma sessão do AppTest, que reexecuta o script inteiro da
+interface a cada pergunta, como o servidor faz. O AppTest não roda
+sessões em paralelo, então as reexecuções são serializadas, o que equivale
+ao servidor do Streamlit, um processo só, com o GIL. Mostra mensagens por
+segundo e p50/p95/p99 por alvo e, na API, a memória proporcional (PSS)
+somada dos workers, que mostra o índice mapeado sendo compartilhado.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_api.py --workers 1 4 --concurrency 16
+    python benchmarks/bench_api.py --target api --stream --profile gpt-4o-mini
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+GOLDEN_SET = Path(__file__).resolve().parent / "data" / "golden_questions.jsonl"
+
+
+def load_questions(path: Path) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return round(values[int(pct / 100 * (len(values) - 1))] * 1000, 2)
+
+
+def run_clients(concurrency: int, turns: int, questions: List[str],
+                client_factory: Callable[[], Callable[[str], None]]) -> dict:
+    """Cada cliente abre sua sessão e faz as perguntas em sequência"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def client(index: int):
+        try:
+            ask = client_factory()
+        except Exception as e:
+            with lock:
+                errors[f"session: {type(e).__name__}"] += 1
+            return
+        for turn in range(turns):
+            question = (f"{questions[(index * turns + turn) % len(questions)]}"
+                        f" #{index}.{turn}")
+            start = time.perf_counter()
+            try:
+                ask(question)
+            except Exception as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {"concurrency": concurrency,
+              "messages": len(latencies),
+              "errors": dict(errors),
+              "wall_s": round(elapsed, 2),
+              "rps": round(len(latencies) / elapsed, 2)}
+    if latencies:
+        result.update(p50_ms=percentile(latencies, 50),
+                      p95_ms=percentile(latencies, 95),
+                      p99_ms=percentile(latencies, 99))
+    return result
+
+
+class APIClient:
+    """Uma conexão keep-alive e uma sessão da API"""
+
+    def __init__(self, port: int, stream: bool):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                     timeout=120)
+        self.stream = stream
+        self.session_id = self._post("/sessions", {})["session_id"]
+
+    def _post(self, path: str, payload: dict) -> dict:
+        self.connection.request("POST", path, json.dumps(payload),
+                                {"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        return json.loads(body) if not self.stream or path == "/sessions" \
+            else {"events": body.count(b"event: message")}
+
+    def ask(self, question: str):
+        self._post(f"/sessions/{self.session_id}/messages",
+                   {"message": question, "stream": self.stream})
+
+
+def wait_ready(port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                    timeout=2)
+            connection.request("GET", "/ready")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("API não ficou pronta")
+
+
+def workers_pss_mb(server_pid: int) -> Optional[float]:
+    """PSS somada do processo principal e dos workers (só Linux)"""
+    pids = [server_pid]
+    try:
+        for task in Path(f"/proc/{server_pid}/task").iterdir():
+            pids += [int(pid) for pid in
+                     (task / "children").read_text().split()]
+        total_kb = 0
+        for pid in pids:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text(
+                    ).splitlines():
+                if line.startswith("Pss:"):
+                    total_kb += int(line.split()[1])
+    except OSError:
+        return None
+    return round(total_kb / 1024, 1)
+
+
+def bench_api(args, questions: List[str], workers: int,
+              port: int) -> List[dict]:
+    env = dict(os.environ, API_SESSION_DIR=str(args.session_dir))
+    command = [sys.executable, str(ROOT_DIR / "serve_api.py"),
+               "--workers", str(workers), "--port", str(port)]
+    if args.no_mmap:
+        command.append("--no-mmap")
+    server = subprocess.Popen(command, cwd=ROOT_DIR, env=env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    results = []
+    try:
+        wait_ready(port)
+        # Todos os workers aquecidos antes de medir
+        run_clients(workers * 2, 1, questions,
+                    lambda: APIClient(port, args.stream).ask)
+        for concurrency in args.concurrency:
+            result = {"target": "api", "workers": workers,
+                      "stream": args.stream,
+                      **run_clients(concurrency, args.turns, questions,
+                                    lambda: APIClient(port, args.stream).ask),
+                      "pss_mb": workers_pss_mb(server.pid)}
+            print(json.dumps(result, ensure_ascii=False))
+            results.append(result)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def bench_streamlit(args, questions: List[str]) -> List[dict]:
+    from streamlit.testing.v1 import AppTest
+
+    script = str(ROOT_DIR / "ui" / "streamlit.py")
+    # O runtime do AppTest é global: uma reexecução por vez
+    runtime_lock = threading.Lock()
+
+    def new_session() -> Callable[[str], None]:
+        app = AppTest.from_file(script, default_timeout=120)
+        with runtime_lock:
+            app.run()
+
+        def ask(question: str):
+            app.text_input(key="user_input").input(question)
+            app.button(key="send_button").click()
+            with runtime_lock:
+                app.run()
+            if app.exception or app.error:
+                raise RuntimeError("erro na interface")
+
+        return ask
+
+    # Imports e caches do script antes de medir
+    new_session()("Qual a pressão dos pneus?")
+    results = []
+    for concurrency in args.concurrency:
+        result = {"target": "streamlit",
+                  **run_clients(concurrency, args.turns, questions,
+                                new_session)}
+        print(json.dumps(result, ensure_ascii=False))
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--target", choices=["api", "streamlit", "both"],
+                        default="both")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16])
+    parser.add_argument("--turns", type=int, default=10,
+                        help="perguntas por sessão")
+    parser.add_argument("--profile", default="instant",
+                        help="perfil do provedor simulado (nome ou JSON)")
+    parser.add_argument("--stream", action="store_true",
+                        help="respostas da API em streaming (SSE)")
+    parser.add_argument("--no-mmap", action="store_true",
+                        help="workers sem o índice mapeado em memória")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--session-dir", type=Path,
+                        default=Path("/tmp/tcross_bench_sessions"))
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET)
+    args = parser.parse_args()
+
+    # Tudo local: embeddings por hashing e o provedor simulado; sem FAQ e
+    # sem rate limit na API (a interface não tem), para que toda pergunta
+    # passe pelo pipeline e --turns acima de 10 não vire uma série de 429
+    os.environ.update(EMBEDDINGS_PROVIDER="local", LLM_PROVIDER="mock",
+                      MOCK_LLM_PROFILE=args.profile, CHAT_MODEL="gpt-4o-mini",
+                      FAQ_STORE_PATH="/nonexistent/faq_store.json",
+                      API_RATE_LIMIT="0")
+    questions = load_questions(args.golden)
+
+    results = []
+    if args.target in ("streamlit", "both"):
+        results += bench_streamlit(args, questions)
+    if args.target in ("api", "both"):
+        for workers in args.workers:
+            results += bench_api(args, questions, workers, args.port)
+
+    baseline = {r["concurrency"]: r["rps"] for r in results
+                if r["target"] == "streamlit"}
+    for result in results:
+        if result["target"] == "api" and baseline.get(result["concurrency"]):
+            print(json.dumps({
+                "compare": f"api x{result['workers']} vs streamlit",
+                "concurrency": result["concurrency"],
+                "speedup": round(result["rps"] /
+                                 baseline[result["concurrency"]], 2)
+            }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
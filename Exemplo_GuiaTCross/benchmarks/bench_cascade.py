@@ -0,0 +1,142 @@
+"""
+Benchmark da cascata de modelos
+
+Roda o mesmo conjunto de perguntas com a cascata desligada (tudo no o1) e
+ligada, usando a recuperação real sobre os manuais (embeddings locais) e
+um provedor simulado com latências nominais por modelo. Reporta p50/p95
+de latência e custo estimado por resposta.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_cascade.py --time-scale 0.01
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.adapter import (AIProviderInterface, AIService,  # noqa: E402
+                              OpenAIAdapter)
+from adapters.embeddings import LocalHashingEmbeddingProvider  # noqa: E402
+from use_cases.use_cases import ChatUseCase  # noqa: E402
+from adapters.cascade import ModelCascade, estimate_cost  # noqa: E402
+
+VEHICLE = "Veículo: VW T-Cross 200 TSI Comfortline 2024\nPergunta: "
+
+QUESTIONS = [
+    "Qual a capacidade do porta-malas?",
+    "Qual a pressão dos pneus?",
+    "Qual o consumo do T-Cross?",
+    "Qual o volume do tanque de combustível?",
+    "Qual óleo do motor devo usar?",
+    "Onde fica o estepe?",
+    "Qual o intervalo de revisão?",
+    "Onde fica o triângulo de segurança?",
+    "Qual a carga máxima do teto?",
+    "Como funciona o ACC?",
+    "Qual a diferença entre o modo eco e o modo sport?",
+    "Explique o sistema de frenagem automática de emergência",
+    "Por que a luz do airbag acende?",
+    "Vale a pena usar gasolina aditivada?",
+    "Como faço para emparelhar o celular no bluetooth passo a passo?",
+    "Quem ganhou a copa do mundo de 2002?",
+]
+
+# Latência nominal (p50, em ms) e dispersão log-normal por modelo
+MODEL_LATENCY = {
+    "o1": (6000, 0.35),
+    "gpt-4o-mini": (900, 0.30),
+}
+
+
+class SimulatedLLM(AIProviderInterface):
+    """Provedor simulado que usa a recuperação real para decidir respostas"""
+
+    def __init__(self, retriever: OpenAIAdapter, time_scale: float):
+        self.retriever = retriever
+        self.embeddings = retriever.embeddings
+        self.time_scale = time_scale
+        self.random = random.Random(42)
+
+    def get_retrieval_confidence(self, message: str):
+        return self.retriever.get_retrieval_confidence(message)
+
+    def generate_response(self, message: str, model: str,
+                          context=None) -> str:
+        median, sigma = MODEL_LATENCY[model]
+        time.sleep(self.random.lognormvariate(0, sigma) * median / 1000
+                   * self.time_scale)
+        confidence = self.get_retrieval_confidence(message) or 0.0
+        # O modelo rápido às vezes não encontra a resposta no contexto
+        if model == "gpt-4o-mini" and (confidence < 0.35 or
+                                       self.random.random() < 0.1):
+            return "Não encontrei essa informação no manual."
+        return "Segundo o manual do T-Cross, " + "detalhes da resposta " * 25
+
+    def complete(self, messages: List[dict], model: str,
+                 deadline=None) -> str:
+        return self.generate_response(messages[-1]["content"], model)
+
+    def get_available_models(self) -> List[str]:
+        return list(MODEL_LATENCY)
+
+
+def run(use_case: ChatUseCase, time_scale: float, repeat: int) -> dict:
+    latencies = []
+    models = {}
+    cost = 0.0
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            message = use_case.get_ai_response(VEHICLE + question)
+            latencies.append((time.perf_counter() - start) / time_scale)
+            models[message.model_used] = models.get(message.model_used, 0) + 1
+            cost += estimate_cost(message.model_used, VEHICLE + question,
+                                  message.content, 900)
+    if use_case.cascade:
+        # Inclui as tentativas do modelo rápido que foram escaladas
+        cost = use_case.cascade.get_stats()["estimated_cost_usd"]
+    latencies.sort()
+    return {
+        "answers": len(latencies),
+        "models": models,
+        "p50_ms": round(statistics.median(latencies) * 1000),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000),
+        "cost_per_answer_usd": round(cost / len(latencies), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="Fator aplicado às latências simuladas")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    retriever = OpenAIAdapter(embedding_provider=LocalHashingEmbeddingProvider())
+    service = AIService()
+    service.providers.clear()
+    service.providers["sim"] = SimulatedLLM(retriever, args.time_scale)
+    service.set_provider("sim")
+
+    for label, use_case in (
+        ("o1_only", ChatUseCase(service)),
+        ("cascade", ChatUseCase(service, cascade=ModelCascade())),
+    ):
+        use_case.start_new_session()
+        result = {"label": label}
+        result.update(run(use_case, args.time_scale, args.repeat))
+        if use_case.cascade:
+            result["cascade"] = use_case.cascade.get_stats()
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
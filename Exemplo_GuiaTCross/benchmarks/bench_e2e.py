@@ -0,0 +1,220 @@
+"""
+Benchmark de ponta a ponta do ChatUseCase, sem rede
+
+Roda o pipeline completo (validação da entrada, recuperação nos manuais
+reais com embeddings locais, montagem do prompt, fila de admissão e um
+provedor simulado com perfil de latência) em vários níveis de
+concorrência. Para cada nível mostra requisições por segundo e p50/p95/p99
+de cada etapa; com --output grava tudo em um arquivo JSON.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_e2e.py --concurrency 1 4 16 --requests 200
+    python benchmarks/bench_e2e.py --profile gpt-4o-mini --output e2e.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+GOLDEN_SET = Path(__file__).resolve().parent / "data" / "golden_questions.jsonl"
+
+
+class StageTimer:
+    """Durações de cada etapa, de todas as requisições de um nível"""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        """Versão de fn que registra a própria duração"""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {stage: sorted(values)
+                       for stage, values in self._samples.items()}
+
+        def pct(values, p):
+            return round(values[int(p / 100 * (len(values) - 1))] * 1000, 2)
+
+        return {stage: {"count": len(values),
+                        "p50_ms": pct(values, 50),
+                        "p95_ms": pct(values, 95),
+                        "p99_ms": pct(values, 99)}
+                for stage, values in samples.items()}
+
+
+def load_questions(path: Path) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requisições por nível de concorrência")
+    parser.add_argument("--profile", default="instant",
+                        help="perfil do provedor simulado (nome ou JSON)")
+    parser.add_argument("--turns-per-session", type=int, default=5)
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="repete as perguntas exatas (caches quentes)")
+    parser.add_argument("--faq", action="store_true",
+                        help="mantém as respostas pré-computadas, se houver")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # Tudo local: embeddings por hashing e o provedor simulado
+    os.environ["EMBEDDINGS_PROVIDER"] = "local"
+    os.environ["MOCK_LLM_PROFILE"] = args.profile
+    os.environ["LLM_PROVIDER"] = "mock"
+
+    from adapters import ai_service
+    from adapters.admission import BoundedExecutor
+    from adapters.profiling import profiler
+    from adapters.tracing import tracer
+    from domain.entities import RequestContext
+    from use_cases import InputValidator, UseCaseFactory
+
+    mock = ai_service.providers["mock"]
+    if not mock.vector_store:
+        sys.exit("❌ Índice de embeddings indisponível")
+    model = mock.available_models[0]
+
+    timer = StageTimer()
+    mock.retrieve = timer.wrap("retrieval", mock.retrieve)
+    mock._get_context_from_embeddings = timer.wrap(
+        "context", mock._get_context_from_embeddings)
+    mock._build_messages = timer.wrap("prompt", mock._build_messages)
+    mock.llm.complete = timer.wrap("generation", mock.llm.complete)
+
+    factory = UseCaseFactory(ai_service)
+    validator = InputValidator()
+    questions = load_questions(args.golden)
+    executor_config = (ai_service.executor.max_concurrent,
+                       ai_service.executor.max_queue,
+                       ai_service.executor.default_timeout)
+
+    levels = []
+    for level_index, concurrency in enumerate(args.concurrency):
+        # Perguntas distintas também entre níveis (caches frios)
+        offset = level_index * args.requests
+        timer.reset()
+        # Fila nova por nível, para que as estatísticas não se misturem
+        ai_service.executor = BoundedExecutor(*executor_config)
+        errors: Dict[str, int] = defaultdict(int)
+        errors_lock = threading.Lock()
+        local = threading.local()
+
+        def turn(index: int):
+            if getattr(local, "use_case", None) is None:
+                local.use_case = factory.create_chat_use_case()
+                if not args.faq:
+                    local.use_case.faq_store = None
+                local.turns = 0
+            use_case = local.use_case
+            if local.turns % args.turns_per_session == 0:
+                use_case.start_new_session(model)
+            local.turns += 1
+
+            item = questions[index % len(questions)]
+            question = item["question"]
+            if not args.repeat_questions:
+                question = f"{question} #{offset + index}"
+
+            start = time.perf_counter()
+            context = RequestContext(
+                question, item.get("year", "2024"),
+                item.get("version", "200 TSI Comfortline"))
+            # Mesmos spans e perfis da interface (com TRACE_EXPORTER ou
+            # PROFILE_SAMPLE_RATE/PROFILE_SLOW_MS ligados)
+            try:
+                with profiler.profile(context.request_id), \
+                        tracer.span("chat.request",
+                                    request_id=context.request_id):
+                    with tracer.span("validation"):
+                        validation = timer.wrap(
+                            "validation",
+                            validator.validate_and_sanitize)(question)
+                    if not validation.is_valid:
+                        raise ValueError("; ".join(validation.warnings))
+                    context.question = validation.sanitized_message
+                    use_case.send_message(context.question)
+                    use_case.get_ai_response(context.to_prompt(), context)
+            except Exception as e:
+                with errors_lock:
+                    errors[type(e).__name__] += 1
+                return
+            timer.record("total", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(turn, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        stages = timer.summary()
+        completed = stages.get("total", {}).get("count", 0)
+        admission = ai_service.get_admission_stats()
+        level = {
+            "concurrency": concurrency,
+            "requests": args.requests,
+            "completed": completed,
+            "errors": dict(errors),
+            "wall_s": round(elapsed, 2),
+            "rps": round(completed / elapsed, 2),
+            "queue_wait_p50_ms": admission["wait_p50_ms"],
+            "queue_wait_p95_ms": admission["wait_p95_ms"],
+            "stages": stages
+        }
+        levels.append(level)
+        print(json.dumps(level, ensure_ascii=False))
+
+    if args.output:
+        report = {
+            "benchmark": "e2e",
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "index_version": ai_service.get_index_version(),
+            "profile": asdict(mock.llm.profile),
+            "repeat_questions": args.repeat_questions,
+            "turns_per_session": args.turns_per_session,
+            "levels": levels
+        }
+        args.output.write_text(json.dumps(report, ensure_ascii=False,
+                                          indent=2), encoding="utf-8")
+        print(f"✅ Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
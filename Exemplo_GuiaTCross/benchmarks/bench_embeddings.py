@@ -0,0 +1,84 @@
+"""
+Benchmark de latência de embeddings por provedor
+
+Mede a latência de embed_query (uma consulta por chamada, como no chat)
+para cada provedor disponível. O provedor "openai" só é medido quando
+OPENAI_API_KEY está definida.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_embeddings.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.embeddings import create_embedding_provider  # noqa: E402
+
+SAMPLE_QUESTIONS = [
+    "Qual o consumo do T-Cross?",
+    "Qual a capacidade do porta-malas?",
+    "Qual a pressão correta dos pneus?",
+    "Como trocar o óleo do motor?",
+    "Quando fazer a revisão?",
+    "Como funciona o ACC?",
+    "Qual o tipo de combustível recomendado?",
+    "Como acoplar a cadeirinha infantil?",
+]
+
+
+def percentile(values, pct: float) -> float:
+    """Percentil por interpolação linear"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = position - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+
+def bench_provider(name: str, repeat: int) -> dict:
+    """Mede embed_query de um provedor"""
+    provider = create_embedding_provider(
+        name, api_key=os.getenv("OPENAI_API_KEY"))
+    provider.embed_query("aquecimento")
+
+    latencies = []
+    for _ in range(repeat):
+        for question in SAMPLE_QUESTIONS:
+            start = time.perf_counter()
+            provider.embed_query(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "provider": name,
+        "queries": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Repetições do conjunto de perguntas")
+    args = parser.parse_args()
+
+    providers = ["local"]
+    if os.getenv("OPENAI_API_KEY"):
+        providers.append("openai")
+
+    for name in providers:
+        print(json.dumps(bench_provider(name, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de carregamento e divisão dos documentos
+
+Compara o carregamento antigo (f.read() + split sequencial em uma lista)
+com o carregamento em streaming do document_loader, medindo tempo total e
+pico de memória (RSS) em um corpus N vezes maior que a pasta documents.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_ingestion.py --scale 10
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def build_corpus(source_dir: Path, target_dir: Path, scale: int) -> int:
+    """Replica os manuais scale vezes no diretório de destino"""
+    total_bytes = 0
+    for copy_index in range(scale):
+        for file_path in sorted(source_dir.glob("*.txt")):
+            target = target_dir / f"{copy_index:03d}_{file_path.name}"
+            shutil.copyfile(file_path, target)
+            total_bytes += target.stat().st_size
+    return total_bytes
+
+
+def run_legacy(txt_files, chunk_size: int, chunk_overlap: int) -> int:
+    """Reproduz o carregamento antigo: arquivo inteiro + lista de chunks"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    all_texts = []
+    for file_path in txt_files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+            content_with_metadata = f"[ARQUIVO: {file_path.name}]\n{content}"
+            all_texts.extend(splitter.split_text(content_with_metadata))
+    return len(all_texts)
+
+
+def run_streaming(txt_files, chunk_size: int, chunk_overlap: int,
+                  workers: int) -> int:
+    """Consome os chunks em lotes, como o estágio de embeddings faz"""
+    from adapters.document_loader import iter_document_chunks, iter_batches
+
+    total = 0
+    chunks = iter_document_chunks(txt_files, chunk_size=chunk_size,
+                                  chunk_overlap=chunk_overlap,
+                                  max_workers=workers)
+    for batch in iter_batches(chunks, 256):
+        total += len(batch)
+    return total
+
+
+def run_single(mode: str, corpus_dir: Path, workers: int) -> dict:
+    """Executa um modo e mede tempo e pico de memória do processo"""
+    # Mesmo custo de importação nos dois modos
+    import adapters  # noqa: F401
+
+    txt_files = sorted(corpus_dir.glob("*.txt"))
+    start = time.perf_counter()
+    if mode == "legacy":
+        chunks = run_legacy(txt_files, 1000, 200)
+    else:
+        chunks = run_streaming(txt_files, 1000, 200, workers)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss é reportado em KB no Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        "mode": mode,
+        "workers": workers,
+        "chunks": chunks,
+        "wall_time_s": round(elapsed, 3),
+        "peak_rss_mb": round(self_rss / 1024, 1),
+        "peak_worker_rss_mb": round(children_rss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scale", type=int, default=10,
+                        help="Quantas vezes replicar o corpus atual")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processos do pool (0 = número de CPUs)")
+    parser.add_argument("--run-mode", choices=["legacy", "streaming"],
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Execução interna: um modo por processo para medir o RSS isoladamente
+    if args.run_mode:
+        print(json.dumps(run_single(args.run_mode, args.corpus,
+                                    args.workers or None)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(tmp)
+        total_bytes = build_corpus(ROOT_DIR / "documents", corpus_dir,
+                                   args.scale)
+        print(f"📚 Corpus: {total_bytes / 1024 / 1024:.1f} MB "
+              f"({args.scale}x documents)")
+
+        for mode in ("legacy", "streaming"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--run-mode", mode,
+                 "--corpus", str(corpus_dir),
+                 "--workers", str(args.workers)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
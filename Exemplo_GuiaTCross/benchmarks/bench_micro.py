@@ -0,0 +1,335 @@
+"""
+Micro-benchmarks dos componentes quentes, com comparação a uma baseline
+
+Mede validação da entrada, rate limiting, divisão em chunks, busca por
+similaridade (índice FAISS e conjunto de trabalho da sessão), montagem do
+prompt (com e sem compressão do contexto), registro de métricas e
+serialização da sessão. "baseline" grava as amostras em
+benchmarks/data/micro_baseline.json; "compare" roda de novo e aponta as
+lentidões acima de --threshold que também são estatisticamente
+significativas (teste de Mann-Whitney unilateral, --alpha) e que se
+repetem ao remedir (--confirm). O código de saída é 1 quando há regressão.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_micro.py run
+    python benchmarks/bench_micro.py baseline
+    python benchmarks/bench_micro.py compare --threshold 0.10
+    python benchmarks/bench_micro.py compare --only validator rate_limiter
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+BASELINE_PATH = Path(__file__).resolve().parent / "data" / "micro_baseline.json"
+
+QUESTION = ("Qual a pressão correta dos pneus do T-Cross com carga máxima "
+            "e como faço a calibragem com o estepe?")
+
+
+def bench_validator() -> Callable[[], None]:
+    from use_cases.security import InputValidator
+    validator = InputValidator()
+    return lambda: validator.validate_and_sanitize(QUESTION)
+
+
+def bench_rate_limiter() -> Callable[[], None]:
+    from use_cases.security import RateLimiter
+    limiter = RateLimiter()
+    # Usuários com histórico de requisições da última hora
+    now = datetime.now()
+    users = [f"user-{i}" for i in range(200)]
+    for user in users:
+        limiter.requests[user] = [now - timedelta(minutes=5 * j)
+                                  for j in range(1, 10)]
+    history = {user: list(limiter.requests[user]) for user in users}
+    state = {"index": 0}
+
+    def run():
+        user = users[state["index"] % len(users)]
+        state["index"] += 1
+        limiter.requests[user] = list(history[user])
+        limiter.is_allowed(user)
+
+    return run
+
+
+def bench_chunking() -> Callable[[], None]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from adapters.document_loader import iter_file_segments
+    manual = sorted((ROOT_DIR / "documents").glob("*.txt"))[0]
+    segment = next(iter_file_segments(manual))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000,
+                                              chunk_overlap=200)
+    return lambda: splitter.split_text(segment)
+
+
+def _random_vectors(count: int, dimension: int = 1024) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bench_similarity_search() -> Callable[[], None]:
+    import faiss
+    vectors = _random_vectors(5000)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    query = _random_vectors(1)[:1]
+    return lambda: index.search(query, 3)
+
+
+def bench_working_set_search() -> Callable[[], None]:
+    from adapters.working_set import RetrievalWorkingSet
+    vectors = _random_vectors(32)
+    working_set = RetrievalWorkingSet(min_score=-1.0)
+    working_set.add(range(32), [f"trecho {i}" for i in range(32)], vectors)
+    query = vectors[0]
+    return lambda: working_set.search(query, 3)
+
+
+def bench_context_assembly(compress: bool = False) -> Callable[[], None]:
+    from adapters.adapter import OpenAIAdapter
+    from adapters.compression import ContextCompressor
+    from adapters.embeddings import LocalHashingEmbeddingProvider
+    from domain.entities import RequestContext
+    adapter = OpenAIAdapter(embedding_provider=LocalHashingEmbeddingProvider(),
+                            load_index=False)
+    manual = sorted((ROOT_DIR / "documents").glob("*.txt"))[0]
+    text = manual.read_text(encoding="utf-8")
+    chunks = [(text[i * 1000:(i + 1) * 1000], 0.5) for i in range(3)]
+    # Recuperação fixa: só a montagem das mensagens é medida
+    adapter.retrieve = lambda message, k=3, session_id=None: chunks
+    adapter.compressor = ContextCompressor(ratio=0.5) if compress else None
+    context = RequestContext(
+        QUESTION, "2024", "200 TSI Comfortline", session_id="bench",
+        summary="O usuário perguntou sobre pneus e estepe. " * 5,
+        history=[{"role": "user" if i % 2 == 0 else "assistant",
+                  "content": "Mensagem anterior da conversa. " * 10}
+                 for i in range(6)])
+    return lambda: adapter._build_messages(context.to_prompt(), context)
+
+
+def _session():
+    from domain.entities import ChatSession, Message, MessageRole
+    session = ChatSession(id="bench", messages=[], created_at=datetime.now(),
+                          model="o1")
+    for i in range(40):
+        session.add_message(Message(
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content="Conteúdo da mensagem sobre o T-Cross. " * 20,
+            timestamp=datetime.now(), model_used="o1"))
+    return session
+
+
+def bench_metrics_counter() -> Callable[[], None]:
+    from adapters.metrics import MetricsRegistry
+    counter = MetricsRegistry().counter(
+        "bench_total", "", ("provider", "model", "outcome"))
+    return lambda: counter.inc(provider="openai", model="o1", outcome="ok")
+
+
+def bench_metrics_histogram() -> Callable[[], None]:
+    from adapters.metrics import MetricsRegistry
+    histogram = MetricsRegistry().histogram("bench_seconds", "",
+                                            ("provider", "model"))
+    return lambda: histogram.observe(0.42, provider="openai", model="o1")
+
+
+def bench_session_to_dict() -> Callable[[], None]:
+    session = _session()
+    return session.to_dict
+
+
+def bench_session_from_dict() -> Callable[[], None]:
+    from domain.entities import ChatSession
+    data = _session().to_dict()
+    return lambda: ChatSession.from_dict(data)
+
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {
+    "validator": bench_validator,
+    "rate_limiter": bench_rate_limiter,
+    "chunking": bench_chunking,
+    "similarity_search": bench_similarity_search,
+    "working_set_search": bench_working_set_search,
+    "context_assembly": bench_context_assembly,
+    "context_compressed": lambda: bench_context_assembly(compress=True),
+    "metrics_counter": bench_metrics_counter,
+    "metrics_histogram": bench_metrics_histogram,
+    "session_to_dict": bench_session_to_dict,
+    "session_from_dict": bench_session_from_dict,
+}
+
+
+def calibrate(fn: Callable[[], None], target_s: float = 0.02) -> int:
+    """Repetições por amostra para que cada uma dure ~target_s"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= target_s:
+            return number
+        number *= 2
+
+
+def measure(fn: Callable[[], None], number: int, samples: int) -> List[float]:
+    """Tempo médio por chamada (s) em cada amostra"""
+    fn()  # aquecimento
+    results = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        results.append((time.perf_counter() - start) / number)
+    return results
+
+
+def mann_whitney_greater(current: List[float],
+                         baseline: List[float]) -> float:
+    """
+    p-valor unilateral de "current é mais lento que baseline"
+
+    Teste U de Mann-Whitney com aproximação normal e correção de empates,
+    adequado às ~20 amostras por lado usadas aqui.
+    """
+    values = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(values)
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for position in range(i, j + 1):
+            ranks[position] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    n1, n2 = len(current), len(baseline)
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, values)
+                   if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def run_benchmarks(names: List[str], samples: int,
+                   numbers: Optional[Dict[str, int]] = None) -> dict:
+    """Roda os benchmarks; numbers fixa as repetições (para comparar)"""
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name]()
+        number = (numbers or {}).get(name) or calibrate(fn)
+        values = measure(fn, number, samples)
+        results[name] = {
+            "number": number,
+            "median_us": round(statistics.median(values) * 1e6, 3),
+            "samples": values
+        }
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float,
+            alpha: float) -> Tuple[List[dict], bool]:
+    rows, regressed = [], False
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        ratio = result["median_us"] / before["median_us"]
+        p_value = mann_whitney_greater(result["samples"], before["samples"])
+        slower = ratio > 1 + threshold and p_value < alpha
+        regressed |= slower
+        rows.append({
+            "benchmark": name,
+            "baseline_us": before["median_us"],
+            "current_us": result["median_us"],
+            "change": round(ratio - 1, 3),
+            "p_value": round(p_value, 4),
+            "regression": slower
+        })
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("command", choices=["run", "baseline", "compare"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="lentidão mínima para acusar (0.10 = 10%%)")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="nível de significância do teste")
+    parser.add_argument("--confirm", type=int, default=1,
+                        help="remedições exigidas para confirmar regressão")
+    args = parser.parse_args()
+    os.environ.setdefault("EMBEDDINGS_PROVIDER", "local")
+
+    if args.command == "compare":
+        if not args.baseline.exists():
+            sys.exit(f"❌ Baseline {args.baseline} não existe; "
+                     f"rode o comando baseline antes")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        numbers = {name: result["number"]
+                   for name, result in baseline["results"].items()}
+        current = run_benchmarks(args.only, args.samples, numbers)
+        rows, regressed = compare(current, baseline["results"],
+                                  args.threshold, args.alpha)
+        # Ruído da máquina (outro processo, frequência da CPU) produz falsos
+        # positivos: a regressão só vale se aparecer de novo ao remedir
+        for _ in range(args.confirm):
+            suspects = [row["benchmark"] for row in rows if row["regression"]]
+            if not suspects:
+                break
+            rerun = run_benchmarks(suspects, args.samples, numbers)
+            confirmed, _ = compare(rerun, baseline["results"],
+                                   args.threshold, args.alpha)
+            confirmed = {row["benchmark"]: row for row in confirmed}
+            rows = [confirmed.get(row["benchmark"], row)
+                    if row["regression"] else row for row in rows]
+            regressed = any(row["regression"] for row in rows)
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        if regressed:
+            print("❌ Regressão de desempenho detectada")
+            sys.exit(1)
+        print("✅ Nenhuma regressão significativa")
+        return
+
+    results = run_benchmarks(args.only, args.samples)
+    for name, result in results.items():
+        print(json.dumps({"benchmark": name, "number": result["number"],
+                          "median_us": result["median_us"]}))
+    if args.command == "baseline":
+        args.baseline.write_text(json.dumps({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results
+        }, indent=2), encoding="utf-8")
+        print(f"✅ Baseline gravada em {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark de timeouts adaptativos e orçamento de retentativas
+
+Sobe o servidor simulado da API da OpenAI (adapters/mock_provider.py) com
+perfis que injetam falhas: conexões que travam, erros 500 e 429. O mesmo
+tráfego passa pelo cliente do SDK com a configuração padrão (timeout de
+10 min, 2 retentativas) e pelo OpenAIAdapter com as políticas por etapa.
+Para cada cenário mostra latências, sucesso e a amplificação de carga
+(requisições que chegaram ao servidor por requisição do cliente).
+
+Uso:
+    cd Exemplo_GuiaTCross
+    EMBEDDINGS_PROVIDER=local python benchmarks/bench_resilience.py
+    python benchmarks/bench_resilience.py --requests 400 --hang-s 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.mock_provider import LatencyProfile, MockOpenAIServer  # noqa: E402
+
+
+def run(call, requests: int, concurrency: int,
+        server: MockOpenAIServer) -> dict:
+    """Dispara as requisições e resume latência, sucesso e amplificação"""
+    latencies, errors = [], {}
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return None
+        return round(latencies[int(p / 100 * (len(latencies) - 1))] * 1000, 1)
+
+    return {
+        "requests": requests,
+        "success_rate": round(len(latencies) / requests, 3),
+        "p50_ms": pct(50),
+        "p99_ms": pct(99),
+        "max_ms": pct(100),
+        "wall_s": round(elapsed, 2),
+        "upstream_per_request": round(server.requests / requests, 2),
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hang-rate", type=float, default=0.05)
+    parser.add_argument("--hang-s", type=float, default=5.0)
+    parser.add_argument("--stages", nargs="+",
+                        default=["completion", "first_token", "embedding"])
+    args = parser.parse_args()
+
+    # Servidor rápido e estável; cada cenário acrescenta um tipo de falha
+    base = dict(ttft_ms=30, ttft_jitter=0, tokens_per_s=0, output_tokens=2,
+                tail_rate=0, models=["gpt-4o-mini"])
+    server = MockOpenAIServer(LatencyProfile(**base))
+    os.environ["OPENAI_BASE_URL"] = server.start()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Teto baixo para que o aquecimento (timeout inicial) não domine
+    os.environ.setdefault("COMPLETION_TIMEOUT_S", str(args.hang_s * 2))
+    os.environ.setdefault("FIRST_TOKEN_TIMEOUT_S", str(args.hang_s * 2))
+    os.environ.setdefault("EMBEDDING_TIMEOUT_S", str(args.hang_s * 2))
+
+    from openai import OpenAI
+    from adapters.adapter import OpenAIAdapter
+    from adapters.embeddings import OpenAIEmbeddingProvider
+    from domain.entities import RequestContext
+
+    messages = [{"role": "user", "content": "Qual a pressão dos pneus?"}]
+    sdk_client = OpenAI()
+    scenarios = {
+        "latency_spikes": dict(stall_rate=args.hang_rate,
+                               stall_ms=args.hang_s * 1000),
+        "rate_limited": dict(rate_limit_rate=0.2),
+        "outage": dict(error_rate=1.0),
+    }
+    for scenario, config in scenarios.items():
+        for mode in ("sdk_default", "policy"):
+            for stage in args.stages:
+                if mode == "sdk_default" and stage != "completion":
+                    continue
+                server.set_profile(LatencyProfile(**base, **config), seed=7)
+                adapter = OpenAIAdapter(api_key="stub")
+                embeddings = OpenAIEmbeddingProvider(
+                    api_key="stub",
+                    retry_policy=adapter._get_retry_policy("embedding"))
+                if mode == "sdk_default":
+                    def call():
+                        sdk_client.chat.completions.create(
+                            model="gpt-4o-mini", messages=messages)
+                elif stage == "completion":
+                    def call():
+                        adapter.complete(messages, "gpt-4o-mini")
+                elif stage == "first_token":
+                    def call():
+                        question = "Qual a pressão dos pneus?"
+                        "".join(adapter.stream_response(
+                            question, "gpt-4o-mini",
+                            RequestContext(question, "2024",
+                                           "200 TSI Comfortline")))
+                else:
+                    def call():
+                        embeddings.embed_query("pressão dos pneus")
+
+                result = run(call, args.requests, args.concurrency, server)
+                result = {"scenario": scenario, "mode": mode,
+                          "stage": stage, **result}
+                if mode == "policy":
+                    result["resilience"] = adapter.get_resilience_stats()
+                print(json.dumps(result, ensure_ascii=False))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark do roteamento entre provedores
+
+Usa provedores simulados com perfis de latência diferentes (rápido, cauda
+pesada, instável e fora do ar) e compara p50/p95 da resposta com e sem
+hedging, mostrando o estado dos circuitos ao final.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_router.py --requests 1000 --hedge-after-ms 150
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.adapter import AIProviderInterface  # noqa: E402
+from adapters.router import ProviderRouter  # noqa: E402
+
+
+class SimulatedProvider(AIProviderInterface):
+    """Provedor simulado com latência base, cauda e taxa de erro"""
+
+    def __init__(self, base_ms: float, tail_ms: float = 0.0,
+                 tail_probability: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0):
+        self.base = base_ms / 1000
+        self.tail = tail_ms / 1000
+        self.tail_probability = tail_probability
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def generate_response(self, message: str, model: str,
+                          context=None) -> str:
+        latency = self.base * self.random.uniform(0.8, 1.2)
+        if self.random.random() < self.tail_probability:
+            latency += self.tail
+        time.sleep(latency)
+        if self.random.random() < self.error_rate:
+            raise ConnectionError("falha simulada")
+        return f"[{model}] {message}"
+
+    def complete(self, messages: List[dict], model: str,
+                 deadline=None) -> str:
+        return self.generate_response(messages[-1]["content"], model)
+
+    def get_available_models(self) -> List[str]:
+        return ["sim"]
+
+
+def build_providers() -> dict:
+    return {
+        "cauda_pesada": SimulatedProvider(40, tail_ms=1500,
+                                          tail_probability=0.1, seed=1),
+        "rapido": SimulatedProvider(80, seed=2),
+        "instavel": SimulatedProvider(30, error_rate=0.5, seed=3),
+        "fora_do_ar": SimulatedProvider(5, error_rate=1.0, seed=4),
+    }
+
+
+def run(requests: int, concurrency: int, hedge_after_ms) -> dict:
+    router = ProviderRouter(build_providers(), hedge_after_ms=hedge_after_ms,
+                            failure_threshold=3, reset_timeout=60)
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            router.route("sim", lambda p, m: p.generate_response(str(i), m),
+                         preferred="cauda_pesada")
+            return time.perf_counter() - start, True
+        except Exception:
+            return time.perf_counter() - start, False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+
+    latencies = sorted(r[0] for r in results if r[1])
+    failures = sum(1 for r in results if not r[1])
+
+    def pct(p):
+        return round(latencies[int(p / 100 * (len(latencies) - 1))] * 1000, 1)
+
+    return {
+        "hedge_after_ms": hedge_after_ms,
+        "requests": requests,
+        "failures": failures,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "router": router.get_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hedge-after-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    for hedge in (None, args.hedge_after_ms):
+        print(json.dumps(run(args.requests, args.concurrency, hedge)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Memória por sessão de chat e política de despejo, sem rede
+
+Cria --sessions sessões com --turns trocas cada (provedor simulado e
+embeddings locais), mede com tracemalloc quanto a memória cresceu e compara
+com a estimativa do SessionManager. Depois avança o relógio além do TTL de
+ociosidade e aplica os limites, mostrando despejos, bytes liberados e
+sessões trazidas de volta do disco.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/bench_sessions.py --sessions 200 --turns 6
+    python benchmarks/bench_sessions.py --max-sessions 50 --spill-dir /tmp/s
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=6,
+                        help="perguntas e respostas por sessão")
+    parser.add_argument("--max-sessions", type=int, default=0,
+                        help="limite de sessões em memória (0 = só o TTL)")
+    parser.add_argument("--spill-dir", type=Path, default=None,
+                        help="grava as despejadas aqui (padrão: temporário)")
+    args = parser.parse_args()
+
+    os.environ["EMBEDDINGS_PROVIDER"] = "local"
+    os.environ["MOCK_LLM_PROFILE"] = "instant"
+    os.environ["LLM_PROVIDER"] = "mock"
+
+    from adapters import ai_service
+    from adapters.metrics import metrics
+    from domain.entities import RequestContext
+    from use_cases import SessionManager, UseCaseFactory
+
+    model = ai_service.providers["mock"].available_models[0]
+    factory = UseCaseFactory(ai_service)
+    spill_dir = args.spill_dir or Path(tempfile.mkdtemp(prefix="sessions_"))
+    manager = SessionManager(ai_service, idle_ttl=1800,
+                             max_sessions=args.max_sessions, min_idle=0,
+                             spill_dir=spill_dir, sweep_interval=1e9)
+
+    # Aquece caches e imports antes de medir
+    warm = factory.create_chat_use_case()
+    warm.start_new_session(model)
+    context = RequestContext("Qual a pressão dos pneus?", "2024",
+                             "200 TSI Comfortline")
+    warm.send_message(context.question)
+    warm.get_ai_response(context.to_prompt(), context)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    use_cases = []
+    for index in range(args.sessions):
+        use_case = factory.create_chat_use_case()
+        use_case.start_new_session(model)
+        for turn in range(args.turns):
+            context = RequestContext(
+                f"Qual a pressão dos pneus? sessão {index} turno {turn}",
+                "2024", "200 TSI Comfortline")
+            use_case.send_message(context.question)
+            use_case.get_ai_response(context.to_prompt(), context)
+        manager.touch(f"session-{index}", use_case)
+        use_cases.append(use_case)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    measured = after - before
+    estimated = manager.total_bytes()
+    print(json.dumps({
+        "phase": "memory",
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "measured_bytes_per_session": measured // args.sessions,
+        "estimated_bytes_per_session": estimated // args.sessions,
+        "estimate_ratio": round(estimated / measured, 2) if measured else None
+    }, ensure_ascii=False))
+
+    # Metade das sessões fica ociosa além do TTL; a outra metade acabou de
+    # ser usada
+    now = time.monotonic()
+    half = args.sessions // 2
+    for index, entry in enumerate(list(manager._entries.values())):
+        entry.last_seen = now - (manager.idle_ttl + 1 if index < half else 0)
+    start = time.perf_counter()
+    manager.sweep(now)
+    sweep_ms = (time.perf_counter() - start) * 1000
+    stats = manager.get_stats()
+    print(json.dumps({
+        "phase": "sweep",
+        "sweep_ms": round(sweep_ms, 2),
+        "resident_bytes": stats["bytes"],
+        "freed_bytes": estimated - stats["bytes"],
+        **{key: value for key, value in stats.items() if key != "bytes"},
+        "evictions": {",".join(labels): int(value) for labels, value in
+                      metrics.snapshot()[
+                          "tcross_session_evictions_total"].items()}
+    }, ensure_ascii=False))
+
+    # A sessão volta a ser usada: a conversa gravada em disco é restaurada
+    manager.touch("session-0", use_cases[0])
+    restored = use_cases[0].current_session
+    print(json.dumps({
+        "phase": "restore",
+        "restored": manager.get_stats()["restored"],
+        "messages": len(restored.messages) if restored else 0,
+        "spill_dir": str(spill_dir)
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Avaliação da compressão extrativa do contexto
+
+Para cada pergunta do conjunto de avaliação (benchmarks/data/
+golden_questions.jsonl), recupera os trechos e compara o contexto
+completo com o comprimido em várias razões: tokens economizados e
+retenção das evidências da resposta (frases do campo "answer" presentes
+no contexto). Com --model, também gera as respostas com e sem compressão
+e verifica se as evidências aparecem na resposta (requer chave de API).
+
+Uso:
+    cd Exemplo_GuiaTCross
+    EMBEDDINGS_PROVIDER=local python benchmarks/eval_compression.py
+    python benchmarks/eval_compression.py --ratios 0.3 0.5 --k 5
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.adapter import OpenAIAdapter  # noqa: E402
+from adapters.cascade import estimate_tokens  # noqa: E402
+from adapters.compression import ContextCompressor  # noqa: E402
+from domain.entities import VEHICLE_VERSIONS, RequestContext  # noqa: E402
+
+GOLDEN_SET = Path(__file__).resolve().parent / "data" / "golden_questions.jsonl"
+
+
+def normalize(text: str) -> str:
+    """Caixa e espaços não contam na busca de evidências"""
+    return re.sub(r"\s+", " ", text.lower())
+
+
+def evidence_recall(text: str, phrases: List[str]) -> float:
+    """Fração das evidências presentes no texto"""
+    text = normalize(text)
+    return sum(normalize(p) in text for p in phrases) / len(phrases)
+
+
+def load_golden_set(path: Path) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(adapter: OpenAIAdapter, items: List[dict], k: int,
+             ratio: Optional[float], model: Optional[str]) -> dict:
+    """Avalia uma configuração (ratio None = sem compressão)"""
+    compressor = ContextCompressor(ratio=ratio) if ratio else None
+    tokens, recalls, answer_recalls, latencies = [], [], [], []
+    for item in items:
+        parts = [text for text, _ in adapter.retrieve(item["question"], k=k)]
+        start = time.perf_counter()
+        if compressor:
+            parts = compressor.compress(item["question"], parts)
+        latencies.append(time.perf_counter() - start)
+        context = "\n---\n".join(parts)
+        tokens.append(estimate_tokens(context))
+        recalls.append(evidence_recall(context, item["answer"]))
+
+        if model:
+            adapter.compressor = compressor
+            request = RequestContext(
+                question=item["question"],
+                vehicle_year=item.get("year", "2024"),
+                vehicle_version=item.get("version", VEHICLE_VERSIONS[0]))
+            answer = adapter.complete(
+                adapter._build_messages(item["question"], request), model)
+            answer_recalls.append(evidence_recall(answer, item["answer"]))
+
+    result = {
+        "ratio": ratio,
+        "k": k,
+        "questions": len(items),
+        "context_tokens_mean": round(statistics.mean(tokens), 1),
+        "evidence_recall": round(statistics.mean(recalls), 3),
+        "compression_ms_p50": round(
+            statistics.median(latencies) * 1000, 2),
+    }
+    if answer_recalls:
+        result["answer_evidence_recall"] = round(
+            statistics.mean(answer_recalls), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ratios", type=float, nargs="+",
+                        default=[0.7, 0.5, 0.3])
+    parser.add_argument("--model", default=None,
+                        help="gera respostas com este modelo (ex.: gpt-4o-mini)")
+    args = parser.parse_args()
+
+    adapter = OpenAIAdapter()
+    adapter.compressor = None
+    if not adapter.vector_store:
+        sys.exit("❌ Índice de embeddings indisponível")
+    items = load_golden_set(args.golden)
+
+    baseline = evaluate(adapter, items, args.k, None, args.model)
+    print(json.dumps(baseline, ensure_ascii=False))
+    for ratio in args.ratios:
+        result = evaluate(adapter, items, args.k, ratio, args.model)
+        result["tokens_saved"] = round(
+            1 - result["context_tokens_mean"] /
+            baseline["context_tokens_mean"], 3)
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
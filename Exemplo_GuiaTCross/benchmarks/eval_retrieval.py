@@ -0,0 +1,249 @@
+"""
+Avaliação de qualidade e latência da recuperação de trechos
+
+Cada pergunta do conjunto de avaliação (benchmarks/data/
+golden_questions.jsonl) traz em "passages" citações literais dos trechos
+dos manuais que a respondem. Para cada configuração da grade (tamanho e
+sobreposição dos chunks, provedor de embeddings, tipo de índice FAISS) os
+manuais são divididos e indexados do zero, e são medidos recall@k,
+acerto@k (ao menos uma citação nos k primeiros), MRR, tokens de contexto
+e latência da busca. No fim aponta a configuração mais barata (menos
+tokens de contexto por pergunta) que atinge --min-recall.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/eval_retrieval.py
+    python benchmarks/eval_retrieval.py --chunk-sizes 500 1000 1500 \\
+        --chunk-overlaps 0 100 200 --k 1 3 5 --min-recall 0.8
+    python benchmarks/eval_retrieval.py --index flat hnsw ivf --output retrieval.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+GOLDEN_SET = Path(__file__).resolve().parent / "data" / "golden_questions.jsonl"
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+
+def normalize(text: str) -> str:
+    """Caixa e espaços não contam na busca das citações"""
+    return re.sub(r"\s+", " ", text.lower())
+
+
+def load_golden_set(path: Path) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_index(vectors: np.ndarray, kind: str):
+    """Índice FAISS do tipo pedido com os vetores dos chunks"""
+    import faiss
+    dimension = vectors.shape[1]
+    if kind == "flat":
+        # O mesmo tipo que o FAISS do langchain cria para a aplicação
+        index = faiss.IndexFlatL2(dimension)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, 32)
+        index.hnsw.efSearch = 64
+    elif kind == "ivf":
+        nlist = max(1, int(math.sqrt(len(vectors))))
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        index.train(vectors)
+        index.nprobe = max(1, nlist // 8)
+    else:
+        raise ValueError(f"Tipo de índice desconhecido: {kind}")
+    index.add(vectors)
+    return index
+
+
+def evaluate(index, chunks: List[str], query_vectors: np.ndarray,
+             items: List[dict], ks: List[int], repeat: int) -> dict:
+    """Recall@k, acerto@k, MRR, tokens e latência de uma configuração"""
+    from adapters.cascade import estimate_tokens
+
+    max_k = max(ks)
+    recalls: Dict[int, List[float]] = {k: [] for k in ks}
+    hits: Dict[int, List[float]] = {k: [] for k in ks}
+    tokens: Dict[int, List[int]] = {k: [] for k in ks}
+    reciprocal_ranks, latencies = [], []
+    for item, query_vector in zip(items, query_vectors):
+        query = query_vector.reshape(1, -1)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, positions = index.search(query, max_k)
+            latencies.append(time.perf_counter() - start)
+        retrieved = [chunks[p] for p in positions[0] if p >= 0]
+
+        passages = [normalize(p) for p in item["passages"]]
+        found = [{i for i, passage in enumerate(passages)
+                  if passage in normalize(text)} for text in retrieved]
+        first = next((rank for rank, matched in enumerate(found, 1)
+                      if matched), None)
+        reciprocal_ranks.append(1 / first if first else 0.0)
+        for k in ks:
+            matched = set().union(*found[:k]) if found[:k] else set()
+            recalls[k].append(len(matched) / len(passages))
+            hits[k].append(1.0 if matched else 0.0)
+            tokens[k].append(estimate_tokens("\n---\n".join(retrieved[:k])))
+
+    latencies.sort()
+    result = {"mrr": round(statistics.mean(reciprocal_ranks), 3)}
+    for k in ks:
+        result[f"recall@{k}"] = round(statistics.mean(recalls[k]), 3)
+        result[f"hit@{k}"] = round(statistics.mean(hits[k]), 3)
+        result[f"tokens@{k}"] = round(statistics.mean(tokens[k]), 1)
+    result["search_ms_p50"] = round(
+        latencies[len(latencies) // 2] * 1000, 3)
+    result["search_ms_p95"] = round(
+        latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3)
+    return result
+
+
+def cheapest(results: List[dict], ks: List[int], min_recall: float,
+             min_mrr: float) -> Optional[dict]:
+    """Configuração e k com menos tokens de contexto que atinge a meta"""
+    candidates = [
+        (result[f"tokens@{k}"], result["search_ms_p50"], k, result)
+        for result in results for k in ks
+        if result[f"recall@{k}"] >= min_recall and result["mrr"] >= min_mrr]
+    if not candidates:
+        return None
+    tokens, _, k, result = min(candidates, key=lambda c: c[:3])
+    return {"chunk_size": result["chunk_size"],
+            "chunk_overlap": result["chunk_overlap"],
+            "embeddings": result["embeddings"],
+            "index": result["index"],
+            "k": k,
+            "recall": result[f"recall@{k}"],
+            "mrr": result["mrr"],
+            "context_tokens": tokens,
+            "search_ms_p50": result["search_ms_p50"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+",
+                        default=[500, 1000, 1500])
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+",
+                        default=[100, 200])
+    parser.add_argument("--embeddings", nargs="+", default=["local"],
+                        help="provedores de embeddings (local, openai)")
+    parser.add_argument("--index", nargs="+", choices=INDEX_TYPES,
+                        default=["flat"])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="buscas por pergunta para medir a latência")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos para dividir os documentos")
+    parser.add_argument("--drop-empty", action="store_true",
+                        help="deixa fora do índice os chunks de vetor nulo")
+    parser.add_argument("--min-recall", type=float, default=0.8)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    os.environ.setdefault("EMBEDDINGS_PROVIDER", "local")
+
+    from adapters.document_loader import iter_batches, iter_document_chunks
+    from adapters.embeddings import create_embedding_provider
+
+    items = [item for item in load_golden_set(args.golden)
+             if item.get("passages")]
+    if not items:
+        sys.exit("❌ Nenhuma pergunta com o campo passages")
+    txt_files = sorted((ROOT_DIR / "documents").glob("*.txt"))
+
+    results = []
+    for provider_name in args.embeddings:
+        provider = create_embedding_provider(provider_name)
+        if provider is None:
+            print(f"⚠️ Provedor {provider_name} indisponível (sem chave?)")
+            continue
+        start = time.perf_counter()
+        query_vectors = np.asarray(
+            [provider.embed_query(item["question"]) for item in items],
+            dtype=np.float32)
+        embed_ms = (time.perf_counter() - start) / len(items) * 1000
+
+        for chunk_size, chunk_overlap in itertools.product(
+                args.chunk_sizes, args.chunk_overlaps):
+            if chunk_overlap >= chunk_size:
+                continue
+            chunks = list(iter_document_chunks(
+                txt_files, chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap, max_workers=args.workers))
+            start = time.perf_counter()
+            vectors = np.asarray(
+                [vector for batch in iter_batches(chunks, 256)
+                 for vector in provider.embed_documents(batch)],
+                dtype=np.float32)
+            embed_corpus_s = time.perf_counter() - start
+            # Chunks sem nenhuma palavra indexável (só stopwords ou símbolos
+            # do PDF) viram o vetor nulo, que fica a distância 1 de qualquer
+            # pergunta: mais perto que a maioria dos trechos de verdade
+            empty = np.linalg.norm(vectors, axis=1) == 0
+            if args.drop_empty and empty.any():
+                chunks = [c for c, e in zip(chunks, empty) if not e]
+                vectors = vectors[~empty]
+
+            for kind in args.index:
+                start = time.perf_counter()
+                index = build_index(vectors, kind)
+                build_s = time.perf_counter() - start
+                result = {
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "embeddings": provider_name,
+                    "index": kind,
+                    "chunks": len(chunks),
+                    "empty_chunks": int(empty.sum()),
+                    "embed_corpus_s": round(embed_corpus_s, 2),
+                    "index_build_s": round(build_s, 3),
+                    "embed_query_ms": round(embed_ms, 3),
+                    **evaluate(index, chunks, query_vectors, items,
+                               args.k, args.repeat)
+                }
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False))
+
+    choice = cheapest(results, args.k, args.min_recall, args.min_mrr)
+    if choice:
+        print(f"✅ Mais barata com recall >= {args.min_recall}: "
+              f"{json.dumps(choice, ensure_ascii=False)}")
+    else:
+        print(f"⚠️ Nenhuma configuração atinge recall >= {args.min_recall}")
+
+    if args.output:
+        report = {
+            "benchmark": "retrieval",
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "questions": len(items),
+            "min_recall": args.min_recall,
+            "min_mrr": args.min_mrr,
+            "results": results,
+            "choice": choice
+        }
+        args.output.write_text(json.dumps(report, ensure_ascii=False,
+                                          indent=2), encoding="utf-8")
+        print(f"✅ Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Servidor local que imita a API da OpenAI com um perfil de latência
+
+Para testes de carga da aplicação inteira sem rede: aponte o provedor
+local para ele (LOCAL_LLM_BASE_URL) ou, para substituir a OpenAI inclusive
+nos embeddings, OPENAI_BASE_URL. O perfil é um nome (instant, gpt-4o-mini,
+o1, flaky) ou JSON com os campos a alterar sobre um perfil base.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python benchmarks/mock_llm_server.py --port 8001 --profile flaky
+    python benchmarks/mock_llm_server.py --profile '{"base": "o1", "error_rate": 0.1}'
+    LOCAL_LLM_BASE_URL=http://127.0.0.1:8001/v1 LLM_PROVIDER=local \\
+        CHAT_MODEL=gpt-4o-mini streamlit run ui/streamlit.py
+"""
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from adapters.mock_provider import LatencyProfile, MockOpenAIServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--profile", default="gpt-4o-mini")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    profile = LatencyProfile.from_spec(args.profile)
+    server = MockOpenAIServer(profile, args.host, args.port, seed=args.seed)
+    print(f"🧪 Servidor simulado em {server.base_url}")
+    print(json.dumps(asdict(profile), ensure_ascii=False))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Resumo dos traces exportados em arquivo (OTLP/JSON)
+
+Lê o arquivo gravado com TRACE_EXPORTER=file e mostra, por etapa, p50/p95/
+p99 da duração e do tempo próprio (descontados os filhos). Depois olha só
+as requisições da cauda (duração total acima do percentil --tail) e conta
+qual etapa domina o tempo de cada uma.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    TRACE_EXPORTER=file python benchmarks/bench_e2e.py --profile gpt-4o-mini
+    python benchmarks/trace_report.py traces/traces.jsonl --tail 95
+"""
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def load_spans(path: Path) -> List[dict]:
+    """Spans de todas as linhas do arquivo, com duração em ms"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        span["duration_ms"] = (
+                            int(span["endTimeUnixNano"]) -
+                            int(span["startTimeUnixNano"])) / 1e6
+                        spans.append(span)
+    return spans
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[int(pct / 100 * (len(values) - 1))]
+
+
+def self_times(spans: List[dict]) -> Dict[str, float]:
+    """Tempo próprio de cada span (duração menos a dos filhos diretos)"""
+    children = defaultdict(float)
+    for span in spans:
+        if span.get("parentSpanId"):
+            children[span["parentSpanId"]] += span["duration_ms"]
+    return {span["spanId"]: max(0.0, span["duration_ms"] -
+                                children[span["spanId"]])
+            for span in spans}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("path", type=Path, nargs="?",
+                        default=Path("traces/traces.jsonl"))
+    parser.add_argument("--tail", type=float, default=95,
+                        help="percentil que separa as requisições da cauda")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if not spans:
+        sys.exit(f"❌ Nenhum span em {args.path}")
+    own = self_times(spans)
+
+    by_name = defaultdict(lambda: {"duration": [], "self": []})
+    traces = defaultdict(list)
+    for span in spans:
+        by_name[span["name"]]["duration"].append(span["duration_ms"])
+        by_name[span["name"]]["self"].append(own[span["spanId"]])
+        traces[span["traceId"]].append(span)
+
+    if "llm.generate" in by_name and "llm.first_token" not in by_name:
+        print("⚠️ Nenhum llm.first_token: o TTFT só é medido nas respostas "
+              "em streaming (API com \"stream\": true); a interface e o "
+              "bench_e2e usam a resposta completa", file=sys.stderr)
+
+    for name, values in sorted(by_name.items()):
+        print(json.dumps({
+            "stage": name,
+            "count": len(values["duration"]),
+            "p50_ms": round(percentile(values["duration"], 50), 2),
+            "p95_ms": round(percentile(values["duration"], 95), 2),
+            "p99_ms": round(percentile(values["duration"], 99), 2),
+            "self_p50_ms": round(percentile(values["self"], 50), 2),
+            "self_p99_ms": round(percentile(values["self"], 99), 2)
+        }, ensure_ascii=False))
+
+    # Duração de cada requisição: o span raiz do trace
+    totals = {}
+    for trace_id, trace_spans in traces.items():
+        roots = [s for s in trace_spans if not s.get("parentSpanId")]
+        if roots:
+            totals[trace_id] = max(s["duration_ms"] for s in roots)
+    if not totals:
+        return
+    threshold = percentile(list(totals.values()), args.tail)
+    dominant = Counter()
+    for trace_id, total in totals.items():
+        if total < threshold:
+            continue
+        slowest = max(traces[trace_id], key=lambda s: own[s["spanId"]])
+        dominant[slowest["name"]] += 1
+    print(json.dumps({
+        "tail_percentile": args.tail,
+        "tail_threshold_ms": round(threshold, 2),
+        "tail_requests": sum(dominant.values()),
+        "dominant_stage": dict(dominant.most_common())
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,17 @@ Domain Layer - Entidades de negócio
 Seguindo princípios de Clean Architecture
 """
 
-from .entities import Message, ChatSession, MessageRole, AIModelConfig
+from .entities import (
+    Message,
+    ChatSession,
+    MessageRole,
+    AIModelConfig,
+    RequestContext,
+    VEHICLE_YEARS,
+    VEHICLE_VERSIONS
+)
 
-__all__ = ['Message', 'ChatSession', 'MessageRole', 'AIModelConfig'] 
\ No newline at end of file
+__all__ = [
+    'Message', 'ChatSession', 'MessageRole', 'AIModelConfig',
+    'RequestContext', 'VEHICLE_YEARS', 'VEHICLE_VERSIONS'
+] 
\ No newline at end of file
@@ -2,12 +2,26 @@
 Entidades do domínio da aplicação
 Seguindo princípios de Clean Architecture
 """
-from dataclasses import dataclass
-from typing import List, Optional
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
 
+# Anos e versões do VW T-Cross atendidos pelo assistente
+VEHICLE_YEARS = ["2024", "2023", "2022", "2021", "2020", "2019"]
+VEHICLE_VERSIONS = [
+    "200 TSI Comfortline",
+    "200 TSI Highline",
+    "250 TSI Highline",
+    "1.0 TSI Sense",
+    "1.6 Sense",
+    "1.6 Comfortline"
+]
+
+
 class MessageRole(Enum):
     """Enum para definir os tipos de mensagem"""
     USER = "user"
@@ -51,6 +65,9 @@ class ChatSession:
     created_at: datetime
     model: str
     title: Optional[str] = None
+    # Resumo das mensagens antigas que já saíram da janela de histórico
+    summary: str = ""
+    summarized_count: int = 0
     
     def add_message(self, message: Message):
         """Adiciona uma mensagem à sessão"""
@@ -76,7 +93,9 @@ class ChatSession:
             "messages": [m.to_dict() for m in self.messages],
             "created_at": self.created_at.isoformat(),
             "model": self.model,
-            "title": self.title
+            "title": self.title,
+            "summary": self.summary,
+            "summarized_count": self.summarized_count
         }
     
     @classmethod
@@ -87,7 +106,9 @@ class ChatSession:
             messages=[Message.from_dict(m) for m in data["messages"]],
             created_at=datetime.fromisoformat(data["created_at"]),
             model=data["model"],
-            title=data.get("title")
+            title=data.get("title"),
+            summary=data.get("summary", ""),
+            summarized_count=data.get("summarized_count", 0)
         )
 
 
@@ -108,4 +129,42 @@ class AIModelConfig:
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "description": self.description
-        } 
\ No newline at end of file
+        } 
+
+
+@dataclass
+class RequestContext:
+    """Contexto de uma requisição ao assistente"""
+    question: Optional[str] = None
+    vehicle_year: Optional[str] = None
+    vehicle_version: Optional[str] = None
+    session_id: Optional[str] = None
+    # Prazo da requisição (time.monotonic()); None usa o padrão do serviço
+    deadline: Optional[float] = None
+    # Tokens consumidos, preenchido pelo provedor quando ele informa
+    usage: Dict[str, int] = field(default_factory=dict)
+    # Mensagens recentes da conversa ({"role", "content"}) e resumo das
+    # anteriores a elas
+    history: List[Dict[str, str]] = field(default_factory=list)
+    summary: str = ""
+    # Identificador que acompanha a requisição em todas as etapas (é
+    # também o trace id dos spans)
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    
+    def has_vehicle(self) -> bool:
+        """Indica se o veículo foi informado"""
+        return bool(self.vehicle_year and self.vehicle_version)
+    
+    def remaining_time(self) -> Optional[float]:
+        """Segundos até o prazo (None sem prazo)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+    
+    def to_prompt(self) -> str:
+        """Mensagem enviada ao assistente: veículo + pergunta"""
+        if not self.has_vehicle():
+            return self.question or ""
+        veiculo_info = (f"Veículo: VW T-Cross {self.vehicle_version} "
+                        f"{self.vehicle_year}")
+        return f"{veiculo_info}\nPergunta: {self.question}"
@@ -0,0 +1,75 @@
+"""
+Gera a tabela de respostas pré-computadas (FAQ) do Guia VW T-Cross
+Seguindo princípios de Clean Architecture
+
+Cada pergunta da lista é respondida para cada ano/versão pelo pipeline
+normal (recuperação + LLM) e gravada junto da versão do índice de
+documentos. Quando os manuais mudam, a versão muda e a tabela antiga deixa
+de ser usada até ser regenerada.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python faq_builder.py
+    python faq_builder.py --check        # só verifica se está atualizada
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from adapters import ai_service
+from adapters.faq import (FAQ_STORE_PATH, FAQStore, build_faq_entries,
+                          load_questions)
+from domain.entities import VEHICLE_VERSIONS, VEHICLE_YEARS, RequestContext
+
+
+def main():
+    """Gera (ou verifica) a tabela de FAQ"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--questions", type=Path,
+                        default=Path("data") / "faq_questions.txt")
+    parser.add_argument("--output", type=Path, default=FAQ_STORE_PATH)
+    parser.add_argument("--model", default="o1")
+    parser.add_argument("--years", nargs="+", default=VEHICLE_YEARS)
+    parser.add_argument("--versions", nargs="+", default=VEHICLE_VERSIONS)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--check", action="store_true",
+                        help="apenas informa se a tabela está atualizada")
+    parser.add_argument("--force", action="store_true",
+                        help="regenera mesmo se estiver atualizada")
+    args = parser.parse_args()
+
+    index_version = ai_service.get_index_version()
+    store = FAQStore(args.output)
+    store.load()
+    fresh = store.is_fresh(index_version)
+    print(f"📚 Índice atual: {index_version or '(sem embeddings)'} | "
+          f"FAQ: {store.index_version or '(inexistente)'}")
+
+    if args.check:
+        print("✅ FAQ atualizado" if fresh else "⚠️ FAQ desatualizado")
+        sys.exit(0 if fresh else 1)
+    if fresh and not args.force:
+        print("✅ FAQ já está atualizado (use --force para regenerar)")
+        return
+
+    questions = load_questions(args.questions)
+    vehicles = [(year, version)
+                for year in args.years for version in args.versions]
+    print(f"🤖 Gerando {len(questions) * len(vehicles)} respostas "
+          f"({len(questions)} perguntas x {len(vehicles)} veículos)...")
+
+    def answer(context: RequestContext) -> str:
+        return ai_service.get_response(context.to_prompt(), args.model,
+                                       context=context)
+
+    start = time.perf_counter()
+    entries = build_faq_entries(answer, questions, vehicles, args.workers)
+    store.replace(entries, index_version)
+    store.save()
+    print(f"✅ {len(store)} respostas gravadas em {args.output} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,42 +4,57 @@ Seguindo princípios de Clean Architecture
 """
 import sys
 import os
-import subprocess
-import pathlib
-import shutil
-import logging
-from bs4 import BeautifulSoup
-import streamlit as st
+import threading
+from pathlib import Path
 
 
+def warm_up_in_background():
+    """
+    Carrega o índice e aquece o processo enquanto o Streamlit sobe
+
+    Roda no mesmo processo do servidor, então as sessões encontram o
+    índice, as conexões e os caches já prontos. O endpoint de operação
+    (METRICS_PORT) sobe junto: /ready responde 503 até o fim do
+    aquecimento, /healthz e /_stcore/health indicam só que o processo vive.
+    """
+    def run():
+        from adapters import ai_service, start_metrics_server, start_warmup
+        start_metrics_server()
+        start_warmup(ai_service)
+
+    threading.Thread(target=run, daemon=True, name="startup").start()
+
 
 def main():
     """Função principal que executa a aplicação Streamlit"""
     print("🚗 Iniciando Guia VW T-Cross...")
-    
+
     # Caminho para o arquivo Streamlit
     current_dir = Path(__file__).parent
     streamlit_file = current_dir / 'ui' / 'streamlit.py'
-    
+
     # Adiciona o diretório atual ao PYTHONPATH
-    env = os.environ.copy()
-    pythonpath = str(current_dir) + os.pathsep + env.get('PYTHONPATH', '')
-    env['PYTHONPATH'] = pythonpath
-    
+    sys.path.insert(0, str(current_dir))
+    os.environ['PYTHONPATH'] = (str(current_dir) + os.pathsep +
+                                os.environ.get('PYTHONPATH', ''))
+
     try:
-        print(f"📁 Executando: {streamlit_file}")
-        subprocess.run([
-            sys.executable, '-m', 'streamlit', 'run', str(streamlit_file)
-        ], env=env, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erro ao executar Streamlit: {e}")
-        print("💡 Certifique-se de que o Streamlit está instalado:")
-        print("   pip install streamlit")
-    except FileNotFoundError:
+        from streamlit.web import cli as stcli
+    except ImportError:
         print("❌ Streamlit não encontrado!")
         print("💡 Instale com: pip install streamlit")
+        sys.exit(1)
+
+    warm_up_in_background()
+
+    # Servidor no próprio processo (argumentos extras vão para o Streamlit,
+    # ex.: --server.port=8501)
+    print(f"📁 Executando: {streamlit_file}")
+    sys.argv = ["streamlit", "run", str(streamlit_file), *sys.argv[1:]]
+    try:
+        sys.exit(stcli.main())
     except KeyboardInterrupt:
         print("\n🛑 Aplicação interrompida pelo usuário")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
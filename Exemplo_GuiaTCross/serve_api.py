@@ -0,0 +1,58 @@
+"""
+Servidor da API HTTP do assistente, com vários processos
+
+Sobe a aplicação ASGI de api/app.py no uvicorn com --workers processos.
+Antes, o processo principal garante o índice de embeddings em disco (cria
+se faltar); os workers o mapeiam em memória (INDEX_MMAP=1), então os
+vetores ficam uma vez só no cache de páginas, compartilhados por todos.
+As conversas ficam em API_SESSION_DIR (padrão api_sessions/), então
+qualquer worker atende qualquer sessão; filas, rate limit e métricas são
+de cada worker.
+
+Uso:
+    cd Exemplo_GuiaTCross
+    python serve_api.py --workers 4 --port 8000
+    curl -X POST localhost:8000/sessions
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-mmap", action="store_true",
+                        help="cada worker carrega sua cópia do índice")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn não encontrado!")
+        print("💡 Instale com: pip install uvicorn")
+        sys.exit(1)
+
+    os.environ["INDEX_MMAP"] = "0" if args.no_mmap else "1"
+    # Workers novos (spawn) importam o app a partir da raiz do projeto
+    os.environ["PYTHONPATH"] = (str(ROOT_DIR) + os.pathsep +
+                                os.environ.get("PYTHONPATH", ""))
+    if args.workers > 1:
+        os.environ.setdefault("API_SESSION_DIR", "api_sessions")
+        # Índice criado uma vez aqui, não por cada worker ao mesmo tempo
+        from adapters import ai_service
+        print(f"📚 Índice {ai_service.get_index_version()} pronto; "
+              f"subindo {args.workers} workers")
+
+    uvicorn.run("api.app:create_app", factory=True, host=args.host,
+                port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Configuração comum dos testes
+Seguindo princípios de Clean Architecture
+"""
+import os
+
+# Importar adapters cria o AIService: embeddings locais e provedor
+# simulado, para que os testes não dependam de rede nem de chaves
+os.environ.setdefault("EMBEDDINGS_PROVIDER", "local")
+os.environ.setdefault("LLM_PROVIDER", "mock")
+os.environ.setdefault("MOCK_LLM_PROFILE", "instant")
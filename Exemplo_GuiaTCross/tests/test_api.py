@@ -0,0 +1,150 @@
+"""
+Testes da API HTTP pela interface ASGI, com o provedor simulado
+Seguindo princípios de Clean Architecture
+"""
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from api.app import ChatAPI
+from use_cases import FileSessionStore, UseCaseFactory
+from adapters import ai_service
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAQ_STORE_PATH", str(tmp_path / "faq.json"))
+    return ChatAPI(UseCaseFactory(ai_service),
+                   store=FileSessionStore(tmp_path / "sessions"))
+
+
+def call(api: ChatAPI, *requests):
+    """Executa as requisições (método, caminho, json) em sequência"""
+    async def run():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="http://api") as client:
+            return [await client.request(method, path, json=body)
+                    for method, path, body in requests]
+    return asyncio.run(run())
+
+
+def create_session(api: ChatAPI) -> str:
+    [response] = call(api, ("POST", "/sessions", {"model": "gpt-4o-mini"}))
+    assert response.status_code == 201
+    return response.json()["session_id"]
+
+
+def test_create_session_and_message(api):
+    session_id = create_session(api)
+    path = f"/sessions/{session_id}"
+
+    answer, conversation = call(
+        api,
+        ("POST", f"{path}/messages", {"message": "Qual o consumo?",
+                                      "year": "2022",
+                                      "version": "200 TSI Highline"}),
+        ("GET", path, None))
+
+    assert answer.status_code == 200
+    assert answer.json()["message"]["role"] == "assistant"
+    assert conversation.status_code == 200
+    assert [m["role"] for m in conversation.json()["messages"]] == [
+        "user", "assistant"]
+
+
+def test_stream_message(api):
+    session_id = create_session(api)
+    [response] = call(api, ("POST", f"/sessions/{session_id}/messages",
+                            {"message": "Qual o consumo?", "stream": True}))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/event-stream"
+    events = [block.split("\n") for block in response.text.split("\n\n")
+              if block]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"message"}
+    done = json.loads(events[-1][1].removeprefix("data: "))
+    assert done["model_used"] == "gpt-4o-mini"
+
+
+@pytest.mark.parametrize("body", [
+    {"message": "Qual o consumo?", "year": 2020},
+    {"message": "Qual o consumo?", "year": "1999"},
+    {"message": "Qual o consumo?", "version": ["200 TSI Highline"]},
+    {"year": "2024"},
+])
+def test_invalid_message_is_rejected_before_touching_the_session(api, body):
+    session_id = create_session(api)
+    path = f"/sessions/{session_id}"
+
+    response, conversation = call(api, ("POST", f"{path}/messages", body),
+                                  ("GET", path, None))
+
+    assert response.status_code == 400
+    assert conversation.json()["messages"] == []
+
+
+def test_unknown_route_session_and_method(api):
+    missing_route, missing_session, wrong_method = call(
+        api, ("GET", "/nada", None), ("GET", "/sessions/nao-existe", None),
+        ("PUT", "/sessions", None))
+    assert missing_route.status_code == 404
+    assert missing_session.status_code == 404
+    assert wrong_method.status_code == 405
+
+
+def test_rate_limit_returns_429(api):
+    api.rate_limiter.MAX_REQUESTS_PER_MINUTE = 1
+    session_id = create_session(api)
+    path = f"/sessions/{session_id}/messages"
+
+    first, second = call(api, ("POST", path, {"message": "Qual o consumo?"}),
+                         ("POST", path, {"message": "E a garantia?"}))
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "60"
+
+
+def test_rate_limit_can_be_disabled(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAQ_STORE_PATH", str(tmp_path / "faq.json"))
+    api = ChatAPI(UseCaseFactory(ai_service), rate_limit=False)
+    session_id = create_session(api)
+    path = f"/sessions/{session_id}/messages"
+
+    responses = call(api, *[("POST", path, {"message": f"Pergunta {i}?"})
+                            for i in range(12)])
+
+    assert [r.status_code for r in responses] == [200] * 12
+
+
+def test_session_io_runs_off_the_event_loop(api, monkeypatch):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def watch(obj, name):
+        original = getattr(obj, name)
+
+        def wrapper(*args, **kwargs):
+            threads.append((name, threading.get_ident()))
+            return original(*args, **kwargs)
+        monkeypatch.setattr(obj, name, wrapper)
+
+    watch(api.factory, "create_chat_use_case")
+    watch(api.store, "exists")
+    watch(api.store, "save")
+    session_id = create_session(api)
+    api.sessions.clear()  # como se a sessão fosse de outro worker
+    path = f"/sessions/{session_id}"
+
+    responses = call(api, ("GET", path, None), ("DELETE", path, None),
+                     ("GET", path, None))
+
+    assert [r.status_code for r in responses] == [200, 200, 404]
+    assert {name for name, _ in threads} == {"create_chat_use_case",
+                                             "exists", "save"}
+    assert all(ident != loop_thread for _, ident in threads)
@@ -0,0 +1,58 @@
+"""
+Testes da cascata de modelos no caso de uso do chat
+Seguindo princípios de Clean Architecture
+"""
+from adapters.cascade import ModelCascade, QueryComplexityClassifier
+from domain.entities import RequestContext
+from use_cases.use_cases import ChatUseCase
+
+
+class StubAIService:
+    """AIService mínimo: boa recuperação e resposta confiante"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_retrieval_confidence(self, message, provider=None,
+                                 session_id=None):
+        return 0.9, "local"
+
+    def get_response(self, message, model, provider=None, context=None):
+        self.calls.append((model, message))
+        return "A pressão recomendada está na tabela da porta do motorista."
+
+    def estimate_latency(self, model, provider=None):
+        return None
+
+
+def test_cascade_classifies_the_question_without_vehicle_prefix():
+    service = StubAIService()
+    cascade = ModelCascade(
+        classifier=QueryComplexityClassifier(max_words=10))
+    use_case = ChatUseCase(service, cascade=cascade)
+    use_case.start_new_session("o1")
+
+    # 8 palavras na pergunta; com o prefixo do veículo seriam 16
+    context = RequestContext("Qual a pressão dos pneus do carro vazio?",
+                             "2024", "200 TSI Highline")
+    message = use_case.get_ai_response(context.to_prompt(), context)
+
+    assert message.model_used == "gpt-4o-mini"
+    # O modelo continua recebendo a mensagem completa, com o veículo
+    assert service.calls == [("gpt-4o-mini", context.to_prompt())]
+    assert cascade.get_stats()["fast_answered"] == 1
+
+
+def test_cascade_cost_uses_the_prompt_sent():
+    cascade = ModelCascade(prompt_overhead_tokens=0)
+    question = "Qual a pressão dos pneus?"
+    prompt = "Veículo: VW T-Cross 200 TSI Highline 2024\n" + question * 20
+
+    cascade.run(question, lambda model: "ok", retrieval_confidence=0.9,
+                embeddings_name="local", prompt=prompt)
+    with_prompt = cascade.get_stats()["estimated_cost_usd"]
+
+    cascade = ModelCascade(prompt_overhead_tokens=0)
+    cascade.run(question, lambda model: "ok", retrieval_confidence=0.9,
+                embeddings_name="local")
+    assert with_prompt > cascade.get_stats()["estimated_cost_usd"]
@@ -0,0 +1,98 @@
+"""
+Testes da tabela de FAQ e da sua regeneração quando o índice muda
+Seguindo princípios de Clean Architecture
+"""
+import threading
+
+from adapters.embeddings import tokenize
+from adapters.faq import FAQStore, question_tokens
+from use_cases.use_cases import UseCaseFactory
+
+VEHICLE = ("2024", "200 TSI Highline")
+
+
+class StubAIService:
+    """AIService mínimo para gerar respostas da FAQ"""
+
+    def __init__(self, index_version: str):
+        self.index_version = index_version
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_index_version(self) -> str:
+        return self.index_version
+
+    def get_response(self, message, model, provider=None, context=None):
+        with self._lock:
+            self.calls += 1
+        return f"{model}: {context.question}"
+
+
+def write_store(path, index_version: str):
+    store = FAQStore(path)
+    store.replace([{"year": VEHICLE[0], "version": VEHICLE[1],
+                    "question": "Qual a pressão dos pneus?",
+                    "answer": "resposta antiga"}], index_version)
+    store.save()
+
+
+def test_tokenize_normalizes_and_drops_stopwords():
+    assert tokenize("Qual a Manutenção do motor?") == ["manutencao", "motor"]
+    assert tokenize("manutenção do T-Cross", frozenset({"t", "cross"})) == [
+        "manutencao"]
+    assert question_tokens("Qual o consumo do meu T-Cross?") == {"consumo"}
+
+
+def test_refresh_regenerates_for_new_index_version(tmp_path):
+    path = tmp_path / "faq_store.json"
+    write_store(path, "v1")
+    store = FAQStore(path)
+    store.load()
+    service = StubAIService("v2")
+    answer = (lambda context: service.get_response(
+        context.to_prompt(), "o1", context=context))
+    questions = ["Qual a pressão dos pneus?", "Qual o consumo?"]
+
+    assert store.lookup(questions[0], *VEHICLE, "v2") is None
+    assert store.refresh(answer, questions, "v2")
+    assert service.calls == 2
+    assert store.lookup(questions[0], *VEHICLE, "v2") == (
+        "o1: Qual a pressão dos pneus?")
+
+    # Gravada no disco e não regenerada de novo para a mesma versão
+    reloaded = FAQStore(path)
+    reloaded.load()
+    assert reloaded.is_fresh("v2")
+    assert not reloaded.refresh(answer, questions, "v2")
+    assert service.calls == 2
+
+
+def test_factory_refreshes_stale_store(tmp_path, monkeypatch):
+    path = tmp_path / "faq_store.json"
+    questions = tmp_path / "questions.txt"
+    questions.write_text("# comentário\nQual a pressão dos pneus?\n",
+                         encoding="utf-8")
+    write_store(path, "v1")
+    monkeypatch.setenv("FAQ_STORE_PATH", str(path))
+    monkeypatch.setenv("FAQ_QUESTIONS", str(questions))
+    monkeypatch.setenv("FAQ_MODEL", "gpt-4o-mini")
+
+    factory = UseCaseFactory(StubAIService("v2"))
+    factory.faq_refresh.join(timeout=10)
+
+    assert factory.faq_store.is_fresh("v2")
+    assert factory.faq_store.lookup("Qual a pressão dos pneus?", *VEHICLE,
+                                    "v2") == (
+        "gpt-4o-mini: Qual a pressão dos pneus?")
+
+
+def test_factory_without_auto_refresh_keeps_store_stale(tmp_path,
+                                                        monkeypatch):
+    path = tmp_path / "faq_store.json"
+    write_store(path, "v1")
+    monkeypatch.setenv("FAQ_STORE_PATH", str(path))
+    monkeypatch.setenv("FAQ_AUTO_REFRESH", "0")
+
+    factory = UseCaseFactory(StubAIService("v2"))
+    assert factory.faq_refresh is None
+    assert not factory.faq_store.is_fresh("v2")
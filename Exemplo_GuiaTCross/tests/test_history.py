@@ -0,0 +1,71 @@
+"""
+Testes do resumo do histórico dentro do prazo da requisição
+Seguindo princípios de Clean Architecture
+"""
+import time
+from datetime import datetime
+
+from domain.entities import ChatSession, Message, MessageRole
+from use_cases.history import ConversationMemory
+
+
+class StubAIService:
+    """AIService mínimo que registra as chamadas diretas ao modelo"""
+
+    def __init__(self):
+        self.calls = []
+
+    def complete(self, messages, model, provider=None, deadline=None):
+        self.calls.append((model, deadline))
+        return "Resumo do modelo."
+
+
+def long_session(turns: int = 12) -> ChatSession:
+    messages = []
+    for i in range(turns):
+        messages.append(Message(MessageRole.USER,
+                                f"Pergunta {i} sobre o T-Cross. " * 10,
+                                datetime.now()))
+        messages.append(Message(MessageRole.ASSISTANT,
+                                f"Resposta {i} do manual. " * 10,
+                                datetime.now()))
+    return ChatSession("s", messages, datetime.now(), "o1")
+
+
+def make_memory(service: StubAIService) -> ConversationMemory:
+    return ConversationMemory(service, summary_model="resumidor",
+                              max_tokens=200, summary_share=0.25,
+                              min_summary_budget=1.0)
+
+
+def test_summary_call_gets_a_share_of_the_remaining_time():
+    service = StubAIService()
+    deadline = time.monotonic() + 20
+
+    summary, _ = make_memory(service).build(long_session(), None, deadline)
+
+    assert summary == "Resumo do modelo."
+    [(model, summary_deadline)] = service.calls
+    assert model == "resumidor"
+    # Um quarto dos ~20 s restantes, nunca o prazo inteiro
+    assert summary_deadline - time.monotonic() <= 5.0
+    assert summary_deadline - time.monotonic() > 4.0
+
+
+def test_short_budget_folds_without_calling_the_model():
+    service = StubAIService()
+    memory = make_memory(service)
+    deadline = time.monotonic() + 2  # 0,5 s para o resumo: abaixo de 1 s
+
+    summary, history = memory.build(long_session(), None, deadline)
+
+    assert service.calls == []
+    assert summary.startswith("Usuário: Pergunta 0 sobre o T-Cross.")
+    assert history
+    assert memory.get_stats()["summaries_by_fallback"] == 1
+
+
+def test_without_deadline_the_model_call_is_unbounded():
+    service = StubAIService()
+    make_memory(service).build(long_session())
+    assert service.calls == [("resumidor", None)]
@@ -0,0 +1,133 @@
+"""
+Testes de retentativas, orçamento e timeouts contra o servidor simulado
+Seguindo princípios de Clean Architecture
+"""
+import time
+
+import pytest
+from openai import APITimeoutError, InternalServerError
+
+from adapters import adapter as adapter_module
+from adapters.adapter import OpenAIAdapter, OpenAICompatibleAdapter
+from adapters.admission import DeadlineExceededError
+from adapters.embeddings import LocalHashingEmbeddingProvider
+from adapters.mock_provider import LatencyProfile, MockOpenAIServer
+from adapters.resilience import RetryBudget
+from domain.entities import RequestContext
+
+MODEL = "gpt-4o-mini"
+MESSAGES = [{"role": "user", "content": "Qual a pressão dos pneus?"}]
+# Servidor rápido e estável; cada teste acrescenta um tipo de falha
+BASE = dict(ttft_ms=5, ttft_jitter=0, tokens_per_s=0, output_tokens=2,
+            tail_rate=0, models=[MODEL])
+
+
+@pytest.fixture
+def server():
+    server = MockOpenAIServer(LatencyProfile(**BASE), seed=7)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_adapter(server: MockOpenAIServer) -> OpenAICompatibleAdapter:
+    """Adapter para o servidor simulado, sem índice de documentos"""
+    knowledge_base = OpenAIAdapter(
+        embedding_provider=LocalHashingEmbeddingProvider(), load_index=False)
+    return OpenAICompatibleAdapter(server.base_url,
+                                   knowledge_base=knowledge_base,
+                                   models=[MODEL])
+
+
+def test_transient_errors_are_retried_up_to_max_attempts(server,
+                                                         monkeypatch):
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "3")
+    server.set_profile(LatencyProfile(**BASE, error_rate=1.0), seed=7)
+    adapter = make_adapter(server)
+
+    with pytest.raises(InternalServerError):
+        adapter.complete(MESSAGES, MODEL)
+
+    assert server.requests == 3
+    stats = adapter.get_resilience_stats()["stages"][f"completion/{MODEL}"]
+    assert (stats["failures"], stats["retries"], stats["gave_up"]) == (
+        3, 2, 1)
+
+
+def test_retry_budget_denies_retries(server):
+    server.set_profile(LatencyProfile(**BASE, error_rate=1.0), seed=7)
+    adapter = make_adapter(server)
+    # Uma ficha e nenhum depósito: só a primeira falha pode ser repetida
+    adapter.retry_budget = RetryBudget(ratio=0.0, max_tokens=1.0)
+
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            adapter.complete(MESSAGES, MODEL)
+
+    # 1ª chamada: tentativa + 1 retentativa; 2ª: só a tentativa
+    assert server.requests == 3
+    budget = adapter.retry_budget.get_stats()
+    assert (budget["retries"], budget["denied"]) == (1, 2)
+
+
+def test_per_attempt_timeout_fires(server, monkeypatch):
+    monkeypatch.setenv("COMPLETION_TIMEOUT_S", "0.3")
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "3")
+    server.set_profile(LatencyProfile(**BASE, stall_rate=1.0,
+                                      stall_ms=3000), seed=7)
+    adapter = make_adapter(server)
+
+    start = time.monotonic()
+    with pytest.raises(APITimeoutError):
+        adapter.complete(MESSAGES, MODEL)
+    # Três tentativas de 0,3 s e o backoff, bem antes dos 3 s do servidor
+    assert time.monotonic() - start < 2.0
+    assert server.requests == 3
+
+
+def test_adaptive_timeout_follows_observed_latency(server, monkeypatch):
+    monkeypatch.setenv("COMPLETION_TIMEOUT_S", "5")
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "1")
+    monkeypatch.setitem(adapter_module.STAGE_TIMEOUTS, "completion",
+                        ("COMPLETION_TIMEOUT_S", 120.0, 0.2))
+    adapter = make_adapter(server)
+    policy = adapter._get_retry_policy("completion", MODEL)
+
+    for _ in range(policy.timeout.min_samples):
+        adapter.complete(MESSAGES, MODEL)
+    assert policy.timeout.current() == pytest.approx(0.2)
+
+    # Um travamento agora é cortado no timeout aprendido, não no teto de 5 s
+    server.set_profile(LatencyProfile(**BASE, stall_rate=1.0,
+                                      stall_ms=3000), seed=7)
+    start = time.monotonic()
+    with pytest.raises(APITimeoutError):
+        adapter.complete(MESSAGES, MODEL)
+    assert time.monotonic() - start < 1.0
+
+
+def test_deadline_caps_the_attempt_timeout(server):
+    server.set_profile(LatencyProfile(**BASE, stall_rate=1.0,
+                                      stall_ms=3000), seed=7)
+    adapter = make_adapter(server)
+    context = RequestContext("Qual a pressão dos pneus?", "2024",
+                             "200 TSI Highline",
+                             deadline=time.monotonic() + 0.4)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        adapter.generate_response(context.to_prompt(), MODEL, context)
+    assert time.monotonic() - start < 1.0
+    assert server.requests == 1
+
+
+def test_direct_completion_stops_at_the_deadline(server):
+    server.set_profile(LatencyProfile(**BASE, stall_rate=1.0,
+                                      stall_ms=3000), seed=7)
+    adapter = make_adapter(server)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        adapter.complete(MESSAGES, MODEL, deadline=time.monotonic() + 0.4)
+    assert time.monotonic() - start < 1.0
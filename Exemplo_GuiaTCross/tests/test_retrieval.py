@@ -0,0 +1,66 @@
+"""
+Testes da recuperação com conjunto de trabalho por sessão e cache
+Seguindo princípios de Clean Architecture
+"""
+import numpy as np
+import pytest
+
+from adapters.adapter import OpenAIAdapter
+from adapters.embeddings import LocalHashingEmbeddingProvider
+
+FAISS = pytest.importorskip("langchain_community.vectorstores").FAISS
+
+TOPICS = ["pressão dos pneus", "troca de óleo", "consumo de combustível",
+          "bateria", "freios", "câmbio automático", "ar-condicionado",
+          "faróis", "revisão", "garantia"]
+
+
+@pytest.fixture
+def adapter():
+    embeddings = LocalHashingEmbeddingProvider()
+    adapter = OpenAIAdapter(embedding_provider=embeddings, load_index=False)
+    texts = [f"Manual do T-Cross, {topic}: instrução {i} sobre {topic}."
+             for topic in TOPICS for i in range(5)]
+    adapter.vector_store = FAISS.from_texts(texts, embeddings)
+    # Qualquer trecho do conjunto da sessão serve, para forçar acertos
+    adapter.working_set_min_score = 0.0
+    return adapter
+
+
+def index_results(adapter, message, k=3):
+    vector = adapter.embeddings.embed_query(message)
+    return adapter._search_index(np.asarray(vector, dtype=np.float32), k)
+
+
+def test_working_set_results_do_not_leak_to_other_sessions(adapter):
+    # A sessão A só tem trechos de pneus no seu conjunto de trabalho
+    adapter._retrieve("Qual a pressão dos pneus?", 3, "A")
+    from_working_set = adapter._retrieve("Como trocar o óleo?", 3, "A")
+    assert adapter.get_session_retrieval_stats("A")["hits"] == 1
+
+    # Outra sessão (e quem não tem sessão) recebe a busca no índice completo
+    expected = index_results(adapter, "Como trocar o óleo?")
+    assert from_working_set != expected
+    assert adapter._retrieve("Como trocar o óleo?", 3, "B") == expected
+    assert adapter._retrieve("Como trocar o óleo?", 3, None) == expected
+
+
+def test_cached_question_still_consults_the_session_working_set(adapter):
+    question = "Qual a pressão dos pneus?"
+    adapter._retrieve(question, 3, "A")
+    adapter._retrieve("Quando revisar os freios?", 3, "B")
+
+    # Pergunta já no cache compartilhado: B ainda consulta o seu conjunto
+    adapter._retrieve(question, 3, "B")
+    assert adapter.get_session_retrieval_stats("B")["hits"] == 1
+
+    # Repetida na mesma sessão (cascata + prompt), não conta de novo
+    adapter._retrieve(question, 3, "B")
+    assert adapter.get_session_retrieval_stats("B")["hits"] == 1
+
+
+def test_release_session_drops_its_cached_results(adapter):
+    adapter._retrieve("Qual a pressão dos pneus?", 3, "A")
+    adapter.release_session("A")
+    assert not any(key[0] == "A" for key in adapter._session_retrievals)
+    assert adapter.get_session_retrieval_stats("A") == {}
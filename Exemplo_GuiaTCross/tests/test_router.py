@@ -0,0 +1,211 @@
+"""
+Testes do roteamento entre provedores (circuitos, failover e hedging)
+Seguindo princípios de Clean Architecture
+"""
+import threading
+import time
+from typing import List, Optional
+
+import pytest
+
+from adapters import adapter as adapter_module
+from adapters.adapter import AIProviderInterface, ClaudeAdapter
+from adapters.admission import DeadlineExceededError
+from adapters.router import CircuitBreaker, CircuitOpenError, ProviderRouter
+
+
+class SimulatedProvider(AIProviderInterface):
+    """Provedor simulado com latência fixa e erro opcional"""
+
+    def __init__(self, latency_ms: float = 0.0,
+                 error: Optional[BaseException] = None,
+                 models: Optional[List[str]] = None):
+        self.latency = latency_ms / 1000
+        self.error = error
+        self.models = models or ["sim"]
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_response(self, message: str, model: str,
+                          context=None) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return f"[{model}] {message}"
+
+    def complete(self, messages: List[dict], model: str,
+                 deadline=None) -> str:
+        return self.generate_response(messages[-1]["content"], model)
+
+    def get_available_models(self) -> List[str]:
+        return self.models
+
+
+def ask(router: ProviderRouter, message: str = "oi",
+        preferred: Optional[str] = None) -> str:
+    return router.route("sim",
+                        lambda p, m: p.generate_response(message, m),
+                        preferred=preferred)
+
+
+def test_circuit_breaker_transitions():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure(now=0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure(now=1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request(now=5)
+
+    # Depois do reset_timeout passa uma requisição de teste por vez
+    assert breaker.is_available(now=11)
+    assert breaker.allow_request(now=11)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request(now=11)
+
+    # Falha no teste reabre; sucesso no seguinte fecha
+    breaker.record_failure(now=12)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request(now=23)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_candidates_prefer_unmeasured_then_lowest_p95():
+    router = ProviderRouter({"lento": SimulatedProvider(30),
+                             "rapido": SimulatedProvider(1)})
+
+    # Sem medições o preferido vem primeiro
+    assert router.candidates("sim", preferred="lento")[0] == ("lento", "sim")
+
+    for _ in range(3):
+        router._call(("lento", "sim"),
+                     lambda p, m: p.generate_response("x", m))
+        router._call(("rapido", "sim"),
+                     lambda p, m: p.generate_response("x", m))
+    assert router.candidates("sim", preferred="lento") == [
+        ("rapido", "sim"), ("lento", "sim")]
+
+
+def test_candidates_model_fallback_comes_last():
+    providers = {"outro": SimulatedProvider(models=["outro-modelo"]),
+                 "serve": SimulatedProvider()}
+    assert ProviderRouter(providers).candidates("sim") == [("serve", "sim")]
+    assert ProviderRouter(providers, allow_model_fallback=True).candidates(
+        "sim") == [("serve", "sim"), ("outro", "outro-modelo")]
+
+
+def test_failover_and_circuit_opening():
+    quebrado = SimulatedProvider(error=ConnectionError("fora"))
+    reserva = SimulatedProvider()
+    router = ProviderRouter({"quebrado": quebrado, "reserva": reserva},
+                            failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        assert ask(router, preferred="quebrado") == "[sim] oi"
+    assert quebrado.calls == 2
+    assert router.get_stats()["targets"]["quebrado/sim"]["circuit"] == "open"
+
+    # Circuito aberto: o alvo sai dos candidatos e não é mais chamado
+    assert router.candidates("sim", preferred="quebrado") == [
+        ("reserva", "sim")]
+    assert ask(router, preferred="quebrado") == "[sim] oi"
+    assert quebrado.calls == 2
+    with pytest.raises(CircuitOpenError):
+        router._call(("quebrado", "sim"),
+                     lambda p, m: p.generate_response("x", m))
+
+
+def test_direct_completion_falls_back_without_opening_circuits(
+        monkeypatch):
+    # Resumo do histórico com ROUTER_MODEL_FALLBACK=1: o Claude atende
+    monkeypatch.setattr(adapter_module.random, "uniform", lambda a, b: 0)
+    router = ProviderRouter({"claude": ClaudeAdapter()},
+                            allow_model_fallback=True, failure_threshold=1)
+    messages = [{"role": "user", "content": "Resuma a conversa"}]
+
+    answer = router.route("gpt-4o-mini",
+                          lambda p, m: p.complete(messages, m))
+    assert "Resuma a conversa" in answer
+    assert router.get_stats()["targets"]["claude/Claude-3"][
+        "circuit"] == "closed"
+
+
+def test_all_candidates_failing_raises_last_error():
+    router = ProviderRouter({
+        "a": SimulatedProvider(error=ConnectionError("a")),
+        "b": SimulatedProvider(error=ValueError("b"))})
+    with pytest.raises((ConnectionError, ValueError)):
+        ask(router)
+
+
+def test_hedge_wins_when_primary_is_slow():
+    lento = SimulatedProvider(latency_ms=500)
+    rapido = SimulatedProvider(latency_ms=1)
+    router = ProviderRouter({"lento": lento, "rapido": rapido},
+                            hedge_after_ms=20)
+
+    start = time.perf_counter()
+    assert ask(router, preferred="lento") == "[sim] oi"
+    assert time.perf_counter() - start < 0.4
+    assert router.hedges_fired == 1
+    assert router.hedges_won == 1
+    assert lento.calls == 1 and rapido.calls == 1
+
+
+def test_no_hedge_when_primary_answers_in_time():
+    router = ProviderRouter({"a": SimulatedProvider(1),
+                             "b": SimulatedProvider(1)},
+                            hedge_after_ms=200)
+    ask(router, preferred="a")
+    assert router.hedges_fired == 0
+
+
+def test_deadline_is_not_a_provider_failure():
+    sem_tempo = SimulatedProvider(error=DeadlineExceededError("prazo"))
+    reserva = SimulatedProvider()
+    router = ProviderRouter({"sem_tempo": sem_tempo, "reserva": reserva},
+                            failure_threshold=1)
+
+    with pytest.raises(DeadlineExceededError):
+        ask(router, preferred="sem_tempo")
+    # Nem failover para o próximo nem circuito aberto
+    assert reserva.calls == 0
+    stats = router.get_stats()["targets"]
+    assert stats.get("sem_tempo/sim", {}).get("circuit", "closed") == "closed"
+    assert ("sem_tempo", "sim") in router.candidates("sim")
+
+
+def test_deadline_in_half_open_trial_releases_it():
+    provider = SimulatedProvider(error=ConnectionError("fora"))
+    router = ProviderRouter({"p": provider}, failure_threshold=1,
+                            reset_timeout=0.05)
+    with pytest.raises(ConnectionError):
+        ask(router)
+
+    time.sleep(0.06)
+    provider.error = DeadlineExceededError("prazo")
+    with pytest.raises(DeadlineExceededError):
+        ask(router)
+    # A passagem de teste foi devolvida: a próxima requisição pode tentar
+    provider.error = None
+    assert ask(router) == "[sim] oi"
+    assert router.get_stats()["targets"]["p/sim"]["circuit"] == "closed"
+
+
+def test_hedged_deadline_is_raised_without_failover():
+    sem_tempo = SimulatedProvider(latency_ms=50,
+                                  error=DeadlineExceededError("prazo"))
+    lento = SimulatedProvider(latency_ms=300)
+    terceiro = SimulatedProvider()
+    router = ProviderRouter({"sem_tempo": sem_tempo, "lento": lento,
+                             "terceiro": terceiro}, hedge_after_ms=10)
+    router.candidates = lambda model, preferred=None: [
+        ("sem_tempo", "sim"), ("lento", "sim"), ("terceiro", "sim")]
+
+    with pytest.raises(DeadlineExceededError):
+        ask(router)
+    assert terceiro.calls == 0
@@ -7,8 +7,23 @@ from .use_cases import (
     ChatUseCase, 
     UseCaseFactory
 )
+from .history import ConversationMemory
+from .sessions import (SessionManager, FileSessionStore,
+                       estimate_session_bytes)
+from .security import (
+    InputValidator,
+    ValidationResult,
+    RateLimiter,
+    PromptProtector,
+    SecureChatUseCase,
+    SecurityLogger
+)
 
 __all__ = [
     'ChatUseCase', 
-    'UseCaseFactory'
+    'UseCaseFactory',
+    'ConversationMemory',
+    'SessionManager', 'FileSessionStore', 'estimate_session_bytes',
+    'InputValidator', 'ValidationResult', 'RateLimiter', 'PromptProtector',
+    'SecureChatUseCase', 'SecurityLogger'
 ] 
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Histórico da conversa com janela limitada por tokens e resumo incremental
+Seguindo princípios de Clean Architecture
+"""
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from domain.entities import ChatSession, Message, MessageRole
+from adapters.adapter import AIService
+from adapters.cascade import estimate_tokens
+from adapters.metrics import metrics
+
+# Custo aproximado, em tokens, da estrutura de cada mensagem no prompt
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARIES = metrics.counter(
+    "tcross_history_summaries_total",
+    "Resumos do histórico feitos pelo modelo ou sem ele (fallback)",
+    ("method",))
+
+
+class ConversationMemory:
+    """
+    Monta o histórico enviado ao modelo a cada pergunta
+
+    As mensagens mais recentes que cabem em max_tokens vão inteiras; as
+    anteriores são incorporadas a um resumo guardado na própria sessão
+    (ChatSession.summary), atualizado só com as mensagens que acabaram de
+    sair da janela. Ao resumir, a janela encolhe para metade do orçamento,
+    para que o resumo não precise ser refeito a cada pergunta. Assim o
+    prompt fica limitado a max_tokens + max_summary_tokens, qualquer que
+    seja o tamanho da conversa.
+
+    O resumo acontece no caminho da resposta; com prazo, a chamada ao
+    modelo usa no máximo summary_share do tempo restante e, se essa fatia
+    for menor que min_summary_budget segundos, o resumo é extrativo.
+    """
+
+    def __init__(self, ai_service: AIService, summary_model: str,
+                 max_tokens: int = 1500, max_summary_tokens: int = 300,
+                 summary_share: float = 0.25,
+                 min_summary_budget: float = 1.0):
+        self.ai_service = ai_service
+        self.max_tokens = max_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.summary_model = summary_model
+        self.summary_share = summary_share
+        self.min_summary_budget = min_summary_budget
+        self.summaries_by_model = 0
+        self.summaries_by_fallback = 0
+
+    def build(self, session: ChatSession, provider: Optional[str] = None,
+              deadline: Optional[float] = None
+              ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Retorna o resumo e a janela de mensagens para a próxima pergunta
+
+        A pergunta atual (última mensagem do usuário, ainda sem resposta)
+        não entra no histórico: ela vai como a mensagem final do prompt.
+        deadline é o prazo da requisição (time.monotonic()).
+        """
+        messages = session.messages
+        if messages and messages[-1].role == MessageRole.USER:
+            messages = messages[:-1]
+
+        start = self._window_start(messages, self.max_tokens)
+        if start > session.summarized_count:
+            start = max(start, self._window_start(messages,
+                                                  self.max_tokens // 2))
+            session.summary = self._fold(
+                session.summary, messages[session.summarized_count:start],
+                provider, deadline)
+            session.summarized_count = start
+        start = max(start, session.summarized_count)
+
+        history = [{"role": m.role.value, "content": m.content}
+                   for m in messages[start:]]
+        return session.summary, history
+
+    @staticmethod
+    def _window_start(messages: List[Message], budget: int) -> int:
+        """Índice da mensagem mais antiga que ainda cabe no orçamento"""
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            used += (estimate_tokens(messages[index].content) +
+                     _MESSAGE_OVERHEAD_TOKENS)
+            if used > budget:
+                return index + 1
+        return 0
+
+    def _fold(self, summary: str, messages: List[Message],
+              provider: Optional[str], deadline: Optional[float]) -> str:
+        """Incorpora as mensagens ao resumo existente"""
+        summary_deadline = self._summary_deadline(deadline)
+        if summary_deadline is not None and summary_deadline <= 0:
+            # Sem tempo para o modelo sem comprometer a resposta
+            self.summaries_by_fallback += 1
+            SUMMARIES.inc(method="fallback")
+            return self._clip(self._extractive_fold(summary,
+                                                    messages).strip())
+        transcript = "\n".join(
+            f"{'Usuário' if m.role == MessageRole.USER else 'Assistente'}: "
+            f"{m.content}" for m in messages)
+        max_words = int(self.max_summary_tokens * 0.75)
+        prompt = [
+            {"role": "system",
+             "content": f"Você resume conversas sobre o VW T-Cross. "
+                        f"Atualize o resumo com as novas mensagens em no "
+                        f"máximo {max_words} palavras, mantendo fatos, "
+                        f"preferências do usuário e perguntas em aberto."},
+            {"role": "user",
+             "content": f"Resumo atual:\n{summary or '(vazio)'}\n\n"
+                        f"Novas mensagens:\n{transcript}"}
+        ]
+        try:
+            new_summary = self.ai_service.complete(
+                prompt, self.summary_model, provider,
+                deadline=summary_deadline)
+            self.summaries_by_model += 1
+            SUMMARIES.inc(method="model")
+        except Exception as e:
+            print(f"⚠️ Resumo pelo modelo indisponível ({e}); "
+                  f"usando resumo extrativo")
+            new_summary = self._extractive_fold(summary, messages)
+            self.summaries_by_fallback += 1
+            SUMMARIES.inc(method="fallback")
+        return self._clip(new_summary.strip())
+
+    def _summary_deadline(self, deadline: Optional[float]
+                          ) -> Optional[float]:
+        """
+        Prazo da chamada de resumo: uma fração do tempo restante
+
+        None sem prazo da requisição; 0 se a fração não chega ao mínimo.
+        """
+        if deadline is None:
+            return None
+        now = time.monotonic()
+        budget = (deadline - now) * self.summary_share
+        if budget < self.min_summary_budget:
+            return 0.0
+        return now + budget
+
+    @staticmethod
+    def _extractive_fold(summary: str, messages: List[Message]) -> str:
+        """Resumo sem modelo: primeira frase de cada mensagem"""
+        lines = [summary] if summary else []
+        for m in messages:
+            first_sentence = re.split(r"(?<=[.!?])\s", m.content.strip(), 1)[0]
+            role = "Usuário" if m.role == MessageRole.USER else "Assistente"
+            lines.append(f"{role}: {first_sentence[:200]}")
+        return "\n".join(lines)
+
+    def _clip(self, summary: str) -> str:
+        """Garante o limite do resumo, mantendo a parte mais recente"""
+        max_chars = self.max_summary_tokens * 4
+        if len(summary) <= max_chars:
+            return summary
+        return "…" + summary[-max_chars:]
+
+    def get_stats(self) -> dict:
+        """Retorna quantos resumos foram feitos pelo modelo e sem ele"""
+        return {
+            "summaries_by_model": self.summaries_by_model,
+            "summaries_by_fallback": self.summaries_by_fallback
+        }
@@ -0,0 +1,352 @@
+"""
+Contabilidade de memória e despejo das sessões de chat ociosas
+Seguindo princípios de Clean Architecture
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+from domain.entities import ChatSession
+from adapters.adapter import AIService
+from adapters.metrics import metrics
+from .use_cases import ChatUseCase
+
+# Objeto Message, datetime, enum e entrada na lista, fora o texto
+_MESSAGE_OVERHEAD_BYTES = 300
+# ChatSession, ChatUseCase e demais campos de uma sessão vazia
+_SESSION_OVERHEAD_BYTES = 2000
+
+EVICTIONS = metrics.counter(
+    "tcross_session_evictions_total",
+    "Sessões despejadas por motivo (idle, max_sessions, max_bytes) e "
+    "destino (spilled em disco ou dropped)", ("reason", "action"))
+RESTORES = metrics.counter(
+    "tcross_session_restores_total",
+    "Sessões gravadas em disco que voltaram à memória")
+SESSIONS = metrics.gauge(
+    "tcross_sessions", "Sessões registradas por estado (active, spilled)",
+    ("state",))
+SESSION_BYTES = metrics.gauge(
+    "tcross_session_bytes", "Memória aproximada das sessões em memória")
+
+
+def estimate_session_bytes(session: Optional[ChatSession]) -> int:
+    """Bytes aproximados que a conversa ocupa (textos e objetos)"""
+    if session is None:
+        return _SESSION_OVERHEAD_BYTES
+    return (_SESSION_OVERHEAD_BYTES + sys.getsizeof(session.summary) +
+            sum(sys.getsizeof(message.content) + _MESSAGE_OVERHEAD_BYTES
+                for message in session.messages))
+
+
+@dataclass
+class SessionEntry:
+    """Uma sessão do servidor acompanhada pelo SessionManager"""
+    key: str
+    use_case: "weakref.ref[ChatUseCase]"
+    last_seen: float
+    bytes: int = 0
+    session_id: Optional[str] = None
+    spilled_to: Optional[Path] = None
+
+
+class SessionManager:
+    """
+    Acompanha a memória das sessões e despeja as ociosas
+
+    Cada execução de uma sessão chama touch(). Sessões sem uso há idle_ttl
+    segundos são despejadas; depois, enquanto o total passar de
+    max_sessions ou max_bytes, saem as usadas há mais tempo (só entre as
+    paradas há ao menos min_idle segundos, para não tirar a conversa de
+    uma requisição em andamento; os limites podem ser excedidos nesse
+    meio-tempo). Com spill_dir a conversa é gravada em disco e volta no
+    próximo touch(); sem ele é descartada e a sessão recomeça vazia.
+    Sessões que o servidor já encerrou (ChatUseCase coletado) saem do
+    registro sozinhas.
+    """
+
+    def __init__(self, ai_service: Optional[AIService] = None,
+                 idle_ttl: float = 1800.0, max_sessions: int = 0,
+                 max_bytes: int = 0, min_idle: float = 120.0,
+                 spill_dir: Optional[Path] = None,
+                 sweep_interval: float = 30.0):
+        self.ai_service = ai_service
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.min_idle = min_idle
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.sweep_interval = sweep_interval
+        self._lock = threading.RLock()
+        self._entries: Dict[str, SessionEntry] = {}
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+        self.restored = 0
+        SESSIONS.set_function(self._count_by_state)
+        SESSION_BYTES.set_function(self.total_bytes)
+
+    @classmethod
+    def from_env(cls, ai_service: Optional[AIService] = None
+                 ) -> "SessionManager":
+        """
+        Política pelas variáveis de ambiente
+
+        SESSION_IDLE_TTL_S (padrão 1800; 0 desliga), SESSION_MAX_COUNT e
+        SESSION_MAX_MB (0 = sem limite), SESSION_MIN_IDLE_S (120) e
+        SESSION_SPILL_DIR (vazio descarta em vez de gravar).
+        """
+        spill_dir = os.getenv("SESSION_SPILL_DIR")
+        return cls(
+            ai_service,
+            idle_ttl=float(os.getenv("SESSION_IDLE_TTL_S", "1800")),
+            max_sessions=int(os.getenv("SESSION_MAX_COUNT", "0")),
+            max_bytes=int(float(os.getenv("SESSION_MAX_MB", "0")) * 2 ** 20),
+            min_idle=float(os.getenv("SESSION_MIN_IDLE_S", "120")),
+            spill_dir=Path(spill_dir) if spill_dir else None)
+
+    def touch(self, key: str, use_case: ChatUseCase):
+        """Registra o uso da sessão; traz de volta a conversa gravada"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.use_case() is not use_case:
+                entry = self._entries[key] = SessionEntry(
+                    key, weakref.ref(use_case), now)
+            if entry.spilled_to is not None:
+                self._restore(entry, use_case)
+            entry.last_seen = now
+            self._measure(entry, use_case)
+            if now - self._last_sweep >= self.sweep_interval:
+                self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None):
+        """Aplica o TTL de ociosidade e os limites de quantidade e bytes"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            for entry in list(self._entries.values()):
+                if entry.use_case() is None:
+                    self._forget(entry)
+                elif (self.idle_ttl and entry.spilled_to is None and
+                        now - entry.last_seen >= self.idle_ttl):
+                    self._evict(entry, "idle")
+
+            resident = sorted(
+                (entry for entry in self._entries.values()
+                 if entry.spilled_to is None),
+                key=lambda entry: entry.last_seen)
+            count = len(resident)
+            total = sum(entry.bytes for entry in resident)
+            for entry in resident:
+                over_count = self.max_sessions and count > self.max_sessions
+                over_bytes = self.max_bytes and total > self.max_bytes
+                if not (over_count or over_bytes):
+                    break
+                if now - entry.last_seen < self.min_idle:
+                    break
+                count -= 1
+                total -= entry.bytes
+                self._evict(entry, "max_sessions" if over_count
+                            else "max_bytes")
+
+    def _measure(self, entry: SessionEntry, use_case: ChatUseCase):
+        session = use_case.current_session
+        entry.session_id = session.id if session else None
+        entry.bytes = estimate_session_bytes(session)
+        if self.ai_service is not None and entry.session_id:
+            entry.bytes += self.ai_service.get_session_memory(
+                entry.session_id, use_case.provider)
+
+    def _evict(self, entry: SessionEntry, reason: str):
+        use_case = entry.use_case()
+        if use_case is None:
+            self._forget(entry)
+            return
+        session = use_case.current_session
+        action = "dropped"
+        if self.spill_dir is not None and session is not None:
+            try:
+                path = self.spill_dir / f"{_safe_name(entry.key)}.json"
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(session.to_dict(),
+                                           ensure_ascii=False),
+                                encoding="utf-8")
+                entry.spilled_to = path
+                action = "spilled"
+            except OSError as e:
+                print(f"⚠️ Falha ao gravar a sessão em disco: {e}")
+        use_case.current_session = None
+        if self.ai_service is not None and entry.session_id:
+            self.ai_service.release_session(entry.session_id)
+        entry.bytes = 0
+        if action == "dropped":
+            del self._entries[entry.key]
+        self.evicted += 1
+        EVICTIONS.inc(reason=reason, action=action)
+
+    def _restore(self, entry: SessionEntry, use_case: ChatUseCase):
+        path, entry.spilled_to = entry.spilled_to, None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            path.unlink()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Sessão gravada em disco indisponível: {e}")
+            return
+        use_case.current_session = ChatSession.from_dict(data)
+        self.restored += 1
+        RESTORES.inc()
+
+    def _forget(self, entry: SessionEntry):
+        """Sessão encerrada pelo servidor: apaga o que restou dela"""
+        del self._entries[entry.key]
+        if entry.spilled_to is not None:
+            try:
+                entry.spilled_to.unlink()
+            except OSError:
+                pass
+        if self.ai_service is not None and entry.session_id:
+            self.ai_service.release_session(entry.session_id)
+
+    def _count_by_state(self) -> Dict[tuple, int]:
+        with self._lock:
+            spilled = sum(1 for entry in self._entries.values()
+                          if entry.spilled_to is not None)
+            return {("active",): len(self._entries) - spilled,
+                    ("spilled",): spilled}
+
+    def total_bytes(self) -> int:
+        """Bytes aproximados de todas as sessões em memória"""
+        with self._lock:
+            return sum(entry.bytes for entry in self._entries.values())
+
+    def has_session(self, key: str) -> bool:
+        """Sessão registrada (em memória ou gravada em disco)"""
+        with self._lock:
+            return key in self._entries
+
+    def get_session_bytes(self, key: str) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.bytes if entry else 0
+
+    def get_stats(self) -> dict:
+        """Sessões em memória e em disco, bytes e despejos"""
+        with self._lock:
+            entries: List[SessionEntry] = list(self._entries.values())
+        spilled = sum(1 for entry in entries if entry.spilled_to is not None)
+        return {
+            "sessions": len(entries) - spilled,
+            "spilled": spilled,
+            "bytes": sum(entry.bytes for entry in entries),
+            "largest_bytes": max((entry.bytes for entry in entries),
+                                 default=0),
+            "evicted": self.evicted,
+            "restored": self.restored
+        }
+
+
+def _safe_name(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+class FileSessionStore:
+    """
+    Conversas gravadas em disco, compartilhadas entre processos
+
+    Usado pela API com vários workers: a requisição seguinte de uma sessão
+    pode cair em outro processo, que lê a conversa daqui. lock() serializa
+    as requisições da mesma sessão entre processos (flock); a gravação é
+    atômica (arquivo temporário + rename), então leituras sem trava nunca
+    veem um arquivo pela metade.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._last_purge = 0.0
+
+    def _path(self, session_id: str, suffix: str = ".json") -> Path:
+        return self.directory / f"{_safe_name(session_id)}{suffix}"
+
+    def version(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """Marca da última gravação (None se a sessão não existe)"""
+        try:
+            stat = self._path(session_id).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def exists(self, session_id: str) -> bool:
+        return self._path(session_id).exists()
+
+    def load(self, session_id: str) -> Optional[ChatSession]:
+        try:
+            data = json.loads(self._path(session_id).read_text(
+                encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        return ChatSession.from_dict(data)
+
+    def save(self, session: ChatSession):
+        path = self._path(session.id)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(session.to_dict(),
+                                        ensure_ascii=False),
+                             encoding="utf-8")
+        os.replace(temporary, path)
+
+    def delete(self, session_id: str):
+        for suffix in (".json", ".lock"):
+            try:
+                self._path(session_id, suffix).unlink()
+            except FileNotFoundError:
+                pass
+
+    def acquire(self, session_id: str) -> IO:
+        """Trava a sessão entre processos (bloqueia); libere com release"""
+        handle = open(self._path(session_id, ".lock"), "a")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def release(self, handle: IO):
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        handle = self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(handle)
+
+    def purge_idle(self, max_idle: float, interval: float = 60.0) -> int:
+        """Apaga conversas sem gravação há max_idle segundos"""
+        now = time.time()
+        if not max_idle or now - self._last_purge < interval:
+            return 0
+        self._last_purge = now
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                if now - path.stat().st_mtime >= max_idle:
+                    self.delete(path.stem)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
@@ -2,20 +2,56 @@
 Use Cases da aplicação
 Seguindo princípios de Clean Architecture
 """
+import os
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Optional
-from domain.entities import Message, ChatSession, MessageRole
+from typing import Iterator, Optional
+from pathlib import Path
+from domain.entities import Message, ChatSession, MessageRole, RequestContext
 from adapters.adapter import AIService
+from adapters.admission import DeadlineExceededError
+from adapters.cascade import ModelCascade
+from adapters.faq import FAQStore, load_questions
+from adapters.metrics import metrics
+from adapters.tracing import tracer
+from .history import ConversationMemory
+
+RESPONSES = metrics.counter(
+    "tcross_chat_responses_total",
+    "Respostas do chat por origem (modelo, faq, extractive)",
+    ("model", "stream"))
+RESPONSE_ERRORS = metrics.counter(
+    "tcross_chat_errors_total", "Respostas do chat que falharam",
+    ("error", "stream"))
+RESPONSE_LATENCY = metrics.histogram(
+    "tcross_chat_response_seconds",
+    "Duração de cada resposta do chat (streaming: até o último pedaço)",
+    ("stream",))
 
 
 class ChatUseCase:
     """Use Case para gerenciar operações de chat"""
     
-    def __init__(self, ai_service: AIService):
+    def __init__(self, ai_service: AIService,
+                 cascade: Optional[ModelCascade] = None,
+                 faq_store: Optional[FAQStore] = None,
+                 memory: Optional[ConversationMemory] = None,
+                 response_deadline: Optional[float] = None,
+                 min_completion_budget: float = 3.0):
         self.ai_service = ai_service
+        self.cascade = cascade  # Cascata modelo rápido -> modelo forte
+        self.faq_store = faq_store  # Respostas pré-computadas
+        self.memory = memory  # Histórico enviado ao modelo
+        # Prazo de cada resposta (s); sem tempo para o modelo, a resposta
+        # é montada só com os trechos do manual
+        self.response_deadline = response_deadline
+        self.min_completion_budget = min_completion_budget
         self.current_session: Optional[ChatSession] = None
-        self.default_model = "o1"  # Modelo fixo
+        # Modelo fixo (CHAT_MODEL troca, ex.: para um modelo local)
+        self.default_model = os.getenv("CHAT_MODEL", "o1")
+        self.provider: Optional[str] = None  # Preferência desta sessão
     
     def start_new_session(self, model: str = None) -> ChatSession:
         """Inicia uma nova sessão de chat"""
@@ -46,28 +82,196 @@ class ChatUseCase:
         
         return user_message
     
-    def get_ai_response(self, user_message: str) -> Message:
+    def get_ai_response(self, user_message: str,
+                        context: Optional[RequestContext] = None) -> Message:
         """Obtém resposta da IA para a mensagem do usuário"""
         if not self.current_session:
             raise ValueError("Nenhuma sessão ativa")
         
+        start = time.perf_counter()
+        try:
+            with tracer.span("chat.response",
+                             request_id=(context.request_id
+                                         if context else None),
+                             session_id=self.current_session.id) as span:
+                ai_message = self._answer(user_message, context)
+                if span:
+                    span.set_attribute("model", ai_message.model_used)
+        except Exception as e:
+            RESPONSE_ERRORS.inc(error=type(e).__name__, stream="false")
+            raise
+        RESPONSE_LATENCY.observe(time.perf_counter() - start, stream="false")
+        RESPONSES.inc(model=ai_message.model_used, stream="false")
+        
+        # Adicionar à sessão
+        self.current_session.add_message(ai_message)
+        
+        return ai_message
+    
+    def _answer(self, user_message: str,
+                context: Optional[RequestContext]) -> Message:
+        """Resposta pela FAQ, pelo modelo ou, sem tempo, pelos trechos"""
+        # Pergunta frequente: resposta pré-computada, sem chamar o modelo
+        ai_response_content = self._get_faq_response(context)
+        model_used = "faq"
+        
         # Obter resposta da IA
-        ai_response_content = self.ai_service.get_response(
-            user_message, self.current_session.model
-        )
+        if ai_response_content is None:
+            context = self._prepare_context(context)
+            model_used = self.current_session.model
+            try:
+                self._check_budget(context, model_used)
+                if self.cascade and model_used == self.cascade.strong_model:
+                    ai_response_content, model_used = (
+                        self._get_cascade_response(user_message, context))
+                else:
+                    ai_response_content = self.ai_service.get_response(
+                        user_message, model_used, self.provider, context
+                    )
+            except DeadlineExceededError:
+                ai_response_content = self.ai_service.get_extractive_answer(
+                    user_message, context, self.provider)
+                model_used = "extractive"
         
         # Criar mensagem da IA
-        ai_message = Message(
+        return Message(
             role=MessageRole.ASSISTANT,
             content=ai_response_content,
             timestamp=datetime.now(),
-            model_used=self.current_session.model
+            model_used=model_used
+        )
+    
+    def _prepare_context(self, context: Optional[RequestContext]
+                         ) -> RequestContext:
+        """Acrescenta ao contexto a sessão, o resumo e a janela de histórico"""
+        context = context or RequestContext()
+        context.session_id = self.current_session.id
+        if context.deadline is None and self.response_deadline:
+            context.deadline = time.monotonic() + self.response_deadline
+        if self.memory:
+            context.summary, context.history = self.memory.build(
+                self.current_session, self.provider, context.deadline)
+        return context
+    
+    def _check_budget(self, context: RequestContext, model: str):
+        """Falha logo se o tempo restante não comporta uma resposta"""
+        remaining = context.remaining_time()
+        if remaining is None:
+            return
+        needed = max(self.min_completion_budget,
+                     self.ai_service.estimate_latency(model, self.provider)
+                     or 0.0)
+        if remaining < needed:
+            raise DeadlineExceededError(
+                f"Restam {remaining:.1f}s; o modelo leva ao menos "
+                f"{needed:.1f}s")
+    
+    def _get_faq_response(self, context: Optional[RequestContext]
+                          ) -> Optional[str]:
+        """Procura a pergunta na tabela de respostas pré-computadas"""
+        if (not self.faq_store or context is None or
+                not context.question or not context.has_vehicle()):
+            return None
+        return self.faq_store.lookup(
+            context.question, context.vehicle_year, context.vehicle_version,
+            self.ai_service.get_index_version()
+        )
+    
+    def _get_cascade_response(self, user_message: str,
+                              context: Optional[RequestContext] = None):
+        """Responde pela cascata: modelo rápido primeiro quando possível"""
+        confidence, embeddings_name = (
+            self.ai_service.get_retrieval_confidence(
+                user_message, self.provider,
+                context.session_id if context else None))
+        # O classificador vê só a pergunta: o prefixo do veículo em
+        # user_message contaria palavras para a regra de max_words
+        question = (context.question if context and context.question
+                    else user_message)
+        return self.cascade.run(
+            question,
+            lambda model: self.ai_service.get_response(
+                user_message, model, self.provider, context),
+            retrieval_confidence=confidence,
+            embeddings_name=embeddings_name,
+            prompt=user_message
         )
+    
+    def stream_ai_response(self, user_message: str,
+                           context: Optional[RequestContext] = None
+                           ) -> Iterator[str]:
+        """
+        Obtém resposta da IA em streaming
+
+        Os pedaços são repassados conforme chegam; ao final do stream a
+        resposta completa é adicionada à sessão.
+        """
+        if not self.current_session:
+            raise ValueError("Nenhuma sessão ativa")
         
-        # Adicionar à sessão
-        self.current_session.add_message(ai_message)
+        session = self.current_session
+        model_used = session.model
+        chunks = []
+        start = time.perf_counter()
+        # O span acompanha o stream até o fim, sem virar o ativo: a
+        # leitura pode acontecer em outro contexto
+        span = tracer.start_span(
+            "chat.response",
+            request_id=context.request_id if context else None,
+            session_id=session.id, stream=True)
+        try:
+            faq_answer = self._get_faq_response(context)
+            if faq_answer is not None:
+                model_used = "faq"
+                stream = iter([faq_answer])
+            else:
+                def open_stream() -> Iterator[str]:
+                    nonlocal context
+                    context = self._prepare_context(context)
+                    self._check_budget(context, session.model)
+                    return self.ai_service.stream_response(
+                        user_message, session.model, self.provider, context)
+                
+                stream = tracer.run_in_span(span, open_stream)
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        except DeadlineExceededError:
+            # Sem nada recebido, responde com os trechos; no meio do
+            # stream, apenas avisa que a resposta foi interrompida
+            if chunks:
+                note = ("\n\n⏱️ _Resposta interrompida: tempo limite "
+                        "atingido._")
+            else:
+                note = self.ai_service.get_extractive_answer(
+                    user_message, context, self.provider)
+                model_used = "extractive"
+            chunks.append(note)
+            yield note
+        except Exception as e:
+            RESPONSE_ERRORS.inc(error=type(e).__name__, stream="true")
+            if span:
+                span.record_error(e)
+            raise
+        finally:
+            if span:
+                span.set_attribute("model", model_used)
+            tracer.end_span(span)
         
-        return ai_message
+        RESPONSE_LATENCY.observe(time.perf_counter() - start, stream="true")
+        RESPONSES.inc(model=model_used, stream="true")
+        session.add_message(Message(
+            role=MessageRole.ASSISTANT,
+            content="".join(chunks),
+            timestamp=datetime.now(),
+            model_used=model_used
+        ))
+    
+    def set_provider(self, provider_name: str):
+        """Define o provedor preferido apenas para esta sessão"""
+        if provider_name not in self.ai_service.providers:
+            raise ValueError(f"Provedor {provider_name} não disponível")
+        self.provider = provider_name
     
     def get_current_session(self) -> Optional[ChatSession]:
         """Retorna a sessão atual"""
@@ -83,13 +287,17 @@ class ChatUseCase:
             return {
                 "user_messages": 0,
                 "ai_messages": 0,
-                "total_characters": 0
+                "total_characters": 0,
+                "retrieval_hit_rate": 0.0
             }
         
+        retrieval_stats = self.ai_service.get_session_retrieval_stats(
+            self.current_session.id, self.provider)
         return {
             "user_messages": self.current_session.get_user_messages_count(),
             "ai_messages": self.current_session.get_assistant_messages_count(),
-            "total_characters": self.current_session.get_total_characters()
+            "total_characters": self.current_session.get_total_characters(),
+            "retrieval_hit_rate": retrieval_stats.get("hit_rate", 0.0)
         }
 
 
@@ -99,7 +307,81 @@ class UseCaseFactory:
     
     def __init__(self, ai_service: AIService):
         self.ai_service = ai_service
+        # Cascata compartilhada entre as sessões (MODEL_CASCADE=1 ativa)
+        self.cascade = (ModelCascade() 
+                        if os.getenv("MODEL_CASCADE") == "1" else None)
+        # Respostas pré-computadas (geradas com faq_builder.py e
+        # regeneradas em segundo plano quando o índice muda)
+        self.faq_refresh: Optional[threading.Thread] = None
+        self.faq_store = self._load_faq_store()
+        # Histórico enviado ao modelo; o resumo de cada conversa fica na
+        # própria sessão (HISTORY_MAX_TOKENS=0 desliga)
+        history_max_tokens = int(os.getenv("HISTORY_MAX_TOKENS", "1500"))
+        self.memory = (ConversationMemory(
+            ai_service,
+            summary_model=os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini"),
+            max_tokens=history_max_tokens,
+            max_summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS",
+                                             "300")),
+            summary_share=float(os.getenv("HISTORY_SUMMARY_SHARE", "0.25")),
+            min_summary_budget=float(os.getenv("HISTORY_SUMMARY_MIN_S", "1"))
+        ) if history_max_tokens > 0 else None)
+        # Teto de latência por resposta (0 desliga) e tempo mínimo
+        # necessário para tentar o modelo
+        self.response_deadline = float(
+            os.getenv("RESPONSE_DEADLINE_S", "60")) or None
+        self.min_completion_budget = float(
+            os.getenv("MIN_COMPLETION_BUDGET_S", "3"))
+    
+    def _load_faq_store(self) -> Optional[FAQStore]:
+        """
+        Carrega a tabela de FAQ, se existir
+
+        Se ela for de outra versão do índice, é regenerada em segundo
+        plano (FAQ_AUTO_REFRESH=0 desliga); até lá nenhuma resposta antiga
+        é servida.
+        """
+        faq_store = FAQStore(Path(os.getenv("FAQ_STORE_PATH",
+                                            "faq_cache/faq_store.json")))
+        if not faq_store.load():
+            return None
+        index_version = self.ai_service.get_index_version()
+        if faq_store.is_fresh(index_version):
+            print(f"✅ FAQ carregado com {len(faq_store)} respostas")
+        elif os.getenv("FAQ_AUTO_REFRESH", "1") == "0":
+            print("⚠️ FAQ gerado para outra versão do índice; "
+                  "rode faq_builder.py para atualizar")
+        else:
+            print("♻️ FAQ gerado para outra versão do índice; "
+                  "regenerando em segundo plano")
+            self.faq_refresh = threading.Thread(
+                target=self._refresh_faq_store,
+                args=(faq_store, index_version),
+                daemon=True, name="faq-refresh")
+            self.faq_refresh.start()
+        return faq_store
+    
+    def _refresh_faq_store(self, faq_store: FAQStore, index_version: str):
+        """Regenera a FAQ como o faq_builder.py (FAQ_MODEL, FAQ_QUESTIONS)"""
+        model = os.getenv("FAQ_MODEL", "o1")
+        
+        def answer(context: RequestContext) -> str:
+            return self.ai_service.get_response(context.to_prompt(), model,
+                                                context=context)
+        
+        try:
+            questions = load_questions(Path(os.getenv(
+                "FAQ_QUESTIONS", "data/faq_questions.txt")))
+            if faq_store.refresh(answer, questions, index_version,
+                                 max_workers=int(os.getenv(
+                                     "FAQ_REFRESH_WORKERS", "2"))):
+                print(f"✅ FAQ regenerado com {len(faq_store)} respostas")
+        except Exception as e:
+            print(f"❌ Erro ao regenerar FAQ: {e}")
     
     def create_chat_use_case(self) -> ChatUseCase:
         """Cria use case de chat"""
-        return ChatUseCase(self.ai_service) 
\ No newline at end of file
+        return ChatUseCase(self.ai_service, cascade=self.cascade,
+                           faq_store=self.faq_store, memory=self.memory,
+                           response_deadline=self.response_deadline,
+                           min_completion_budget=self.min_completion_budget) 
\ No newline at end of file
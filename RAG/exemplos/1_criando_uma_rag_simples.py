@@ -1,14 +1,15 @@
 from dotenv import load_dotenv
 import os
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from embeddings_locais import criar_embeddings
 
 load_dotenv()
 
-# Configurar embeddings e modelo de chat
-embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+# Configurar embeddings (EMBEDDINGS_PROVIDER=openai|local) e modelo de chat
+embeddings = criar_embeddings()
 llm = ChatOpenAI(
     api_key=os.getenv("OPENAI_API_KEY"), model="gpt-4-turbo-preview", temperature=0
 )
@@ -0,0 +1,74 @@
+"""
+Embeddings locais (CPU, sem download e sem rede) para os exemplos de RAG.
+
+Use a variável de ambiente EMBEDDINGS_PROVIDER para escolher o provedor:
+- "openai" (padrão): OpenAIEmbeddings, precisa de OPENAI_API_KEY
+- "local": hashing trick com sinal, roda offline
+"""
+import math
+import os
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=2**18)
+def _hash_feature(feature: str) -> int:
+    # zlib.crc32 é estável entre processos, ao contrário de hash()
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+class HashingEmbeddings(Embeddings):
+    """Palavras, bigramas e trigramas de caracteres projetados por hashing."""
+
+    def __init__(self, dimension: int = 1024, char_ngram: int = 3):
+        self.dimension = dimension
+        self.char_ngram = char_ngram
+
+    def _embed(self, text: str) -> List[float]:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        words = _TOKEN_PATTERN.findall(text)
+
+        counts = {}
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [
+                "#" + padded[i : i + self.char_ngram]
+                for i in range(len(padded) - self.char_ngram + 1)
+            ]
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, count in counts.items():
+            h = _hash_feature(feature)
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimension] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def criar_embeddings() -> Embeddings:
+    """Cria o provedor de embeddings escolhido em EMBEDDINGS_PROVIDER."""
+    provedor = os.getenv("EMBEDDINGS_PROVIDER", "openai").lower()
+    if provedor == "local":
+        return HashingEmbeddings()
+
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))